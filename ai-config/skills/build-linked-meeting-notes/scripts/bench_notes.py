@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Time the note scripts cold and warm on a synthetic corpus and compare with a JSON baseline."""
+
+from __future__ import annotations
+
+import argparse
+import compileall
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from gen_note_corpus import DEFAULT_SEED, MODE_DIRS, SIZES, ensure_corpus
+
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+RESEARCH_SCRIPTS_DIR = SCRIPTS_DIR.parents[1] / "research-note-authoring" / "scripts"
+RESULT_VERSION = 1
+DEFAULT_REPEAT = 3
+# 遅くなったとみなす割合（%）と、短いケースの揺らぎを拾わないための最小差（秒）
+DEFAULT_THRESHOLD = 20.0
+DEFAULT_MIN_DELTA = 0.05
+# create_note.py でノートを 1 件ずつ作るフォルダの数（作ったノートは計測ごとに消す）
+CREATE_FOLDERS = 20
+CREATED_PREFIX = "[OK] 作成しました: "
+# create_note.py の --mode の値（gen_note_corpus.MODE_DIRS と同じ順）
+MODE_NAMES = ("general", "project")
+
+
+class Case(NamedTuple):
+    script: Path
+    # 計測として成功とみなす終了コード（指摘ありの 1 も含む）
+    ok_codes: tuple[int, ...]
+
+
+# ケース名 -> スクリプト。各スクリプトの差分実行の経路（--cache / --catalog / 番号インデックス）を測る
+CASES = {
+    "check_links": Case(SCRIPTS_DIR / "check_links.py", (0, 1)),
+    "check_placeholders": Case(SCRIPTS_DIR / "check_placeholders.py", (0, 1)),
+    "validate_note_links": Case(RESEARCH_SCRIPTS_DIR / "validate_note_links.py", (0, 1)),
+    "update_readme_index": Case(RESEARCH_SCRIPTS_DIR / "update_readme_index.py", (0,)),
+    "create_note": Case(RESEARCH_SCRIPTS_DIR / "create_note.py", (0,)),
+}
+
+
+class Run(NamedTuple):
+    seconds: float
+    maxrss_kb: int
+    exit: int
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="合成したノートの木で各スクリプトをキャッシュなし（cold）とキャッシュあり（warm）で計測し、"
+        "JSON のベースラインと比べて遅くなったケースを報告する"
+    )
+    parser.add_argument(
+        "--size",
+        choices=sorted(SIZES, key=SIZES.__getitem__),
+        default="10k",
+        help="コーパスのノート数（100 / 10k / 100k。既定 10k）",
+    )
+    parser.add_argument(
+        "--notes",
+        type=int,
+        metavar="N",
+        help="ノート数を直接指定する（--size より優先）",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help="コーパス生成の乱数の種（既定 %(default)d）",
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        type=Path,
+        help="コーパスの置き場所（既定: 一時フォルダの note-bench-<ノート数>-<種>。同じ条件なら作り直さない）",
+    )
+    parser.add_argument(
+        "--cases",
+        nargs="+",
+        choices=list(CASES),
+        default=list(CASES),
+        help="計測するスクリプト（既定: すべて）",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        metavar="N",
+        help="warm の計測回数。中央値を記録する（既定 %(default)d）",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="計測結果の JSON の出力先",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        help="比べるベースラインの JSON。ファイルがなければ今回の結果をベースラインとして保存する",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="比較のあと、今回の結果でベースラインを上書きする",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        metavar="PCT",
+        help="ベースラインよりこの割合（%%）を超えて遅ければ失敗にする（既定 %(default)g）",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=DEFAULT_MIN_DELTA,
+        metavar="SEC",
+        help="差がこの秒数未満なら割合を超えても失敗にしない（既定 %(default)g）",
+    )
+    return parser.parse_args()
+
+
+def case_args(name: str, root: Path, manifest: Path) -> list[str]:
+    if name == "check_links":
+        return [str(root), "--cache"]
+    if name == "check_placeholders":
+        return [str(root), "--catalog"]
+    if name == "validate_note_links":
+        return [*(str(root / mode_dir) for mode_dir in MODE_DIRS), "--cache"]
+    if name == "update_readme_index":
+        # README を書き換えると次の計測の条件が変わるので、生成と比較までを測る
+        return ["--root", str(root), "--all", "--cache", "--dry-run"]
+    return ["--root", str(root), "--manifest", str(manifest), "--cache"]
+
+
+def write_manifest(root: Path, work_dir: Path) -> tuple[Path, list[Path]]:
+    """(マニフェスト, ノートを作るフォルダ)。両モードのフォルダから均等に CREATE_FOLDERS 個選ぶ。"""
+    rows: list[dict[str, str]] = []
+    folders: list[Path] = []
+    for mode_name, mode_dir in zip(MODE_NAMES, MODE_DIRS):
+        subdirs = sorted(path for path in (root / mode_dir).iterdir() if path.is_dir() and not path.name.startswith("."))
+        step = max(1, len(subdirs) // (CREATE_FOLDERS // len(MODE_DIRS)))
+        for subdir in subdirs[::step][: CREATE_FOLDERS // len(MODE_DIRS)]:
+            rows.append({"title": "ベンチマーク計測", "mode": mode_name, "subdir": subdir.name})
+            folders.append(subdir)
+    manifest = work_dir / "create_note_manifest.json"
+    manifest.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+    return manifest, folders
+
+
+def clear_caches(root: Path) -> None:
+    # 各スクリプトのキャッシュはルートとモードのフォルダの .cache/ に置かれる
+    for directory in [root, *(root / mode_dir for mode_dir in MODE_DIRS)]:
+        shutil.rmtree(directory / ".cache", ignore_errors=True)
+
+
+def run_once(argv: list[str]) -> tuple[Run, str]:
+    """(計測値, 出力)。最大 RSS は wait4 でこの子プロセスだけのものを取る。"""
+    with tempfile.TemporaryFile() as out:
+        started = time.perf_counter()
+        proc = subprocess.Popen(argv, stdout=out, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        output = out.read().decode("utf-8", "replace")
+    # Linux は KiB、macOS はバイト
+    maxrss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return Run(elapsed, maxrss_kb, proc.returncode), output
+
+
+def undo_created(output: str, folders: list[Path], mtimes: list[int]) -> None:
+    """create_note.py が作ったノートを消し、フォルダの mtime を戻す（次の計測も同じ条件にする）。"""
+    for line in output.splitlines():
+        if line.startswith(CREATED_PREFIX):
+            Path(line[len(CREATED_PREFIX) :].rsplit(" (", 1)[0]).unlink(missing_ok=True)
+    for folder, mtime_ns in zip(folders, mtimes):
+        os.utime(folder, ns=(mtime_ns, mtime_ns))
+
+
+def measure(name: str, root: Path, manifest: Path, folders: list[Path], repeat: int) -> dict[str, Any]:
+    case = CASES[name]
+    argv = [sys.executable, str(case.script), *case_args(name, root, manifest)]
+    mtimes = [folder.stat().st_mtime_ns for folder in folders]
+    clear_caches(root)
+    runs: list[Run] = []
+    for _ in range(1 + repeat):
+        run, output = run_once(argv)
+        if name == "create_note":
+            undo_created(output, folders, mtimes)
+        if run.exit not in case.ok_codes:
+            tail = "\n".join(output.splitlines()[-20:])
+            raise SystemExit(f"[ERROR] {name} が終了コード {run.exit} で失敗しました:\n{tail}")
+        runs.append(run)
+    cold, warm = runs[0], runs[1:]
+    return {
+        "cold": cold._asdict(),
+        "warm": {
+            "seconds": statistics.median(run.seconds for run in warm),
+            "runs": [run.seconds for run in warm],
+            "maxrss_kb": max(run.maxrss_kb for run in warm),
+            "exit": warm[-1].exit,
+        },
+    }
+
+
+def print_results(results: dict[str, Any]) -> None:
+    for name, phases in results["cases"].items():
+        cold, warm = phases["cold"], phases["warm"]
+        print(
+            f"[INFO] {name}: cold {cold['seconds']:.3f} 秒 / warm {warm['seconds']:.3f} 秒"
+            f"（中央値、{len(warm['runs'])} 回）、最大 RSS {max(cold['maxrss_kb'], warm['maxrss_kb']) / 1024:.1f} MB"
+        )
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float, min_delta: float) -> int:
+    """ベースラインより遅くなったケースの数。"""
+    regressions = 0
+    for name, phases in results["cases"].items():
+        base_phases = baseline.get("cases", {}).get(name)
+        if base_phases is None:
+            print(f"- {name}: ベースラインに記録がありません")
+            continue
+        for phase in ("cold", "warm"):
+            now, before = phases[phase]["seconds"], base_phases[phase]["seconds"]
+            change = (now - before) / before * 100 if before else 0.0
+            slower = change > threshold and now - before >= min_delta
+            regressions += slower
+            mark = " ← 遅くなりました" if slower else ""
+            print(f"- {name} {phase}: {before:.3f} 秒 → {now:.3f} 秒（{change:+.1f}%）{mark}")
+    return regressions
+
+
+def write_json(path: Path, data: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def main() -> int:
+    args = parse_args()
+    notes = args.notes if args.notes is not None else SIZES[args.size]
+    if notes < 1 or args.repeat < 1:
+        print("[ERROR] --notes と --repeat は 1 以上を指定してください")
+        return 2
+    root = (args.corpus_dir or Path(tempfile.gettempdir()) / f"note-bench-{notes}-{args.seed}").expanduser().resolve()
+
+    started = time.perf_counter()
+    corpus, created = ensure_corpus(root, notes, args.seed)
+    how = f"生成 {time.perf_counter() - started:.1f} 秒" if created else "生成済みを使用"
+    print(f"[INFO] コーパス: {root}（ノート {corpus['notes']} 件、{corpus['bytes'] / 1024 / 1024:.1f} MB。{how}）")
+    # 初回の .pyc 生成を cold の計測に含めない
+    for directory in (SCRIPTS_DIR, RESEARCH_SCRIPTS_DIR):
+        compileall.compile_dir(str(directory), quiet=1)
+
+    results: dict[str, Any] = {
+        "version": RESULT_VERSION,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "corpus": corpus,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="note-bench-") as work:
+        manifest, folders = write_manifest(root, Path(work))
+        for name in args.cases:
+            results["cases"][name] = measure(name, root, manifest, folders if name == "create_note" else [], args.repeat)
+    clear_caches(root)
+    print_results(results)
+
+    if args.output:
+        write_json(args.output.expanduser().resolve(), results)
+        print(f"[OK] 計測結果を書き出しました: {args.output}")
+    if args.baseline is None:
+        return 0
+    baseline_file = args.baseline.expanduser().resolve()
+    if not baseline_file.exists():
+        write_json(baseline_file, results)
+        print(f"[OK] ベースラインを保存しました: {baseline_file}")
+        return 0
+
+    baseline = json.loads(baseline_file.read_text(encoding="utf-8"))
+    if baseline.get("version") != RESULT_VERSION or any(
+        baseline.get("corpus", {}).get(key) != corpus[key] for key in ("version", "notes", "seed")
+    ):
+        print(f"[ERROR] ベースラインとコーパスの条件（ノート数・種・形式）が違うため比べられません: {baseline_file}")
+        return 2
+    print(
+        f"[INFO] ベースライン: {baseline_file}（{baseline.get('recorded_at')} 記録、"
+        f"Python {baseline.get('environment', {}).get('python')}）"
+    )
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+    if args.update_baseline:
+        write_json(baseline_file, results)
+        print(f"[OK] ベースラインを更新しました: {baseline_file}")
+    if regressions:
+        print(f"[NG] しきい値（+{args.threshold:g}%、かつ {args.min_delta:g} 秒以上）を超えて遅くなったケース: {regressions} 件")
+        return 1
+    print(f"[OK] しきい値（+{args.threshold:g}%）を超えて遅くなったケースはありません")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,22 +2,40 @@
 from __future__ import annotations
 
 import argparse
-import re
 import sys
 from pathlib import Path
-from typing import Iterable
-from urllib.parse import unquote
+from typing import Any, Callable, Iterable
+
+from fssnapshot import FsSnapshot
+from jobpool import resolve_jobs
+from linkcache import LinkCache, default_cache_dir
+from mdscan import LARGE_FILE_BYTES
+from notecatalog import NoteCatalog
+from notelint import FileLint, lint_file, lint_files, lint_path
+from noteprofile import PROFILE, add_profile_arguments, run_main
+from notewatch import (
+    DEFAULT_DEBOUNCE,
+    DEFAULT_INTERVAL,
+    Finding,
+    paths_fingerprint,
+    tree_fingerprint,
+    watch_loop,
+)
+from urlcheck import ExternalChecker, add_external_arguments, checker_from_args, external_links
 
 
-MD_LINK_RE = re.compile(r"(?<!!)\[[^\]]*\]\(([^)]+)\)")
-HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
-FENCED_CODE_RE = re.compile(r"```.*?```", re.DOTALL)
-HTML_ANCHOR_RE = re.compile(
-    r"<a\s+[^>]*(?:id|name)\s*=\s*['\"]([^'\"]+)['\"][^>]*>",
-    re.IGNORECASE,
-)
-HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
-SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+# notelint の規則のうち、このスクリプトが使うもの
+LINK_RULES = ("links", "absolute", "anchors")
+
+# 検査結果の種別 -> (重大度, メッセージ)
+LINK_ISSUES = {
+    "absolute": ("warn", "絶対パスのリンクを検出"),
+    "missing": ("error", "リンク先ファイルが存在しません"),
+    "directory": ("error", "リンク先がディレクトリです"),
+    "anchor": ("error", "アンカーが見つかりません"),
+}
+# アンカー表がそろうまで判定を保留しているフラグメント付きリンク
+PENDING_ANCHOR = "pending"
 
 
 def parse_args() -> argparse.Namespace:
@@ -28,46 +46,114 @@ def parse_args() -> argparse.Namespace:
         "target",
         help="会議フォルダ（推奨）または Markdown ファイルのパス",
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="検査対象フォルダの .cache/ に解析結果を保存し、次回は変更分だけ再検査する",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="キャッシュの保存先ディレクトリ（指定時は --cache を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="ノートの共有カタログ（.cache/notes.sqlite3。上位フォルダにあればそれ）を使い、変更ファイルだけ解析し直す",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        help="カタログのファイル（指定時は --catalog を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="N プロセスで並列に解析する（0 で CPU 数。既定 1）",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="スナップショット・アンカー表の利用状況（省略した呼び出し数やヒット数）を表示する",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常駐して変更を監視し、変更ファイルとそこへ向かうリンクだけを再検査して差分を表示する",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f"--watch のポーリング間隔（秒、既定 {DEFAULT_INTERVAL}）",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        help=f"--watch で変更が落ち着くまで待つ時間（秒、既定 {DEFAULT_DEBOUNCE}）",
+    )
+    parser.add_argument(
+        "--large-file-mb",
+        type=float,
+        default=LARGE_FILE_BYTES / 1024 / 1024,
+        metavar="MB",
+        help="このサイズ以上のファイルは丸ごと読まず、mmap して窓ごとに走査する（既定 %(default)g）",
+    )
+    parser.add_argument(
+        "--include-hidden",
+        action="store_true",
+        help="隠しディレクトリ・隠しファイル（. で始まるもの）も検査対象にする",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    add_external_arguments(parser)
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
-def mask_ignored_regions(text: str) -> str:
-    def _mask(match: re.Match[str]) -> str:
-        # 行番号を維持するため、改行以外を空白に置換する
-        return re.sub(r"[^\n]", " ", match.group(0))
-
-    masked = HTML_COMMENT_RE.sub(_mask, text)
-    masked = FENCED_CODE_RE.sub(_mask, masked)
-    return masked
-
-
-def heading_to_anchor(heading_text: str) -> str:
-    text = heading_text.strip().lower()
-    text = re.sub(r"`([^`]*)`", r"\1", text)
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-    text = re.sub(r"<[^>]+>", "", text)
-    text = re.sub(r"[^\w\u3040-\u30ff\u3400-\u9fff\s-]", "", text)
-    text = re.sub(r"\s+", "-", text).strip("-")
-    return text
-
-
-def extract_anchors(markdown_path: Path) -> set[str]:
-    text = markdown_path.read_text(encoding="utf-8")
-    masked = mask_ignored_regions(text)
-    anchors: set[str] = set()
-
-    for match in HTML_ANCHOR_RE.finditer(masked):
-        anchors.add(match.group(1))
-
-    for match in HEADING_RE.finditer(masked):
-        anchor = heading_to_anchor(match.group(2))
-        if anchor:
-            anchors.add(anchor)
-
-    return anchors
+def extract_anchors(markdown_path: Path, large_bytes: int = LARGE_FILE_BYTES) -> set[str]:
+    return set(lint_path(markdown_path, ("anchors",), large_bytes)["anchors"])
+
+
+class AnchorTable:
+    """パス -> アンカー集合。検査対象の解析結果から 1 回だけ作り、足りない分だけ読む。"""
+
+    def __init__(
+        self,
+        anchors: dict[str, set[str]],
+        large_bytes: int = LARGE_FILE_BYTES,
+        catalog: NoteCatalog | None = None,
+    ) -> None:
+        self.anchors = anchors
+        self.large_bytes = large_bytes
+        self.catalog = catalog
+        self.hits = 0
+        self.reads = 0
+
+    def get(self, path: Path) -> set[str]:
+        key = str(path)
+        anchors = self.anchors.get(key)
+        if anchors is None:
+            self.reads += 1
+            if self.catalog is not None:
+                result = self.catalog.lint_files([key], ("anchors",), large_bytes=self.large_bytes)[0]
+                if result.error is not None:
+                    raise result.error
+                anchors = self.anchors[key] = set(result.hits["anchors"])
+            else:
+                anchors = self.anchors[key] = extract_anchors(path, self.large_bytes)
+        else:
+            self.hits += 1
+        return anchors
 
 
-def iter_markdown_files(target: Path) -> Iterable[Path]:
+def iter_markdown_files(target: Path, snapshot: FsSnapshot) -> Iterable[Path]:
     if target.is_file():
         if target.suffix.lower() != ".md":
             raise ValueError("Markdown ファイル（.md）を指定してください。")
@@ -78,39 +164,274 @@ def iter_markdown_files(target: Path) -> Iterable[Path]:
     if not target.is_dir():
         raise ValueError(f"ディレクトリを指定してください: {target}")
 
-    files = sorted(p for p in target.rglob("*.md") if p.is_file())
-    return files
-
-
-def normalize_link_target(raw_target: str) -> str:
-    target = raw_target.strip()
-    if not target:
-        return target
+    snapshot.scan()
+    return snapshot.markdown_files()
+
+
+def split_fragment(link_target: str) -> tuple[str, str]:
+    if "#" in link_target:
+        path_part, fragment = link_target.split("#", 1)
+        return path_part, fragment
+    return link_target, ""
+
+
+def link_status(
+    target_file: Path,
+    fragment: str,
+    exists: bool,
+    is_dir: bool,
+    get_anchors: Callable[[Path], set[str]] | None = None,
+) -> str:
+    if not exists:
+        return "missing"
+    if is_dir:
+        return "directory"
+    if fragment and target_file.suffix.lower() == ".md":
+        if get_anchors is None:
+            return PENDING_ANCHOR
+        if fragment not in get_anchors(target_file):
+            return "anchor"
+    return "ok"
+
+
+def local_links(result: FileLint) -> list[tuple[int, str]]:
+    if result.error is not None:
+        raise result.error
+    # 相対リンクと絶対パスのリンクは出力先（エラー / 警告）が別なので、並べる順はそれぞれの中で保てばよい
+    return result.hits.get("links", []) + result.hits.get("absolute", [])
+
+
+def resolve_links(
+    md_file: Path,
+    links: Iterable[tuple[int, str]],
+    snapshot: FsSnapshot,
+) -> list[list[Any]]:
+    """リンク先の存在と種別をスナップショットで判定する。
+
+    フラグメント付きの .md リンクは、アンカー表がそろうまで PENDING_ANCHOR のままにする。
+    """
+    records: list[list[Any]] = []
+    directory = str(md_file.parent)
+    for line, link_target in links:
+        if link_target.startswith("/"):
+            records.append([line, link_target, None, "absolute"])
+            continue
+
+        path_part, fragment = split_fragment(link_target)
+        target_path = str(md_file) if path_part == "" else snapshot.resolve(directory, path_part)
+        kind = snapshot.kind(target_path)
+        status = link_status(Path(target_path), fragment, kind is not None, bool(kind))
+        records.append([line, link_target, target_path, status])
+    return records
+
+
+def settle_anchor_checks(
+    results: Iterable[list[list[Any]]],
+    get_anchors: Callable[[Path], set[str]],
+) -> None:
+    for records in results:
+        for record in records:
+            if record[3] == PENDING_ANCHOR:
+                _, fragment = split_fragment(record[1])
+                record[3] = "ok" if fragment in get_anchors(Path(record[2])) else "anchor"
+
+
+def evaluate_links(
+    markdown_files: list[Path],
+    linted: list[FileLint],
+    snapshot: FsSnapshot,
+    anchor_table: AnchorTable,
+) -> list[list[list[Any]]]:
+    results: list[list[list[Any]]] = []
+    for md_file, result in zip(markdown_files, linted):
+        links = local_links(result)
+        # アンカー表は親プロセスで 1 回だけ組み立て、ワーカーごとには作らない
+        anchor_table.anchors[str(md_file)] = set(result.hits["anchors"])
+        results.append(resolve_links(md_file, links, snapshot))
+    settle_anchor_checks(results, anchor_table.get)
+    return results
+
+
+def check_files(
+    markdown_files: list[Path],
+    snapshot: FsSnapshot,
+    anchor_table: AnchorTable,
+    jobs: int,
+    scope: Path | None = None,
+) -> list[list[list[Any]]]:
+    paths = [str(path) for path in markdown_files]
+    if anchor_table.catalog is not None:
+        with PROFILE.phase("cache"):
+            linted = anchor_table.catalog.lint_files(paths, LINK_RULES, jobs, anchor_table.large_bytes, scope)
+    else:
+        linted = lint_files(paths, LINK_RULES, jobs, anchor_table.large_bytes)
+    with PROFILE.phase("resolve"):
+        return evaluate_links(markdown_files, linted, snapshot, anchor_table)
+
+
+def check_with_cache(
+    markdown_files: list[Path],
+    snapshot: FsSnapshot,
+    cache: LinkCache,
+    jobs: int,
+    large_bytes: int = LARGE_FILE_BYTES,
+) -> list[list[list[Any]]]:
+    def get_anchors(path: Path) -> set[str]:
+        key = str(path)
+        anchors = cache.cached_anchors(key)
+        if anchors is None:
+            result = lint_file(key, ("anchors",), large_bytes, with_digest=True)
+            if result.error is not None:
+                raise result.error
+            cache.record_digest(key, result.digest)
+            anchors = set(result.hits["anchors"])
+            cache.set_anchors(key, anchors)
+        return anchors
+
+    def evaluate(record: list[Any]) -> None:
+        state = cache.state(record[2])
+        _, fragment = split_fragment(record[1])
+        exists = state is not None
+        record[3] = link_status(Path(record[2]), fragment, exists, exists and bool(state[0]), get_anchors)
+
+    with PROFILE.phase("cache"):
+        cache.refresh(markdown_files)
+        affected = cache.affected_sources()
+        stale = [str(path) for path in markdown_files if cache.cached_links(str(path)) is None]
+    scanned = dict(zip(stale, lint_files(stale, LINK_RULES, jobs, large_bytes, with_digest=True)))
+    results: list[list[list[Any]]] = []
+    with PROFILE.phase("resolve"):
+        for md_file in markdown_files:
+            key = str(md_file)
+            if key in scanned:
+                cache.parsed += 1
+                result = scanned[key]
+                links = local_links(result)
+                cache.record_digest(key, result.digest)
+                cache.set_anchors(key, set(result.hits["anchors"]))
+                records = resolve_links(md_file, links, snapshot)
+                for record in records:
+                    if record[2]:
+                        # 次回の変更検出のため、リンク先も stat 状態を登録しておく
+                        evaluate(record)
+                cache.set_links(key, records, (record[2] for record in records if record[2]))
+            else:
+                records = cache.cached_links(key)
+                cache.reused += 1
+                if key in affected:
+                    for record in records:
+                        if record[2] in cache.dirty:
+                            cache.rechecked_links += 1
+                            evaluate(record)
+            results.append(records)
+
+    with PROFILE.phase("cache"):
+        cache.save()
+    return results
+
+
+def collect_findings(
+    markdown_files: list[Path],
+    results: list[list[list[Any]]],
+) -> tuple[list[Finding], list[Finding]]:
+    errors: list[Finding] = []
+    warnings: list[Finding] = []
+    for md_file, records in zip(markdown_files, results):
+        for line, link_target, _, status in records:
+            if status == "ok":
+                continue
+            severity, message = LINK_ISSUES[status]
+            bucket = warnings if severity == "warn" else errors
+            bucket.append(
+                Finding((str(md_file), message, link_target), f"{md_file}:{line} {message}: {link_target}")
+            )
+    return errors, warnings
+
+
+def check_external(
+    markdown_files: list[Path],
+    checker: ExternalChecker,
+    jobs: int,
+    large_bytes: int,
+    catalog: NoteCatalog | None,
+) -> tuple[list[Finding], list[Finding]]:
+    """外部リンクの確認結果。HTTP のエラーと不正な URL はエラー、接続できないものは（一時的なこともあるので）警告にする。"""
+    per_file = external_links([str(path) for path in markdown_files], "external", jobs, large_bytes, catalog)
+    checker.check(url for links in per_file for _, url in links)
+    checker.save()
+    errors: list[Finding] = []
+    warnings: list[Finding] = []
+    for md_file, links in zip(markdown_files, per_file):
+        for line, url in links:
+            status = checker.status_of(url)
+            if status.broken:
+                message = f"外部リンク先がエラーを返しました（HTTP {status.status}）"
+                errors.append(Finding((str(md_file), message, url), f"{md_file}:{line} {message}: {url}"))
+            elif status.invalid:
+                message = f"外部リンクの URL が不正です（{status.error}）"
+                errors.append(Finding((str(md_file), message, url), f"{md_file}:{line} {message}: {url}"))
+            elif status.unreachable:
+                message = f"外部リンク先を確認できません（{status.error}）"
+                warnings.append(Finding((str(md_file), message, url), f"{md_file}:{line} {message}: {url}"))
+    return errors, warnings
+
+
+def print_report(errors: list[Finding], warnings: list[Finding], file_count: int) -> int:
+    if errors:
+        print("[ERROR] リンク検証で問題を検出しました。")
+        for err in errors:
+            print(f"- {err.display}")
+        if warnings:
+            print("[WARN] 追加の注意点")
+            for warn in warnings:
+                print(f"- {warn.display}")
+        return 1
 
-    # Markdown の title 指定 (path "title") を簡易的に除去
-    if " " in target and not target.startswith("<"):
-        target = target.split(" ", 1)[0]
+    print(f"[OK] リンク検証に成功しました（{file_count} ファイル）")
+    if warnings:
+        print("[WARN] 追加の注意点")
+        for warn in warnings:
+            print(f"- {warn.display}")
+    return 0
 
-    if target.startswith("<") and target.endswith(">"):
-        target = target[1:-1]
 
-    return unquote(target)
+def watch(target: Path, cache: LinkCache, jobs: int, large_bytes: int, args: argparse.Namespace) -> int:
+    def run_cycle() -> list[Finding]:
+        snapshot = FsSnapshot(target, args.include_hidden, args.walk_threads)
+        try:
+            markdown_files = list(iter_markdown_files(target, snapshot))
+        except ValueError as exc:
+            return [Finding(("target", str(exc)), f"[ERROR] {exc}")]
+        cache.begin_cycle()
+        results = check_with_cache(markdown_files, snapshot, cache, jobs, large_bytes)
+        errors, warnings = collect_findings(markdown_files, results)
+        return errors + warnings
 
+    if target.is_dir():
+        exclude = [cache.cache_file.parent] if cache.cache_file else []
 
-def is_external_link(target: str) -> bool:
-    return bool(SCHEME_RE.match(target))
+        # 走査の外（隠しフォルダや --root の外）にある既知のリンク先も見張る
+        def fingerprint() -> object:
+            state: dict[str, object] = dict(tree_fingerprint(target, exclude, args.include_hidden))
+            state.update(paths_fingerprint([path for path in sorted(cache.graph) if path not in state]))
+            return state
 
+    else:
+        # 単一ファイルのときは、そのファイルと既知のリンク先だけを見張る
+        def fingerprint() -> object:
+            return paths_fingerprint([str(target), *sorted(cache.graph)])
 
-def line_of(text: str, index: int) -> int:
-    return text.count("\n", 0, index) + 1
+    return watch_loop(run_cycle, fingerprint, args.interval, args.debounce)
 
 
 def main() -> int:
     args = parse_args()
     target = Path(args.target).expanduser().resolve()
 
+    snapshot = FsSnapshot(target, args.include_hidden, args.walk_threads)
     try:
-        markdown_files = list(iter_markdown_files(target))
+        with PROFILE.phase("walk"):
+            markdown_files = list(iter_markdown_files(target, snapshot))
     except ValueError as exc:
         print(f"[ERROR] {exc}")
         return 2
@@ -119,76 +440,72 @@ def main() -> int:
         print(f"[ERROR] Markdown ファイルが見つかりません: {target}")
         return 2
 
-    anchor_cache: dict[Path, set[str]] = {}
-    errors: list[str] = []
-    warnings: list[str] = []
-
-    def get_anchors(path: Path) -> set[str]:
-        if path not in anchor_cache:
-            anchor_cache[path] = extract_anchors(path)
-        return anchor_cache[path]
-
-    for md_file in markdown_files:
-        text = md_file.read_text(encoding="utf-8")
-        masked = mask_ignored_regions(text)
-
-        for match in MD_LINK_RE.finditer(masked):
-            raw_target = match.group(1)
-            link_target = normalize_link_target(raw_target)
-            if not link_target:
-                continue
-            if is_external_link(link_target):
-                continue
-
-            if link_target.startswith("/"):
-                warnings.append(
-                    f"{md_file}:{line_of(text, match.start())} 絶対パスのリンクを検出: {link_target}"
-                )
-                continue
-
-            if "#" in link_target:
-                path_part, fragment = link_target.split("#", 1)
-            else:
-                path_part, fragment = link_target, ""
-
-            target_file = md_file if path_part == "" else (md_file.parent / path_part).resolve()
-
-            if not target_file.exists():
-                errors.append(
-                    f"{md_file}:{line_of(text, match.start())} リンク先ファイルが存在しません: {link_target}"
-                )
-                continue
-
-            if target_file.is_dir():
-                errors.append(
-                    f"{md_file}:{line_of(text, match.start())} リンク先がディレクトリです: {link_target}"
-                )
-                continue
-
-            if fragment and target_file.suffix.lower() == ".md":
-                anchors = get_anchors(target_file)
-                if fragment not in anchors:
-                    errors.append(
-                        f"{md_file}:{line_of(text, match.start())} アンカーが見つかりません: {link_target}"
-                    )
-
-    if errors:
-        print("[ERROR] リンク検証で問題を検出しました。")
-        for err in errors:
-            print(f"- {err}")
-        if warnings:
-            print("[WARN] 追加の注意点")
-            for warn in warnings:
-                print(f"- {warn}")
-        return 1
+    jobs = resolve_jobs(args.jobs)
+    large_bytes = int(args.large_file_mb * 1024 * 1024)
+    cache: LinkCache | None = None
+    if args.cache or args.cache_dir:
+        cache_dir = Path(args.cache_dir).expanduser().resolve() if args.cache_dir else default_cache_dir(target)
+        with PROFILE.phase("cache"):
+            cache = LinkCache.open(cache_dir, "check_links")
+
+    catalog: NoteCatalog | None = None
+    if args.catalog or args.catalog_file:
+        if cache is not None or args.watch:
+            print("[ERROR] --catalog は --cache / --watch と同時に指定できません。")
+            return 2
+        catalog_file = Path(args.catalog_file).expanduser().resolve() if args.catalog_file else None
+        with PROFILE.phase("cache"):
+            catalog = NoteCatalog.open(target, catalog_file)
+    if args.external and args.watch:
+        print("[ERROR] --external は --watch と同時に指定できません。")
+        return 2
 
-    print(f"[OK] リンク検証に成功しました（{len(markdown_files)} ファイル）")
-    if warnings:
-        print("[WARN] 追加の注意点")
-        for warn in warnings:
-            print(f"- {warn}")
-    return 0
+    if args.watch:
+        return watch(target, cache or LinkCache(None, "check_links"), jobs, large_bytes, args)
+
+    if cache is not None:
+        results = check_with_cache(markdown_files, snapshot, cache, jobs, large_bytes)
+    else:
+        anchor_table = AnchorTable({}, large_bytes, catalog)
+        scope = target if target.is_dir() else None
+        results = check_files(markdown_files, snapshot, anchor_table, jobs, scope)
+
+    errors, warnings = collect_findings(markdown_files, results)
+    checker: ExternalChecker | None = None
+    if args.external:
+        cache_dir = Path(args.cache_dir).expanduser().resolve() if args.cache_dir else default_cache_dir(target)
+        checker = checker_from_args(args, cache_dir)
+        with PROFILE.phase("external"):
+            external_errors, external_warnings = check_external(markdown_files, checker, jobs, large_bytes, catalog)
+        errors += external_errors
+        warnings += external_warnings
+    if PROFILE.enabled:
+        PROFILE.add("links_resolved", sum(len(records) for records in results))
+        PROFILE.add_snapshot(snapshot)
+        if cache is not None:
+            PROFILE.add_cache("link_cache", cache.reused, cache.parsed)
+        else:
+            PROFILE.add_cache("anchor_table", anchor_table.hits, anchor_table.reads)
+        if catalog is not None:
+            PROFILE.add_cache("catalog", catalog.reused, catalog.parsed)
+        if checker is not None:
+            PROFILE.add_cache("external_cache", checker.reused, checker.fetched)
+
+    with PROFILE.phase("output"):
+        if cache is not None:
+            print(cache.summary(len(markdown_files)))
+        if catalog is not None:
+            print(catalog.summary(len(markdown_files)))
+            catalog.close()
+        if checker is not None:
+            print(checker.summary())
+        if args.stats:
+            print(snapshot.summary())
+            if cache is None:
+                print(f"[INFO] アンカー表: ヒット {anchor_table.hits} 回、追加読み込み {anchor_table.reads} ファイル")
+
+        return print_report(errors, warnings, len(markdown_files))
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(run_main(main, "check_links"))
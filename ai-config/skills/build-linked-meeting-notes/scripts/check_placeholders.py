@@ -2,13 +2,23 @@
 from __future__ import annotations
 
 import argparse
-import re
 import sys
+from functools import partial
 from pathlib import Path
 from typing import Iterable
 
+from linkcache import StatState, stat_state
+from mdscan import LARGE_FILE_BYTES
+from notecatalog import NoteCatalog
+from notelint import lint_path
+from noteprofile import PROFILE, add_profile_arguments, run_main
+from notewalk import markdown_paths
+from notewatch import DEFAULT_DEBOUNCE, DEFAULT_INTERVAL, Finding, tree_fingerprint, watch_loop
 
-PLACEHOLDER_RE = re.compile(r"\{\{[^{}\n]+\}\}")
+
+# --max-findings に達したときの注記
+SKIPPED_FILES = "残りのファイルは検査していません"
+HIDDEN_FINDINGS = "表示を打ち切りました"
 
 
 def parse_args() -> argparse.Namespace:
@@ -19,10 +29,72 @@ def parse_args() -> argparse.Namespace:
         "target",
         help="会議フォルダ（推奨）または Markdown ファイルのパス",
     )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="ノートの共有カタログ（.cache/notes.sqlite3。上位フォルダにあればそれ）を使い、変更ファイルだけ読み直す",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        help="カタログのファイル（指定時は --catalog を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常駐して変更を監視し、変更されたファイルだけを再検査して差分を表示する",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f"--watch のポーリング間隔（秒、既定 {DEFAULT_INTERVAL}）",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        help=f"--watch で変更が落ち着くまで待つ時間（秒、既定 {DEFAULT_DEBOUNCE}）",
+    )
+    parser.add_argument(
+        "--large-file-mb",
+        type=float,
+        default=LARGE_FILE_BYTES / 1024 / 1024,
+        metavar="MB",
+        help="このサイズ以上のファイルは丸ごと読まず、mmap してバイト列のまま走査する（既定 %(default)g）",
+    )
+    parser.add_argument(
+        "--known-only",
+        action="store_true",
+        help="スキルの雛形（assets/templates/*.md）に出てくるプレースホルダだけを検出する",
+    )
+    parser.add_argument(
+        "--max-findings",
+        type=int,
+        metavar="N",
+        help="N 件見つかった時点で検査を打ち切る（CI での合否判定向け）",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="最初の 1 件で検査を打ち切る（--max-findings 1 と同じ）",
+    )
+    parser.add_argument(
+        "--include-hidden",
+        action="store_true",
+        help="隠しディレクトリ・隠しファイル（. で始まるもの）も検査対象にする",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
-def iter_markdown_files(target: Path) -> Iterable[Path]:
+def iter_markdown_files(target: Path, include_hidden: bool = False, threads: int = 1) -> Iterable[Path]:
     if target.is_file():
         if target.suffix.lower() != ".md":
             raise ValueError("Markdown ファイル（.md）を指定してください。")
@@ -33,11 +105,90 @@ def iter_markdown_files(target: Path) -> Iterable[Path]:
     if not target.is_dir():
         raise ValueError(f"ディレクトリを指定してください: {target}")
 
-    return sorted(p for p in target.rglob("*.md") if p.is_file())
+    return markdown_paths(target, include_hidden, threads)
+
+
+def placeholder_findings(md_file: Path, matches: Iterable[tuple[int, str]]) -> list[Finding]:
+    return [
+        Finding((str(md_file), placeholder), f"{md_file}:{line} 未置換プレースホルダ: {placeholder}")
+        for line, placeholder in matches
+    ]
 
 
-def line_of(text: str, index: int) -> int:
-    return text.count("\n", 0, index) + 1
+def find_placeholders(
+    md_file: Path,
+    large_bytes: int = LARGE_FILE_BYTES,
+    rule: str = "placeholders",
+) -> list[Finding]:
+    return placeholder_findings(md_file, lint_path(md_file, (rule,), large_bytes)[rule])
+
+
+def print_report(findings: list[Finding], file_count: int, truncated: str | None = None) -> int:
+    if findings:
+        print("[ERROR] 未置換プレースホルダを検出しました。")
+        for item in findings:
+            print(f"- {item.display}")
+        if truncated:
+            print(f"[INFO] {len(findings)} 件に達したため、{truncated}。")
+        return 1
+
+    print(f"[OK] 未置換プレースホルダは見つかりませんでした（{file_count} ファイル）")
+    return 0
+
+
+def watch(target: Path, large_bytes: int, rule: str, args: argparse.Namespace) -> int:
+    # 前回の stat 状態と検出結果をメモリに持ち、変わったファイルだけ読み直す
+    memo: dict[Path, tuple[StatState, list[Finding]]] = {}
+
+    def run_cycle() -> list[Finding]:
+        try:
+            markdown_files = list(iter_markdown_files(target, args.include_hidden, args.walk_threads))
+        except ValueError as exc:
+            return [Finding(("target", str(exc)), f"[ERROR] {exc}")]
+        findings: list[Finding] = []
+        for md_file in markdown_files:
+            state = stat_state(str(md_file))
+            cached = memo.get(md_file)
+            if cached is None or cached[0] != state:
+                cached = memo[md_file] = (state, find_placeholders(md_file, large_bytes, rule))
+            findings.extend(cached[1])
+        for stale in memo.keys() - set(markdown_files):
+            del memo[stale]
+        return findings
+
+    if target.is_dir():
+        fingerprint = partial(tree_fingerprint, target, include_hidden=args.include_hidden)
+    else:
+        fingerprint = partial(stat_state, str(target))
+
+    return watch_loop(run_cycle, fingerprint, args.interval, args.debounce)
+
+
+def check_with_catalog(
+    catalog: NoteCatalog,
+    target: Path,
+    markdown_files: list[Path],
+    large_bytes: int,
+    rule: str,
+    max_findings: int | None,
+) -> int:
+    # 変更のないファイルはカタログの結果を使うので、打ち切りの前に全ファイル分をまとめて引く
+    # （全ファイルを検査済みなので、打ち切るのは表示だけ）
+    scope = target if target.is_dir() else None
+    with PROFILE.phase("cache"):
+        linted = catalog.lint_files([str(path) for path in markdown_files], (rule,), large_bytes=large_bytes, scope=scope)
+    findings: list[Finding] = []
+    for md_file, result in zip(markdown_files, linted):
+        if result.error is not None:
+            raise result.error
+        findings.extend(placeholder_findings(md_file, result.hits[rule]))
+    truncated = None
+    if max_findings is not None and len(findings) > max_findings:
+        findings, truncated = findings[:max_findings], HIDDEN_FINDINGS
+    PROFILE.add_cache("catalog", catalog.reused, catalog.parsed)
+    with PROFILE.phase("output"):
+        print(catalog.summary(len(markdown_files)))
+        return print_report(findings, len(markdown_files), truncated)
 
 
 def main() -> int:
@@ -45,7 +196,8 @@ def main() -> int:
     target = Path(args.target).expanduser().resolve()
 
     try:
-        markdown_files = list(iter_markdown_files(target))
+        with PROFILE.phase("walk"):
+            markdown_files = list(iter_markdown_files(target, args.include_hidden, args.walk_threads))
     except ValueError as exc:
         print(f"[ERROR] {exc}")
         return 2
@@ -54,24 +206,40 @@ def main() -> int:
         print(f"[ERROR] Markdown ファイルが見つかりません: {target}")
         return 2
 
-    findings: list[str] = []
-
-    for md_file in markdown_files:
-        text = md_file.read_text(encoding="utf-8")
-        for match in PLACEHOLDER_RE.finditer(text):
-            findings.append(
-                f"{md_file}:{line_of(text, match.start())} 未置換プレースホルダ: {match.group(0)}"
-            )
-
-    if findings:
-        print("[ERROR] 未置換プレースホルダを検出しました。")
-        for item in findings:
-            print(f"- {item}")
-        return 1
+    max_findings = 1 if args.fail_fast else args.max_findings
+    if max_findings is not None and max_findings < 1:
+        print("[ERROR] --max-findings には 1 以上を指定してください。")
+        return 2
 
-    print(f"[OK] 未置換プレースホルダは見つかりませんでした（{len(markdown_files)} ファイル）")
-    return 0
+    large_bytes = int(args.large_file_mb * 1024 * 1024)
+    rule = "known-placeholders" if args.known_only else "placeholders"
+    if args.watch:
+        if args.catalog or args.catalog_file:
+            print("[ERROR] --catalog は --watch と同時に指定できません。")
+            return 2
+        return watch(target, large_bytes, rule, args)
+
+    if args.catalog or args.catalog_file:
+        catalog_file = Path(args.catalog_file).expanduser().resolve() if args.catalog_file else None
+        with PROFILE.phase("cache"):
+            catalog = NoteCatalog.open(target, catalog_file)
+        with catalog:
+            return check_with_catalog(catalog, target, markdown_files, large_bytes, rule, max_findings)
+
+    findings: list[Finding] = []
+    for index, md_file in enumerate(markdown_files, start=1):
+        findings.extend(find_placeholders(md_file, large_bytes, rule))
+        if max_findings is not None and len(findings) >= max_findings:
+            if index < len(markdown_files):
+                truncated = SKIPPED_FILES
+            else:
+                truncated = HIDDEN_FINDINGS if len(findings) > max_findings else None
+            with PROFILE.phase("output"):
+                return print_report(findings[:max_findings], len(markdown_files), truncated)
+
+    with PROFILE.phase("output"):
+        return print_report(findings, len(markdown_files))
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(run_main(main, "check_placeholders"))
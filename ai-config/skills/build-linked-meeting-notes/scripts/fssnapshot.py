@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Directory-listing snapshot used to answer link existence checks without syscalls."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from notewalk import NoteWalker
+
+
+class FsSnapshot:
+    """検査対象ツリーを os.scandir で 1 回だけ走査し、パス -> 種別の表を持つ。
+
+    シンボリックリンクと読めないディレクトリは表に入れず、その配下の問い合わせは
+    従来どおり resolve()/exists()/is_dir() で確認する（結果はメモ化する）。
+    表にない名前も「存在しない」とは決めず実ファイルで確かめる（大文字小文字や NFC/NFD を
+    区別しないファイルシステムでは、書き方の違う名前でも開けるため）。
+    """
+
+    def __init__(self, root: Path, include_hidden: bool = False, threads: int = 1) -> None:
+        self.root = str(root)
+        self.include_hidden = include_hidden
+        self.threads = threads
+        self.scanned = False
+        # path -> ディレクトリなら True、ファイルなら False
+        self.kinds: dict[str, bool] = {}
+        # 表で答えられないディレクトリ（シンボリックリンク・枝刈り・読めないもの）
+        self.opaque: set[str] = set()
+        self.markdown: list[str] = []
+        self._resolved: dict[tuple[str, str], str] = {}
+        self._fallback: dict[str, bool | None] = {}
+        self.hits = 0
+        self.fallbacks = 0
+        self.saved_calls = 0
+
+    def scan(self) -> None:
+        self.kinds[self.root] = True
+        walker = NoteWalker(Path(self.root), include_hidden=self.include_hidden, threads=self.threads)
+        for _, entries in walker.iter_directories():
+            for entry in entries:
+                if entry.is_symlink():
+                    self.opaque.add(entry.path)
+                    if entry.name.endswith(".md") and entry.is_file():
+                        self.markdown.append(entry.path)
+                    continue
+                is_dir = entry.is_dir()
+                self.kinds[entry.path] = is_dir
+                if not is_dir and entry.name.endswith(".md") and entry.is_file():
+                    self.markdown.append(entry.path)
+        # 枝刈りしたディレクトリの中身と読めなかったディレクトリは、実ファイルで確認する
+        self.opaque.update(walker.unreadable)
+        for entry in walker.pruned:
+            if entry.is_symlink() or entry.is_dir():
+                self.opaque.add(entry.path)
+            else:
+                self.kinds[entry.path] = False
+        self.scanned = True
+
+    def markdown_files(self) -> list[Path]:
+        return sorted(Path(path) for path in self.markdown)
+
+    def covers(self, path: str) -> bool:
+        if not self.scanned:
+            return False
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return False
+        if not self.opaque:
+            return True
+        # path 自身と、ルートまでの上位ディレクトリのどれかが opaque なら表では答えない
+        current = path
+        while current != self.root:
+            if current in self.opaque:
+                return False
+            current = os.path.dirname(current)
+        return True
+
+    def resolve(self, directory: str, relative: str) -> str:
+        key = (directory, relative)
+        resolved = self._resolved.get(key)
+        if resolved is not None:
+            self.saved_calls += 1
+            return resolved
+        joined = os.path.join(directory, relative)
+        candidate = os.path.normpath(joined)
+        # シンボリックリンクを含まないと分かっている範囲では normpath と resolve が一致する
+        if self.covers(candidate) and (not self.opaque or self._climbs_known_dirs(directory, relative)):
+            self.saved_calls += 1
+            resolved = candidate
+        else:
+            resolved = str(Path(joined).resolve())
+        self._resolved[key] = resolved
+        return resolved
+
+    def _climbs_known_dirs(self, directory: str, relative: str) -> bool:
+        """relative の .. で戻るディレクトリが、どれも走査済みの実ディレクトリ（またはルートとその上位）か。
+
+        そうなら途中にシンボリックリンクはなく、normpath と resolve が一致する。
+        枝刈りしたフォルダ（.cache など）が表にあっても、そこを通らないリンクは resolve しなくてよい。
+        """
+        parts = Path(relative).parts
+        if ".." not in parts:
+            return True
+        current = directory
+        for part in parts:
+            if part == "..":
+                if not self.kinds.get(current) and not (self.root + os.sep).startswith(current.rstrip(os.sep) + os.sep):
+                    return False
+                current = os.path.dirname(current)
+            elif part != ".":
+                current = os.path.join(current, part)
+        return True
+
+    def kind(self, path: str) -> bool | None:
+        """ディレクトリなら True、ファイルなら False、存在しなければ None。"""
+        is_dir = self.kinds.get(path) if self.covers(path) else None
+        if is_dir is not None:
+            self.hits += 1
+        elif path in self._fallback:
+            is_dir = self._fallback[path]
+        else:
+            self.fallbacks += 1
+            target = Path(path)
+            is_dir = target.is_dir() if target.exists() else None
+            self._fallback[path] = is_dir
+            return is_dir
+        # exists() と、存在すれば is_dir() も省略できた
+        self.saved_calls += 1 if is_dir is None else 2
+        return is_dir
+
+    def summary(self) -> str:
+        return (
+            f"[INFO] スナップショット: エントリ {len(self.kinds)} 件、表で判定 {self.hits} 回、"
+            f"実ファイル確認 {self.fallbacks} 回、"
+            f"省略した resolve/exists/is_dir 呼び出し {self.saved_calls} 回"
+        )
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Atomic file writes shared by the note scripts and their caches."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def temp_path(path: Path) -> Path:
+    """path と同じディレクトリに置く一時ファイルの名前（同時に動く別プロセスと重ならないよう pid 付き）。"""
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def write_atomic(path: Path, text: str) -> None:
+    """一時ファイルに書いてから os.replace で差し替える（途中で止まっても元のファイルが欠けない）。
+
+    既存のファイルがあれば権限を引き継ぐ。失敗したら一時ファイルを消して例外をそのまま上げる。
+    """
+    temp_file = temp_path(path)
+    try:
+        temp_file.write_text(text, encoding="utf-8")
+        try:
+            os.chmod(temp_file, path.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_file, path)
+    except BaseException:
+        temp_file.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Generate a deterministic synthetic Japanese note corpus for benchmarks."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from mdscan import heading_to_anchor
+
+
+# 件数の目安（--size）
+SIZES = {"100": 100, "10k": 10_000, "100k": 100_000}
+CORPUS_VERSION = 1
+# コーパスのルートに置く目印。生成条件が同じなら作り直さずに使い回す
+MARKER_FILE = ".corpus.json"
+DEFAULT_SEED = 20260101
+
+MODE_DIRS = ("一般資料", "PJ特化ノート")
+# 一般資料 : PJ特化ノート のノート数の比
+GENERAL_SHARE = 0.6
+# 1 フォルダのノート数と、番号を選ぶ範囲。create_note.py は最大番号の次から採番するので、90-99 は空けておく
+NOTES_PER_FOLDER = 40
+NUMBER_POOL = range(1, 90)
+LINKS_PER_NOTE = (3, 6)
+# 壊れたリンク（存在しないノート・存在しないアンカー）と未置換プレースホルダを含む割合
+BROKEN_LINK_RATE = 0.01
+PLACEHOLDER_RATE = 0.02
+# コードブロック・コメントの中にリンクや {{...}} に見える文字列を置くノートの割合
+# （check_links.py は読み飛ばし、行単位の validate_note_links.py や check_placeholders.py は拾う）
+LOOKALIKE_RATE = 0.05
+# 全ファイルの mtime をこの時刻にそろえる（生成直後でもキャッシュが記録を信用できるよう、十分過去にする）
+FIXED_MTIME = 1_767_225_600  # 2026-01-01 00:00 UTC
+
+TOPICS = (
+    "検索基盤", "再ランキング", "チャンク分割", "埋め込み", "評価指標", "権限設計", "監査ログ", "コスト試算",
+    "キャッシュ", "障害対応", "データ連携", "OCR取り込み", "プロンプト", "エージェント", "ワークフロー", "運用手順",
+)
+ASPECTS = ("比較", "設計メモ", "検討ログ", "たたき台", "論点整理", "手順", "注意点", "振り返り", "選定理由", "要件整理")
+WORDS = (
+    "前提", "結論", "制約", "要件", "方針", "課題", "対策", "影響範囲", "代替案", "判断基準",
+    "性能", "費用", "保守性", "可用性", "移行", "検証", "段階導入", "優先度", "担当", "期限",
+)
+SENTENCES = (
+    "{a}については{b}を先に確認し、{c}は後で見直す。",
+    "{a}と{b}の関係を整理すると、{c}が最も大きな論点になる。",
+    "現時点の{a}は暫定で、{b}の結果を見て{c}を決める。",
+    "{a}を優先する場合、{b}への影響を{c}の観点で確認する必要がある。",
+    "要確認: {a}の扱いは{b}の担当と{c}までに合意する。",
+    "{a}の選択肢は複数あるが、{b}を考えると{c}が妥当である。",
+)
+CODE_LANGS = ("python", "bash", "json", "yaml")
+# 本文で使う明示アンカー（<a id>）と見出し
+SECTIONS = (
+    ("summary", "全体像（先に結論）"),
+    ("assumptions", "前提"),
+    ("details", "詳細"),
+    ("references", "参考リンク"),
+)
+
+
+class PlannedNote(NamedTuple):
+    path: Path
+    title: str
+    mode: int
+    folder: int
+    # 本文の小見出しと、そこから作られるアンカー（他のノートからのリンク先に使う）
+    heading: str
+    anchor: str
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="ベンチマーク用に、番号付きファイル名・日本語見出し・相互リンク・アンカー・コードブロック・コメント・"
+        "プレースホルダを含むノートの木を決定的に生成する（同じ条件なら毎回同じ内容になる）"
+    )
+    parser.add_argument(
+        "output",
+        type=Path,
+        help="生成先のフォルダ（空か、このスクリプトで生成したフォルダ）",
+    )
+    parser.add_argument(
+        "--size",
+        choices=sorted(SIZES, key=SIZES.__getitem__),
+        default="100",
+        help="ノート数（100 / 10k / 100k。既定 100）",
+    )
+    parser.add_argument(
+        "--notes",
+        type=int,
+        metavar="N",
+        help="ノート数を直接指定する（--size より優先）",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=DEFAULT_SEED,
+        help="乱数の種（既定 %(default)d）",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="同じ条件で生成済みでも作り直す",
+    )
+    return parser.parse_args()
+
+
+def corpus_params(notes: int, seed: int) -> dict[str, int]:
+    return {"version": CORPUS_VERSION, "notes": notes, "seed": seed}
+
+
+def read_marker(root: Path) -> dict[str, int] | None:
+    try:
+        raw = json.loads((root / MARKER_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return raw if isinstance(raw, dict) else None
+
+
+def plan_notes(notes: int, rng: random.Random, root: Path) -> list[PlannedNote]:
+    planned: list[PlannedNote] = []
+    general = round(notes * GENERAL_SHARE) if notes > 1 else notes
+    for mode, count in enumerate((general, notes - general)):
+        mode_dir = root / MODE_DIRS[mode]
+        for folder in range((count + NOTES_PER_FOLDER - 1) // NOTES_PER_FOLDER):
+            in_folder = min(NOTES_PER_FOLDER, count - folder * NOTES_PER_FOLDER)
+            topic = TOPICS[folder % len(TOPICS)]
+            folder_dir = mode_dir / f"{topic}-{folder + 1:04d}"
+            for position, number in enumerate(sorted(rng.sample(NUMBER_POOL, in_folder))):
+                aspect = rng.choice(ASPECTS)
+                title = f"{rng.choice(TOPICS)}の{aspect}（{rng.choice(WORDS)}）{position + 1}"
+                heading = f"{rng.choice(WORDS)}と{rng.choice(WORDS)}の整理"
+                path = folder_dir / f"{number:02d}_{title}.md"
+                planned.append(PlannedNote(path, title, mode, folder, heading, heading_to_anchor(heading)))
+    return planned
+
+
+def sentence(rng: random.Random) -> str:
+    return rng.choice(SENTENCES).format(a=rng.choice(WORDS), b=rng.choice(WORDS), c=rng.choice(WORDS))
+
+
+class Folders(NamedTuple):
+    # (モード, フォルダ番号) -> そのフォルダのノートの添字
+    notes: dict[tuple[int, int], list[int]]
+    # モード -> フォルダの一覧
+    by_mode: dict[int, list[tuple[int, int]]]
+
+
+def index_folders(planned: list[PlannedNote]) -> Folders:
+    folders = Folders({}, {})
+    for index, note in enumerate(planned):
+        key = (note.mode, note.folder)
+        if key not in folders.notes:
+            folders.notes[key] = []
+            folders.by_mode.setdefault(note.mode, []).append(key)
+        folders.notes[key].append(index)
+    return folders
+
+
+def pick_target(rng: random.Random, planned: list[PlannedNote], index: int, folders: Folders) -> int:
+    """半分は同じフォルダ、3 割は同じモードの別フォルダ、残りはどこでも。"""
+    note = planned[index]
+    roll = rng.random()
+    if roll < 0.5:
+        return rng.choice(folders.notes[(note.mode, note.folder)])
+    if roll < 0.8:
+        return rng.choice(folders.notes[rng.choice(folders.by_mode[note.mode])])
+    return rng.randrange(len(planned))
+
+
+def render_note(
+    rng: random.Random,
+    planned: list[PlannedNote],
+    index: int,
+    folders: Folders,
+    root: Path,
+) -> tuple[str, int, int]:
+    """(本文, リンク数, 壊れたリンク数)。"""
+    note = planned[index]
+    directory = note.path.parent
+    mode_readme = os.path.relpath(root / MODE_DIRS[note.mode] / "README.md", directory).replace(os.sep, "/")
+    month, day = rng.randint(1, 12), rng.randint(1, 28)
+
+    links: list[str] = []
+    broken = 0
+    for _ in range(rng.randint(*LINKS_PER_NOTE)):
+        target = planned[pick_target(rng, planned, index, folders)]
+        href = os.path.relpath(target.path, directory).replace(os.sep, "/")
+        kind = rng.random()
+        if rng.random() < BROKEN_LINK_RATE:
+            broken += 1
+            href = href[:-3] + "_削除済み.md" if kind < 0.5 else href + "#no-such-anchor"
+        elif kind < 0.3:
+            href += "#" + rng.choice(SECTIONS)[0]
+        elif kind < 0.5:
+            href += "#" + target.anchor
+        links.append(f"- [{target.title}]({href.replace(' ', '%20')})")
+
+    lines = [
+        f"# {note.title}",
+        "",
+        f"> {MODE_DIRS[note.mode]}トップ: [README]({mode_readme})",
+        "",
+        f"> 目的: {sentence(rng)}",
+        f"> 確認日: 2025-{month:02d}-{day:02d} (JST)",
+        "",
+        "---",
+        "",
+        "## 目次",
+        "",
+        *(f"- [{label}](#{section})" for section, label in SECTIONS),
+        f"- [{note.heading}](#{note.anchor})",
+        "",
+        "---",
+        "",
+    ]
+    for section, label in SECTIONS:
+        lines += [f'<a id="{section}"></a>', f"## {label}", ""]
+        if section == "details":
+            lines += [f"### {note.heading}", ""]
+            lines += [sentence(rng) for _ in range(rng.randint(2, 5))]
+            lines += ["", "関連ノート:", "", *links, ""]
+            lookalike = rng.random() < LOOKALIKE_RATE
+            code_comment = f"# [サンプル](missing/{index}.md) {{{{NOT_A_PLACEHOLDER}}}}" if lookalike else "# サンプル"
+            lines += [f"```{rng.choice(CODE_LANGS)}", code_comment, f"value = {index}", "```", ""]
+            old_link = f"[削除したノート](old/{index}.md)" if lookalike else "削除したノートへのリンクは外した"
+            lines += [f"<!-- 旧リンク: {old_link} -->", ""]
+        elif section == "references":
+            lines += [f"- [公式ドキュメント](https://example.com/docs/{rng.randrange(1000)})", ""]
+        else:
+            lines += [f"- {sentence(rng)}" for _ in range(rng.randint(2, 4))]
+            lines.append("")
+    if rng.random() < PLACEHOLDER_RATE:
+        lines += ["## 未決事項", "", "- 担当: {{OWNER}}、期限: {{DATE_JST}}", ""]
+    return "\n".join(lines), len(links), broken
+
+
+def readme_text(title: str) -> str:
+    return f"# {title}\n\n<!-- AUTO-INDEX:START -->\n<!-- AUTO-INDEX:END -->\n"
+
+
+def generate(root: Path, notes: int, seed: int) -> dict[str, int]:
+    rng = random.Random(seed)
+    planned = plan_notes(notes, rng, root)
+    folders = index_folders(planned)
+
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "README.md").write_text("# ノート\n", encoding="utf-8")
+    directories = {root}
+    for mode_dir in MODE_DIRS:
+        (root / mode_dir).mkdir(exist_ok=True)
+        (root / mode_dir / "README.md").write_text(readme_text(mode_dir), encoding="utf-8")
+        directories.add(root / mode_dir)
+    links = broken = total_bytes = 0
+    for index, note in enumerate(planned):
+        directory = note.path.parent
+        if directory not in directories:
+            directory.mkdir()
+            (directory / "README.md").write_text(readme_text(directory.name), encoding="utf-8")
+            directories.add(directory)
+        text, link_count, broken_count = render_note(rng, planned, index, folders, root)
+        data = text.encode("utf-8")
+        note.path.write_bytes(data)
+        links += link_count
+        broken += broken_count
+        total_bytes += len(data)
+
+    stats = {**corpus_params(notes, seed), "folders": len(directories), "links": links, "broken_links": broken, "bytes": total_bytes}
+    (root / MARKER_FILE).write_text(json.dumps(stats, ensure_ascii=False), encoding="utf-8")
+    pin_mtimes(root)
+    return stats
+
+
+def pin_mtimes(root: Path) -> None:
+    """ファイル・フォルダの mtime を FIXED_MTIME にそろえる（内側から。フォルダの mtime は中身を触ると変わるため）。"""
+    for directory, _, files in os.walk(root, topdown=False):
+        for name in files:
+            os.utime(os.path.join(directory, name), (FIXED_MTIME, FIXED_MTIME))
+        os.utime(directory, (FIXED_MTIME, FIXED_MTIME))
+
+
+def ensure_corpus(root: Path, notes: int, seed: int, force: bool = False) -> tuple[dict[str, int], bool]:
+    """(生成条件と件数, 新しく生成したか)。同じ条件で生成済みなら使い回す。"""
+    marker = read_marker(root)
+    if marker is not None and not force and all(marker.get(key) == value for key, value in corpus_params(notes, seed).items()):
+        return marker, False
+    if root.exists() and any(root.iterdir()):
+        if marker is None:
+            raise SystemExit(f"[ERROR] 生成先が空ではなく、生成済みのコーパスでもありません: {root}")
+        # 以前このスクリプトで生成したフォルダだけを消して作り直す
+        shutil.rmtree(root)
+    return generate(root, notes, seed), True
+
+
+def main() -> int:
+    args = parse_args()
+    notes = args.notes if args.notes is not None else SIZES[args.size]
+    if notes < 1:
+        print("[ERROR] --notes は 1 以上を指定してください")
+        return 2
+    root = args.output.expanduser().resolve()
+    started = time.perf_counter()
+    stats, created = ensure_corpus(root, notes, args.seed, args.force)
+    if not created:
+        print(f"[INFO] 同じ条件のコーパスが生成済みです（作り直す場合は --force）: {root}")
+        return 0
+    print(
+        f"[OK] コーパスを生成しました: {root}（ノート {stats['notes']} 件、フォルダ {stats['folders']} 件、"
+        f"リンク {stats['links']} 本のうち壊れたもの {stats['broken_links']} 本、"
+        f"{stats['bytes'] / 1024 / 1024:.1f} MB、{time.perf_counter() - started:.1f} 秒）"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
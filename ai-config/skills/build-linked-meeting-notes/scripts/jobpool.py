@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""Process-pool helpers shared by the Markdown checkers."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Sequence, TypeVar
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def resolve_jobs(jobs: int) -> int:
+    if jobs == 0:
+        return os.cpu_count() or 1
+    return max(1, jobs)
+
+
+def map_in_pool(func: Callable[[T], R], items: Sequence[T], jobs: int) -> list[R]:
+    """items の順序どおりに func の結果を返す。jobs <= 1 ならプロセスを起動しない。"""
+    if jobs <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+    # 小さなファイルが大量にある前提で、まとめてワーカーへ渡して往復回数を減らす
+    chunksize = max(1, len(items) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=min(jobs, len(items))) as executor:
+        return list(executor.map(func, items, chunksize=chunksize))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Build the note link graph and report backlinks, orphans and clusters as JSON."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import TextIO
+
+import check_links
+from fssnapshot import FsSnapshot
+from fsutil import write_atomic
+from jobpool import resolve_jobs
+from mdscan import LARGE_FILE_BYTES
+from notecatalog import NoteCatalog
+from notegraph import LinkGraph, render_backlinks, with_backlinks
+from notelint import FileLint, lint_files
+
+
+# notelint の規則のうち、このスクリプトが使うもの（title は --write-backlinks のときだけ）
+GRAPH_RULES = ("links", "backlinks-block")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="議事録フォルダのノート間リンクからグラフを作り、被リンク・孤立ノート・相互リンクのまとまりを JSON で出力する。"
+    )
+    parser.add_argument(
+        "target",
+        help="会議フォルダ（またはノートのルートフォルダ）",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="JSON（1 行）の出力先ファイル（省略時は標準出力。このとき [INFO] などは標準エラーへ出す）",
+    )
+    parser.add_argument(
+        "--write-backlinks",
+        action="store_true",
+        help="各ノートの末尾に被リンク欄（<!-- BACKLINKS:START --> 〜 END）を書き込む。被リンクがなくなったノートからは欄を外す",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="--write-backlinks で書き換えるノートの数だけを表示し、書き込まない",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="ノートの共有カタログ（.cache/notes.sqlite3。上位フォルダにあればそれ）を使い、変更ファイルだけ解析し直す",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        help="カタログのファイル（指定時は --catalog を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="N プロセスで並列に解析する（0 で CPU 数。既定 1）",
+    )
+    parser.add_argument(
+        "--large-file-mb",
+        type=float,
+        default=LARGE_FILE_BYTES / 1024 / 1024,
+        metavar="MB",
+        help="このサイズ以上のファイルは丸ごと読まず、mmap して窓ごとに走査する（既定 %(default)g）",
+    )
+    parser.add_argument(
+        "--include-hidden",
+        action="store_true",
+        help="隠しディレクトリ・隠しファイル（. で始まるもの）も対象にする",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    return parser.parse_args()
+
+
+def build_graph(
+    markdown_files: list[Path],
+    linted: list[FileLint],
+    snapshot: FsSnapshot,
+    log: TextIO,
+) -> LinkGraph:
+    graph = LinkGraph([str(path) for path in markdown_files])
+    for source, (md_file, result) in enumerate(zip(markdown_files, linted)):
+        if result.error is not None:
+            print(f"[WARN] 読み込めないためリンクを数えません: {md_file}（{result.error}）", file=log)
+            continue
+        # 自動生成した被リンク欄のリンクは、元のノートへの逆向きの辺になるので数えない
+        block = result.hits["backlinks-block"]
+        directory = str(md_file.parent)
+        for line, link_target in result.hits["links"]:
+            if block is not None and block[0] <= line <= block[1]:
+                continue
+            path_part, _ = check_links.split_fragment(link_target)
+            if path_part:
+                # 存在確認は要らない（ノート一覧にないリンク先は対象外として数える）
+                graph.add(source, line, snapshot.resolve(directory, path_part))
+    return graph
+
+
+def write_backlinks(
+    graph: LinkGraph,
+    linted: list[FileLint],
+    dry_run: bool,
+) -> int:
+    """被リンク欄を書き換えたノートの数。中身が変わらないノートは書き込まない。"""
+    titles = {
+        path: result.hits["title"]
+        for path, result in zip(graph.paths, linted)
+        if result.error is None and result.hits["title"]
+    }
+    changed = 0
+    for node, path in enumerate(graph.paths):
+        result = linted[node]
+        if result.error is not None:
+            continue
+        has_block = result.hits["backlinks-block"] is not None
+        if not graph.reverse[node] and not has_block:
+            continue
+        note = Path(path)
+        text = note.read_text(encoding="utf-8")
+        updated = with_backlinks(text, render_backlinks(graph, node, titles) if graph.reverse[node] else None)
+        if updated == text:
+            continue
+        changed += 1
+        if not dry_run:
+            write_atomic(note, updated)
+    return changed
+
+
+def main() -> int:
+    args = parse_args()
+    target = Path(args.target).expanduser().resolve()
+    if not target.is_dir():
+        print(f"[ERROR] ディレクトリを指定してください: {target}")
+        return 2
+    # JSON を標準出力に出すときは、標準出力を JSON だけにする
+    log = sys.stderr if args.output is None else sys.stdout
+
+    snapshot = FsSnapshot(target, args.include_hidden, args.walk_threads)
+    markdown_files = list(check_links.iter_markdown_files(target, snapshot))
+    if not markdown_files:
+        print(f"[ERROR] Markdown ファイルが見つかりません: {target}", file=log)
+        return 2
+
+    jobs = resolve_jobs(args.jobs)
+    large_bytes = int(args.large_file_mb * 1024 * 1024)
+    rules = GRAPH_RULES + (("title",) if args.write_backlinks else ())
+    paths = [str(path) for path in markdown_files]
+    catalog: NoteCatalog | None = None
+    if args.catalog or args.catalog_file:
+        catalog_file = Path(args.catalog_file).expanduser().resolve() if args.catalog_file else None
+        catalog = NoteCatalog.open(target, catalog_file)
+        linted = catalog.lint_files(paths, rules, jobs, large_bytes, target)
+    else:
+        linted = lint_files(paths, rules, jobs, large_bytes)
+
+    graph = build_graph(markdown_files, linted, snapshot, log)
+    data = graph.to_json(target)
+    report = json.dumps(data, ensure_ascii=False)
+    if args.output is None:
+        print(report)
+    else:
+        output = args.output.expanduser().resolve()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(report + "\n", encoding="utf-8")
+        print(f"[OK] リンクグラフを書き出しました: {output}")
+
+    if catalog is not None:
+        print(catalog.summary(len(markdown_files)), file=log)
+        catalog.close()
+    print(
+        f"[INFO] ノート {len(graph.paths)} 件、ノート間リンク {graph.links} 本（対象外へのリンク {graph.outside} 本）、"
+        f"被リンクなし {len(data['orphans'])} 件、相互に行き来できるまとまり {len(data['clusters'])} 件",
+        file=log,
+    )
+
+    if args.write_backlinks:
+        changed = write_backlinks(graph, linted, args.dry_run)
+        prefix = "[DRY-RUN] 被リンク欄を書き換えるノート" if args.dry_run else "[OK] 被リンク欄を書き換えたノート"
+        print(f"{prefix}: {changed} 件", file=log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""On-disk incremental cache shared by the Markdown link checkers.
+
+Each Markdown file is fingerprinted by (path, mtime, size, content hash).
+Checkers store their per-file link results and anchors here, together with a
+reverse link graph (target -> sources), so that a re-run only re-parses
+changed files and only re-checks links whose target changed or disappeared.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import stat
+from pathlib import Path
+from typing import Any, Iterable
+
+from fsutil import write_atomic
+from mdscan import Source, iter_chunks, open_source
+
+
+CACHE_DIRNAME = ".cache"
+CACHE_VERSION = 1
+
+# 1 要素目: ディレクトリなら 1、2 要素目: mtime_ns、3 要素目: サイズ。存在しなければ None
+StatState = list[int] | None
+
+
+def stat_state(path: str) -> StatState:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [int(stat.S_ISDIR(st.st_mode)), st.st_mtime_ns, st.st_size]
+
+
+def content_digest(data: Source) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in iter_chunks(data):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_cache_dir(target: Path) -> Path:
+    base = target.parent if target.is_file() else target
+    return base / CACHE_DIRNAME
+
+
+class LinkCache:
+    """cache_file が None のときはメモリ上だけで使う（--watch の常駐用）。"""
+
+    def __init__(self, cache_file: Path | None, kind: str) -> None:
+        self.cache_file = cache_file
+        self.kind = kind
+        # path -> {"stat": StatState, "digest": str, "anchors": [...], "links": [...]}
+        self.files: dict[str, dict[str, Any]] = {}
+        # target -> sources（逆リンクグラフ）
+        self.graph: dict[str, set[str]] = {}
+        self.forward: dict[str, set[str]] = {}
+        self.dirty: set[str] = set()
+        self.parsed = 0
+        self.reused = 0
+        self.rechecked_links = 0
+        self._stated: set[str] = set()
+
+    @classmethod
+    def open(cls, cache_dir: Path, kind: str) -> LinkCache:
+        cache = cls(cache_dir / f"{kind}.json", kind)
+        try:
+            raw = json.loads(cache.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cache
+        if raw.get("version") != CACHE_VERSION or raw.get("kind") != kind:
+            return cache
+        cache.files = raw.get("files", {})
+        for target, sources in raw.get("graph", {}).items():
+            cache.graph[target] = set(sources)
+            for source in sources:
+                cache.forward.setdefault(source, set()).add(target)
+        return cache
+
+    def begin_cycle(self) -> None:
+        """同じプロセスで再検査する前に、1 回分の実行状態だけを初期化する。"""
+        self.dirty = set()
+        self._stated = set()
+        self.parsed = 0
+        self.reused = 0
+        self.rechecked_links = 0
+
+    def save(self) -> None:
+        if self.cache_file is None:
+            return
+        graph = {target: sorted(sources) for target, sources in self.graph.items() if sources}
+        files = {
+            path: entry
+            for path, entry in self.files.items()
+            if path in graph or "links" in entry
+        }
+        payload = {"version": CACHE_VERSION, "kind": self.kind, "files": files, "graph": graph}
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.cache_file, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    def refresh(self, sources: Iterable[Path]) -> None:
+        """既知ファイルの stat を取り直し、変更・削除・新規ファイルを dirty に集める。"""
+        current = {str(source) for source in sources}
+        for path in list(self.files):
+            self._restat(path)
+            if path not in current and path in self.forward:
+                # 検査対象から外れたファイルのリンクは逆リンクグラフからも外す
+                self.set_links(path, None, ())
+        for key in current:
+            if key not in self.files:
+                self.files[key] = {"stat": stat_state(key)}
+                self._stated.add(key)
+                self.dirty.add(key)
+
+    def _restat(self, path: str) -> StatState:
+        entry = self.files[path]
+        state = stat_state(path)
+        self._stated.add(path)
+        if state == entry.get("stat"):
+            return state
+        if state is not None and not state[0] and "digest" in entry:
+            try:
+                with open_source(path) as data:
+                    digest = content_digest(data)
+            except OSError:
+                digest = None
+            if digest == entry["digest"]:
+                # touch されただけで内容は同じ
+                entry["stat"] = state
+                return state
+        self.files[path] = {"stat": state}
+        self.dirty.add(path)
+        return state
+
+    def state(self, path: str) -> StatState:
+        """今回の実行で 1 回だけ stat した結果を返す（未知のパスは登録する）。"""
+        if path not in self.files:
+            self.files[path] = {"stat": stat_state(path)}
+            self._stated.add(path)
+            return self.files[path]["stat"]
+        if path not in self._stated:
+            return self._restat(path)
+        return self.files[path]["stat"]
+
+    def record_digest(self, path: str, digest: str) -> None:
+        entry = self.files.setdefault(path, {"stat": stat_state(path)})
+        entry["digest"] = digest
+        self._stated.add(path)
+
+    def cached_links(self, source: str) -> list[list[Any]] | None:
+        if source in self.dirty:
+            return None
+        return self.files.get(source, {}).get("links")
+
+    def set_links(self, source: str, records: list[list[Any]] | None, targets: Iterable[str]) -> None:
+        for target in self.forward.pop(source, ()):
+            self.graph.get(target, set()).discard(source)
+        new_targets = set(targets)
+        if new_targets:
+            self.forward[source] = new_targets
+        for target in new_targets:
+            self.graph.setdefault(target, set()).add(source)
+        entry = self.files.setdefault(source, {"stat": stat_state(source)})
+        if records is None:
+            entry.pop("links", None)
+        else:
+            entry["links"] = records
+
+    def affected_sources(self) -> set[str]:
+        affected: set[str] = set()
+        for target in self.dirty:
+            affected.update(self.graph.get(target, ()))
+        return affected
+
+    def cached_anchors(self, path: str) -> set[str] | None:
+        anchors = self.files.get(path, {}).get("anchors")
+        return None if anchors is None else set(anchors)
+
+    def set_anchors(self, path: str, anchors: set[str]) -> None:
+        self.files.setdefault(path, {"stat": stat_state(path)})["anchors"] = sorted(anchors)
+
+    def summary(self, total_files: int) -> str:
+        return (
+            f"[INFO] キャッシュ: 再解析 {self.parsed} / {total_files} ファイル、"
+            f"再利用 {self.reused} ファイル、再検査リンク {self.rechecked_links} 件"
+        )
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Run the link and placeholder checks over one walk and one read per file."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import check_links
+import check_placeholders
+from fssnapshot import FsSnapshot
+from jobpool import resolve_jobs
+from mdscan import LARGE_FILE_BYTES
+from notecatalog import NoteCatalog
+from notelint import lint_files
+
+
+# 検査名 -> notelint の規則
+CHECKS = {
+    "links": check_links.LINK_RULES,
+    "placeholders": ("placeholders",),
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="リンク・アンカー検証と未置換プレースホルダ検出を、1 回の走査でまとめて行う。"
+    )
+    parser.add_argument(
+        "target",
+        help="会議フォルダ（推奨）または Markdown ファイルのパス",
+    )
+    parser.add_argument(
+        "--checks",
+        default=",".join(CHECKS),
+        help=f"実行する検査をカンマ区切りで指定する（{', '.join(CHECKS)}。既定はすべて）",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="N プロセスで並列に解析する（0 で CPU 数。既定 1）",
+    )
+    parser.add_argument(
+        "--large-file-mb",
+        type=float,
+        default=LARGE_FILE_BYTES / 1024 / 1024,
+        metavar="MB",
+        help="このサイズ以上のファイルは丸ごと読まず、mmap して窓ごとに走査する（既定 %(default)g）",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="ノートの共有カタログ（.cache/notes.sqlite3。上位フォルダにあればそれ）を使い、変更ファイルだけ解析し直す",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        help="カタログのファイル（指定時は --catalog を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--include-hidden",
+        action="store_true",
+        help="隠しディレクトリ・隠しファイル（. で始まるもの）も検査対象にする",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    return parser.parse_args()
+
+
+def parse_checks(value: str) -> list[str]:
+    checks = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in checks if name not in CHECKS]
+    if unknown or not checks:
+        raise ValueError(f"不明な検査です: {', '.join(unknown) or value}（{', '.join(CHECKS)} から選んでください）")
+    return checks
+
+
+def main() -> int:
+    args = parse_args()
+    target = Path(args.target).expanduser().resolve()
+
+    snapshot = FsSnapshot(target, args.include_hidden, args.walk_threads)
+    try:
+        checks = parse_checks(args.checks)
+        markdown_files = list(check_links.iter_markdown_files(target, snapshot))
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        return 2
+
+    if not markdown_files:
+        print(f"[ERROR] Markdown ファイルが見つかりません: {target}")
+        return 2
+
+    rules = tuple(dict.fromkeys(rule for name in checks for rule in CHECKS[name]))
+    large_bytes = int(args.large_file_mb * 1024 * 1024)
+    paths = [str(path) for path in markdown_files]
+    catalog: NoteCatalog | None = None
+    if args.catalog or args.catalog_file:
+        catalog_file = Path(args.catalog_file).expanduser().resolve() if args.catalog_file else None
+        catalog = NoteCatalog.open(target, catalog_file)
+        scope = target if target.is_dir() else None
+        linted = catalog.lint_files(paths, rules, resolve_jobs(args.jobs), large_bytes, scope)
+        print(catalog.summary(len(markdown_files)))
+    else:
+        linted = lint_files(paths, rules, resolve_jobs(args.jobs), large_bytes)
+
+    status = 0
+    if "links" in checks:
+        anchor_table = check_links.AnchorTable({}, large_bytes, catalog)
+        results = check_links.evaluate_links(markdown_files, linted, snapshot, anchor_table)
+        errors, warnings = check_links.collect_findings(markdown_files, results)
+        status = max(status, check_links.print_report(errors, warnings, len(markdown_files)))
+    if "placeholders" in checks:
+        findings = []
+        for md_file, result in zip(markdown_files, linted):
+            if result.error is not None:
+                raise result.error
+            findings.extend(check_placeholders.placeholder_findings(md_file, result.hits["placeholders"]))
+        status = max(status, check_placeholders.print_report(findings, len(markdown_files)))
+    if catalog is not None:
+        catalog.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""Single-pass Markdown scanner shared by the meeting-notes checkers."""
+
+from __future__ import annotations
+
+import codecs
+import mmap
+import os
+import re
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
+
+
+# リンク・見出し・HTML アンカーを 1 回の走査で拾う結合パターン。
+# 全体を先読みにしているので、種類の異なるトークン同士が重なっていても取りこぼさない。
+# 先頭の文字クラスで候補位置以外を素早く読み飛ばす。
+TOKEN_RE = re.compile(
+    r"(?=[\[#<])(?="
+    r"(?P<link>(?<!!)\[[^\]]*\]\((?P<link_target>[^)]+)\))"
+    r"|(?P<heading>^#{1,6}\s+(?P<heading_text>.+?)\s*$)"
+    r"|(?P<anchor>(?i:<a\s+[^>]*(?:id|name)\s*=\s*['\"](?P<anchor_id>[^'\"]+)['\"][^>]*>))"
+    r")",
+    re.MULTILINE,
+)
+
+COMMENT_OPEN = "<!--"
+COMMENT_CLOSE = "-->"
+FENCE = "```"
+
+# これ以上のサイズのファイルは丸ごと読まず、mmap して窓ごとに走査する
+LARGE_FILE_BYTES = 32 * 1024 * 1024
+WINDOW_BYTES = 4 * 1024 * 1024
+# 窓の末尾のこの文字数は確定させず、次の窓とつなげて読み直す
+WINDOW_OVERLAP = 64 * 1024
+
+NONSPACE_RE = re.compile(r"\S")
+ANCHOR_CANDIDATE_RE = re.compile(r"<(?:[aA](?:\s|\Z)|\Z)")
+
+# 小さいファイルは bytes、大きいファイルは読み取り専用の mmap
+Source = bytes | mmap.mmap
+
+SLUG_CODE_RE = re.compile(r"`([^`]*)`")
+SLUG_LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+SLUG_TAG_RE = re.compile(r"<[^>]+>")
+SLUG_DROP_RE = re.compile(r"[^\w\u3040-\u30ff\u3400-\u9fff\s-]")
+SLUG_SPACE_RE = re.compile(r"\s+")
+
+
+class Token(NamedTuple):
+    start: int
+    end: int
+    value: str
+
+
+class LineIndex:
+    """改行位置の表を一度だけ作り、オフセットから行番号を二分探索で引く。"""
+
+    def __init__(self, text: str) -> None:
+        offsets: list[int] = []
+        find = text.find
+        pos = find("\n")
+        while pos != -1:
+            offsets.append(pos)
+            pos = find("\n", pos + 1)
+        self.offsets = offsets
+
+    def line_of(self, index: int) -> int:
+        return bisect_left(self.offsets, index) + 1
+
+
+class TokenLines:
+    """窓ごとに走査した結果用。本文を持たないので、トークン開始位置 -> 行番号の表で引く。"""
+
+    def __init__(self) -> None:
+        self.lines: dict[int, int] = {}
+
+    def line_of(self, index: int) -> int:
+        return self.lines[index]
+
+
+@dataclass
+class ScanResult:
+    text: str
+    masked: str
+    links: list[Token] = field(default_factory=list)
+    headings: list[Token] = field(default_factory=list)
+    html_anchors: list[Token] = field(default_factory=list)
+    _line_index: LineIndex | TokenLines | None = field(default=None, repr=False)
+
+    def line_of(self, index: int) -> int:
+        if self._line_index is None:
+            self._line_index = LineIndex(self.text)
+        return self._line_index.line_of(index)
+
+    def anchors(self) -> set[str]:
+        anchors = {token.value for token in self.html_anchors}
+        for token in self.headings:
+            anchor = heading_to_anchor(token.value)
+            if anchor:
+                anchors.add(anchor)
+        return anchors
+
+
+def decode_text(data: bytes) -> str:
+    # Path.read_text と同じく、改行コードを \n にそろえる
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+@contextmanager
+def open_source(path: Path | str, large_bytes: int = LARGE_FILE_BYTES) -> Iterator[Source]:
+    """large_bytes 未満のファイルは bytes で、それ以上は mmap で渡す。"""
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size < large_bytes or size == 0:
+            yield handle.read()
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def release(buffer: Source, start: int, end: int) -> None:
+    """走査し終えた mmap の範囲をプロセスから外す（mmap のページも RSS に数えられるため）。"""
+    if not isinstance(buffer, mmap.mmap) or not hasattr(mmap, "MADV_DONTNEED"):
+        return
+    start -= start % mmap.PAGESIZE
+    if end > start:
+        buffer.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+
+def iter_chunks(buffer: Source, window: int = WINDOW_BYTES) -> Iterator[bytes]:
+    if isinstance(buffer, bytes):
+        yield buffer
+        return
+    for start in range(0, len(buffer), window):
+        end = min(start + window, len(buffer))
+        chunk = buffer[start:end]
+        release(buffer, start, end)
+        yield chunk
+
+
+def paged_find(buffer: mmap.mmap, sub: bytes, start: int) -> int:
+    # 遠くまで探すときは窓ごとに区切り、見つからなかった範囲のページを手放しながら進む。
+    # 近くで見つかった範囲は、後で iter_windows が読み終えたときに手放す
+    size = len(buffer)
+    while start < size:
+        end = min(start + WINDOW_BYTES + len(sub) - 1, size)
+        found = buffer.find(sub, start, end)
+        if found != -1:
+            return found
+        release(buffer, start, end)
+        start += WINDOW_BYTES
+    return -1
+
+
+def iter_ignored_regions(text: str | Source) -> Iterator[tuple[int, int]]:
+    """HTML コメントとフェンスコードの範囲を左から 1 回の走査で、開始位置の順に返す。
+
+    コメントはフェンスより優先し、コメント内の ``` はフェンスの開閉に数えない。
+    閉じられていないコメント・フェンスは対象外（従来の正規表現と同じ扱い）。
+    bytes / mmap を渡すとバイトオフセットで返す（区切り記号は改行を含まないので、
+    改行コードをそろえる前でも同じ範囲になる）。
+    """
+    if isinstance(text, str):
+        comment_open, comment_close, fence = COMMENT_OPEN, COMMENT_CLOSE, FENCE
+    else:
+        comment_open, comment_close, fence = (
+            COMMENT_OPEN.encode(),
+            COMMENT_CLOSE.encode(),
+            FENCE.encode(),
+        )
+    find = partial(paged_find, text) if isinstance(text, mmap.mmap) else text.find
+    pos = 0
+    fence_start = -1
+    comments_open = True
+    # 開いたフェンスの中のコメント。フェンスが閉じればフェンス側の範囲に含まれる
+    fenced_comments: list[tuple[int, int]] = []
+
+    while True:
+        comment_at = find(comment_open, pos) if comments_open else -1
+        fence_at = find(fence, pos)
+        if comment_at == -1 and fence_at == -1:
+            break
+
+        if comment_at != -1 and (fence_at == -1 or comment_at < fence_at):
+            close_at = find(comment_close, comment_at + len(comment_open))
+            if close_at == -1:
+                # 閉じが無いコメントは成立せず、それ以降のコメントも成立しない
+                comments_open = False
+                continue
+            pos = close_at + len(comment_close)
+            if fence_start == -1:
+                yield comment_at, pos
+            else:
+                fenced_comments.append((comment_at, pos))
+            continue
+
+        pos = fence_at + len(fence)
+        if fence_start == -1:
+            fence_start = fence_at
+        else:
+            yield fence_start, pos
+            fence_start = -1
+            fenced_comments.clear()
+
+    # 閉じられなかったフェンスの中のコメントは、そのまま有効
+    yield from fenced_comments
+
+
+def ignored_regions(text: str | Source) -> list[tuple[int, int]]:
+    return list(iter_ignored_regions(text))
+
+
+def _blank(segment: str) -> str:
+    # 行番号を維持するため、改行以外を空白に置換する
+    return "\n".join(" " * len(part) for part in segment.split("\n"))
+
+
+def mask_ignored_regions(text: str) -> str:
+    regions = ignored_regions(text)
+    if not regions:
+        return text
+    parts: list[str] = []
+    last = 0
+    for start, end in regions:
+        parts.append(text[last:start])
+        parts.append(_blank(text[start:end]))
+        last = end
+    parts.append(text[last:])
+    return "".join(parts)
+
+
+@lru_cache(maxsize=8192)
+def heading_to_anchor(heading_text: str) -> str:
+    text = heading_text.strip().lower()
+    text = SLUG_CODE_RE.sub(r"\1", text)
+    text = SLUG_LINK_RE.sub(r"\1", text)
+    text = SLUG_TAG_RE.sub("", text)
+    text = SLUG_DROP_RE.sub("", text)
+    text = SLUG_SPACE_RE.sub("-", text).strip("-")
+    return text
+
+
+def _take_token(result: ScanResult, match: re.Match[str], shift: int, ends: dict[str, int]) -> bool:
+    """種類ごとに直前トークンの終端を覚え、種類別に finditer した場合と同じ非重複の結果にする。"""
+    pos = match.start() + shift
+    kind = match.lastgroup
+    if pos < ends[kind]:
+        return False
+    end = ends[kind] = match.end(kind) + shift
+    if kind == "link":
+        result.links.append(Token(pos, end, match.group("link_target")))
+    elif kind == "heading":
+        result.headings.append(Token(pos, end, match.group("heading_text")))
+    else:
+        result.html_anchors.append(Token(pos, end, match.group("anchor_id")))
+    return True
+
+
+def scan_markdown(text: str) -> ScanResult:
+    return scan_masked(text, mask_ignored_regions(text))
+
+
+def scan_masked(text: str, masked: str) -> ScanResult:
+    """mask_ignored_regions(text) 済みの masked からリンク・見出し・アンカーを拾う。"""
+    result = ScanResult(text=text, masked=masked)
+    ends = {"link": 0, "heading": 0, "anchor": 0}
+    for match in TOKEN_RE.finditer(masked):
+        _take_token(result, match, 0, ends)
+    return result
+
+
+def _window_end(buffer: Source, start: int, window: int, line_aligned: bool) -> int:
+    end = start + window
+    size = len(buffer)
+    if end >= size:
+        return size
+    if line_aligned:
+        newline = buffer.find(b"\n", end)
+        return size if newline == -1 else newline + 1
+    newline = buffer.find(b"\n", end, end + window)
+    if newline != -1:
+        return newline + 1
+    # 改行が見つからない長大行は、UTF-8 の文字の途中を避けて切る（\r\n の間にはならない）
+    while end < size and buffer[end] & 0xC0 == 0x80:
+        end += 1
+    return end
+
+
+def iter_window_bounds(
+    buffer: Source,
+    window: int = WINDOW_BYTES,
+    line_aligned: bool = True,
+) -> Iterator[tuple[int, int]]:
+    """line_aligned なら窓は必ず行末で切る（1 行が窓より長ければ窓を広げる）。
+    そうでなければ長大行の途中でも切る。
+    """
+    size = len(buffer)
+    pos = 0
+    while pos < size:
+        end = _window_end(buffer, pos, window, line_aligned)
+        yield pos, end
+        pos = end
+
+
+def iter_windows(
+    buffer: Source,
+    regions: Iterable[tuple[int, int]] = (),
+    window: int = WINDOW_BYTES,
+    line_aligned: bool = True,
+) -> Iterator[str]:
+    """buffer を改行コードをそろえた文字列の窓に分けて返す。regions（開始順のバイト範囲）は空白化する。"""
+    pending = iter(regions)
+    region = next(pending, None)
+    for pos, end in iter_window_bounds(buffer, window, line_aligned):
+        parts: list[str] = []
+        cursor = pos
+        while region is not None and region[0] < end:
+            start, stop = region
+            if start > cursor:
+                parts.append(decode_text(buffer[cursor:start]))
+                cursor = start
+            cut = min(stop, end)
+            parts.append(_blank(decode_text(buffer[cursor:cut])))
+            cursor = cut
+            if stop > end:
+                break
+            region = next(pending, None)
+        if cursor < end:
+            parts.append(decode_text(buffer[cursor:end]))
+        release(buffer, pos, end)
+        yield "".join(parts)
+
+
+def iter_source_lines(data: Source) -> Iterator[str]:
+    """str.splitlines() と同じ行分割を、大きなファイルでは窓ごとに行う。"""
+    if isinstance(data, bytes):
+        yield from decode_text(data).splitlines()
+        return
+    for text in iter_windows(data):
+        # 窓は行末で切っているので、窓ごとの splitlines をつなげても全体と同じになる
+        yield from text.splitlines()
+
+
+def lines_of_offsets(buffer: Source, offsets: Iterable[int], window: int = WINDOW_BYTES) -> list[int]:
+    """昇順のバイトオフセットそれぞれの行番号を、窓ごとに改行を数えて求める。
+
+    read_text と同じく \r\n・\r・\n を 1 つの改行と数え、途中で全体を UTF-8 として
+    検証する（不正なら UnicodeDecodeError）。
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    breaks = 0
+    pos = 0
+    ends_with_cr = False
+
+    def advance(stop: int) -> None:
+        nonlocal breaks, pos, ends_with_cr
+        while pos < stop:
+            end = min(pos + window, stop)
+            piece = buffer[pos:end]
+            decoder.decode(piece)
+            breaks += piece.count(b"\n") + piece.count(b"\r") - piece.count(b"\r\n")
+            if ends_with_cr and piece.startswith(b"\n"):
+                # 窓の境目で分かれた \r\n は 1 つの改行
+                breaks -= 1
+            ends_with_cr = piece.endswith(b"\r")
+            release(buffer, pos, end)
+            pos = end
+
+    lines: list[int] = []
+    for offset in offsets:
+        advance(offset)
+        lines.append(breaks + 1)
+    advance(len(buffer))
+    decoder.decode(b"", final=True)
+    return lines
+
+
+def _first_unsettled_link(text: str) -> int:
+    """照合が text の末尾に届きうる [ の最小位置（なければ -1）。
+
+    [ からの照合は最初の ] で決まり、その直後が ( なら次の ) まで伸びる。
+    """
+    # 後ろに ) が無い "](" か、末尾の ] で終わる候補は確定しない
+    unsettled_close = text.find("](", max(0, text.rfind(")") - 1))
+    if unsettled_close == -1 and text.endswith("]"):
+        unsettled_close = len(text) - 1
+    # 手前の ] より後ろの [ は、すべて unsettled_close（無ければ末尾）まで照合が伸びる
+    if unsettled_close == -1:
+        previous_close = text.rfind("]")
+    else:
+        previous_close = text.rfind("]", 0, unsettled_close)
+    return text.find("[", max(1, previous_close + 1))
+
+
+def _heading_settled(text: str, pos: int) -> bool:
+    # 見出し本文の行の後ろに空白以外の文字があれば、末尾の \s*$ もそこで止まる
+    while pos < len(text) and text[pos] == "#":
+        pos += 1
+    content = NONSPACE_RE.search(text, pos)
+    if content is None:
+        return False
+    line_end = text.find("\n", content.start())
+    return line_end != -1 and NONSPACE_RE.search(text, line_end) is not None
+
+
+def _quote_after(text: str, pos: int) -> int:
+    found = [at for at in (text.find("'", pos), text.find('"', pos)) if at != -1]
+    return min(found) if found else -1
+
+
+def _anchor_settled(text: str, pos: int) -> bool:
+    tag_end = text.find(">", pos)
+    if tag_end == -1:
+        return False
+    last_quote = max(text.rfind("'", pos, tag_end), text.rfind('"', pos, tag_end))
+    if last_quote == -1:
+        return True
+    # 属性値 [^'"]+ はタグの > を越えうるので、閉じ引用符とその後の > まで必要
+    closing = _quote_after(text, last_quote + 1)
+    return closing != -1 and text.find(">", closing + 1) != -1
+
+
+def _settled_limit(text: str, limit: int) -> int:
+    """limit より前の全位置で、トークンの照合が text の中だけで決まるように limit を下げる。
+
+    見出しは後ろの候補ほど照合範囲が伸びるので最後の候補だけ調べればよい。
+    アンカーはそうならないので、候補をすべて調べる。
+    """
+    link = _first_unsettled_link(text)
+    if link != -1:
+        limit = min(limit, link)
+    while True:
+        last_heading = text.rfind("\n#", 0, limit)
+        if last_heading != -1 and not _heading_settled(text, last_heading + 1):
+            limit = last_heading + 1
+            continue
+        for match in ANCHOR_CANDIDATE_RE.finditer(text, 1):
+            if match.start() >= limit:
+                return limit
+            if not _anchor_settled(text, match.start()):
+                limit = match.start()
+                break
+        else:
+            return limit
+
+
+def scan_markdown_windows(
+    buffer: Source,
+    window: int = WINDOW_BYTES,
+    overlap: int = WINDOW_OVERLAP,
+) -> ScanResult:
+    """scan_markdown と同じ結果を、ファイル全体を文字列にせず窓ごとの走査で求める。
+
+    窓の末尾 overlap 文字と、照合が窓の外に及びうる候補位置以降は確定させず、
+    次の窓につなげて読み直す。先頭には直前の 1 文字を置き、^ と後読みを正しく判定させる。
+    メモリをファイルサイズに比例させないため、行番号はリンクの分だけ持ち、
+    見出しと HTML アンカーは同じ値の 2 件目以降を捨てる（anchors() の結果は変わらない）。
+    """
+    lines = TokenLines()
+    result = ScanResult(text="", masked="", _line_index=lines)
+    ends = {"link": 0, "heading": 0, "anchor": 0}
+    seen: dict[str, set[str]] = {"heading": set(), "anchor": set()}
+    regions = iter_ignored_regions(buffer)
+    carry = "\n"
+    base = 0
+    base_line = 1
+
+    for chunk in chain(iter_windows(buffer, regions, line_aligned=False, window=window), [None]):
+        text = carry if chunk is None else carry + chunk
+        if chunk is None:
+            limit = len(text)
+        else:
+            limit = _settled_limit(text, max(1, len(text) - overlap))
+        index = None
+        for match in TOKEN_RE.finditer(text, 1):
+            local = match.start()
+            if local >= limit:
+                break
+            if not _take_token(result, match, base - 1, ends):
+                continue
+            kind = match.lastgroup
+            if kind == "link":
+                if index is None:
+                    index = LineIndex(text)
+                lines.lines[base + local - 1] = base_line + index.line_of(local) - index.line_of(1)
+                continue
+            tokens = result.headings if kind == "heading" else result.html_anchors
+            if tokens[-1].value in seen[kind]:
+                tokens.pop()
+            else:
+                seen[kind].add(tokens[-1].value)
+        base_line += text.count("\n", 1, limit)
+        base += limit - 1
+        carry = text[limit - 1 :]
+    return result
+
+
+def scan_source(data: Source) -> ScanResult:
+    if isinstance(data, bytes):
+        return scan_markdown(decode_text(data))
+    return scan_markdown_windows(data)
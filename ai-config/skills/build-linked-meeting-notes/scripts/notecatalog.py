@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""SQLite note catalog shared by the note scripts (standard library only).
+
+One database per note tree holds, per Markdown file, its fingerprint
+(mtime, size, content hash) and the notelint results the scripts asked for,
+plus indexed tables for titles, anchors, links, placeholders and numbered
+note files. Scripts hand their file list to NoteCatalog.lint_files() in place
+of notelint.lint_files(): unchanged files are answered from the database and
+only new or changed files are read again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from mdscan import LARGE_FILE_BYTES
+from notelint import FileLint, lint_files
+
+
+CATALOG_DIRNAME = ".cache"
+CATALOG_FILENAME = "notes.sqlite3"
+# スキーマを変えたら上げる（古いカタログは作り直す）
+SCHEMA_VERSION = 1
+
+NUMBERED_NOTE_RE = re.compile(r"^(\d{2})_.*\.md$")
+# mtime の分解能が粗いファイルシステムで、走査直後の追加を見落とさないための猶予
+# （記録時刻とこれ以上離れていない mtime の記録は信用しない。検索索引・採番インデックスも同じ値を使う）
+MTIME_SETTLE_NS = 2_000_000_000
+# path IN (...) で一度に引くパスの数（古い SQLite の変数上限 999 より小さく）
+QUERY_BATCH = 500
+
+# 規則名 -> 正規化した表。lint 表の JSON はそのまま呼び出し側へ返し、こちらは問い合わせ用
+LINK_RULES = ("links", "absolute", "note-links")
+PLACEHOLDER_RULES = ("placeholders", "known-placeholders")
+
+SCHEMA = """
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    scanned_ns INTEGER NOT NULL,
+    digest TEXT,
+    title TEXT
+);
+CREATE TABLE lint (
+    path TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    hits TEXT NOT NULL,
+    PRIMARY KEY (path, rule)
+) WITHOUT ROWID;
+CREATE TABLE anchors (
+    path TEXT NOT NULL,
+    anchor TEXT NOT NULL,
+    PRIMARY KEY (path, anchor)
+) WITHOUT ROWID;
+CREATE TABLE links (
+    source TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    rule TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE INDEX links_target ON links (target);
+CREATE INDEX links_source ON links (source);
+CREATE TABLE placeholders (
+    path TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    rule TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX placeholders_path ON placeholders (path);
+CREATE TABLE directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    scanned_ns INTEGER NOT NULL
+);
+CREATE TABLE numbers (
+    directory TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (directory, number, name)
+) WITHOUT ROWID;
+"""
+
+TABLES = ("files", "lint", "anchors", "links", "placeholders", "directories", "numbers")
+
+
+def locate_catalog(start: Path) -> Path:
+    """start から上位へたどり、既存のカタログがあればそれを、なければ start の .cache/ に置くパスを返す。"""
+    base = start if start.is_dir() else start.parent
+    for directory in (base, *base.parents):
+        candidate = directory / CATALOG_DIRNAME / CATALOG_FILENAME
+        if candidate.is_file():
+            return candidate
+    return base / CATALOG_DIRNAME / CATALOG_FILENAME
+
+
+def under(scope: Path) -> tuple[str, str]:
+    """scope 配下のパスを表す範囲 [low, high)。"/" の次の文字は "0" なので、主キーの範囲検索になる。"""
+    prefix = str(scope).rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def open_database(
+    db_file: Path, schema: str, version: int, tables: Iterable[str], cache_kib: int | None = None
+) -> sqlite3.Connection:
+    """db_file を開く。user_version が version と違えば tables を捨てて schema で作り直す。
+
+    カタログと検索索引（notesearch.py）で共通。
+    """
+    db_file.parent.mkdir(parents=True, exist_ok=True)
+    # 複数のスクリプトが同時に開いても待ち合わせられるようにする
+    conn = sqlite3.connect(str(db_file), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if cache_kib is not None:
+        conn.execute(f"PRAGMA cache_size = -{cache_kib}")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != version:
+        _create_schema(conn, schema, version, tables)
+    return conn
+
+
+def _create_schema(conn: sqlite3.Connection, schema: str, version: int, tables: Iterable[str]) -> None:
+    # 同時に開いた別プロセスと作成が重ならないよう、書き込みロックを取ってから版を確かめ直す
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] != version:
+            for table in tables:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in schema.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def link_target(source: str, rule: str, raw: str) -> str:
+    """リンク (raw) の行き先を、source からの正規化した絶対パスにする（アンカーは除く）。"""
+    path_part = raw.split("#", 1)[0]
+    if not path_part:
+        return source
+    if rule == "absolute":
+        return os.path.normpath(path_part)
+    return os.path.normpath(os.path.join(os.path.dirname(source), path_part))
+
+
+class NoteCatalog:
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = db_file
+        self.conn = open_database(db_file, SCHEMA, SCHEMA_VERSION, TABLES)
+        self.parsed = 0
+        self.reused = 0
+        self.removed = 0
+
+    @classmethod
+    def open(cls, start: Path, db_file: Path | None = None) -> NoteCatalog:
+        return cls(db_file or locate_catalog(start))
+
+    def __enter__(self) -> NoteCatalog:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    # --- ファイルごとの解析結果 ---
+
+    def lint_files(
+        self,
+        paths: list[str],
+        rules: Iterable[str],
+        jobs: int = 1,
+        large_bytes: int = LARGE_FILE_BYTES,
+        scope: Path | None = None,
+    ) -> list[FileLint]:
+        """notelint.lint_files と同じ結果を返す。stat が記録と同じで規則がそろっているファイルは読まない。
+
+        scope を渡すと、その配下で paths に含まれず、ディスクからも消えたファイルをカタログから外す。
+        """
+        rules = tuple(rules)
+        known = self._fingerprints(paths)
+        stored = self._stored_rules(paths)
+        results: dict[str, FileLint] = {}
+        stale: list[str] = []
+        stats: dict[str, os.stat_result] = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append(path)
+                continue
+            stats[path] = st
+            record = known.get(path)
+            if (
+                record is not None
+                and record[:2] == (st.st_mtime_ns, st.st_size)
+                and record[2] - st.st_mtime_ns >= MTIME_SETTLE_NS
+                and stored.get(path, set()).issuperset(rules)
+            ):
+                results[path] = FileLint(record[3], self._hits(path, rules))
+                self.reused += 1
+            else:
+                stale.append(path)
+
+        if stale:
+            # 他のスクリプトが記録した規則も取り直し、カタログの中身を同じ版にそろえる
+            all_rules = tuple(dict.fromkeys([*rules, *(rule for path in stale for rule in stored.get(path, ()))]))
+            linted = lint_files(stale, all_rules, jobs, large_bytes, with_digest=True)
+            with self.conn:
+                for path, result in zip(stale, linted):
+                    self.parsed += 1
+                    if result.error is None and path in stats:
+                        self._store(path, stats[path], result)
+                    results[path] = FileLint(
+                        result.digest,
+                        {rule: result.hits[rule] for rule in rules} if result.error is None else {},
+                        result.error,
+                    )
+
+        if scope is not None:
+            self.forget_missing(scope, paths)
+        self.conn.commit()
+        return [results[path] for path in paths]
+
+    def _rows_for(self, query: str, paths: list[str]) -> Iterator[tuple[Any, ...]]:
+        """query の {marks} を path の IN 句にして、paths の行だけを主キーで引く。"""
+        for start in range(0, len(paths), QUERY_BATCH):
+            batch = paths[start:start + QUERY_BATCH]
+            yield from self.conn.execute(query.format(marks=",".join("?" * len(batch))), batch)
+
+    def _fingerprints(self, paths: list[str]) -> dict[str, tuple[int, int, int, str | None]]:
+        """パス -> (mtime_ns, サイズ, 記録した時刻, 内容ハッシュ)。"""
+        rows = self._rows_for("SELECT path, mtime_ns, size, scanned_ns, digest FROM files WHERE path IN ({marks})", paths)
+        return {row[0]: row[1:] for row in rows}
+
+    def _stored_rules(self, paths: list[str]) -> dict[str, set[str]]:
+        stored: dict[str, set[str]] = {}
+        for path, rule in self._rows_for("SELECT path, rule FROM lint WHERE path IN ({marks})", paths):
+            stored.setdefault(path, set()).add(rule)
+        return stored
+
+    def _hits(self, path: str, rules: tuple[str, ...]) -> dict[str, Any]:
+        rows = self.conn.execute(
+            f"SELECT rule, hits FROM lint WHERE path = ? AND rule IN ({','.join('?' * len(rules))})",
+            (path, *rules),
+        )
+        # JSON ではタプルがリストになるので、notelint の結果と同じ形に戻す
+        return {rule: restore_hits(json.loads(hits)) for rule, hits in rows}
+
+    def _store(self, path: str, st: os.stat_result, result: FileLint) -> None:
+        self._delete(path)
+        hits = result.hits
+        self.conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, scanned_ns, digest, title) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, st.st_mtime_ns, st.st_size, time.time_ns(), result.digest, hits.get("title")),
+        )
+        self.conn.executemany(
+            "INSERT INTO lint (path, rule, hits) VALUES (?, ?, ?)",
+            [(path, rule, json.dumps(value, ensure_ascii=False)) for rule, value in hits.items()],
+        )
+        if "anchors" in hits:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO anchors (path, anchor) VALUES (?, ?)",
+                [(path, anchor) for anchor in hits["anchors"]],
+            )
+        self.conn.executemany(
+            "INSERT INTO links (source, line, rule, raw, target) VALUES (?, ?, ?, ?, ?)",
+            [
+                (path, line, rule, raw, link_target(path, rule, raw))
+                for rule in LINK_RULES
+                for line, raw in hits.get(rule, ())
+            ],
+        )
+        self.conn.executemany(
+            "INSERT INTO placeholders (path, line, rule, text) VALUES (?, ?, ?, ?)",
+            [(path, line, rule, text) for rule in PLACEHOLDER_RULES for line, text in hits.get(rule, ())],
+        )
+
+    def _delete(self, path: str) -> None:
+        self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM lint WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM anchors WHERE path = ?", (path,))
+        self.conn.execute("DELETE FROM links WHERE source = ?", (path,))
+        self.conn.execute("DELETE FROM placeholders WHERE path = ?", (path,))
+
+    def forget_missing(self, scope: Path, present: Iterable[str]) -> None:
+        # 走査の条件（隠しフォルダを含めるか等）はスクリプトごとに違うので、
+        # 今回の一覧にないだけのファイルは残し、実際に消えたものだけを外す
+        low, high = under(scope)
+        keep = set(present)
+        rows = self.conn.execute("SELECT path FROM files WHERE path >= ? AND path < ?", (low, high)).fetchall()
+        with self.conn:
+            for (path,) in rows:
+                if path not in keep and not os.path.exists(path):
+                    self.removed += 1
+                    self._delete(path)
+
+    def titles(
+        self,
+        paths: list[Path],
+        jobs: int = 1,
+        large_bytes: int = LARGE_FILE_BYTES,
+        scope: Path | None = None,
+    ) -> dict[Path, str]:
+        """README 索引用のタイトル。見出しがなければファイル名（拡張子なし）。"""
+        linted = self.lint_files([str(path) for path in paths], ("title",), jobs, large_bytes, scope)
+        return {
+            path: (result.hits.get("title") if result.error is None else None) or path.stem
+            for path, result in zip(paths, linted)
+        }
+
+    # --- 問い合わせ ---
+
+    def links_into(self, target: Path) -> list[tuple[str, int, str, str]]:
+        """target へ向かうリンク (リンク元, 行番号, 規則, リンク) の一覧。target の索引で引く。"""
+        rows = self.conn.execute(
+            "SELECT source, line, rule, raw FROM links WHERE target = ? ORDER BY source, line",
+            (str(target),),
+        )
+        return rows.fetchall()
+
+    def anchors_of(self, path: Path) -> set[str]:
+        return {anchor for (anchor,) in self.conn.execute("SELECT anchor FROM anchors WHERE path = ?", (str(path),))}
+
+    def placeholders_under(self, scope: Path) -> list[tuple[str, int, str, str]]:
+        low, high = under(scope)
+        rows = self.conn.execute(
+            "SELECT path, line, rule, text FROM placeholders WHERE path >= ? AND path < ? ORDER BY path, line",
+            (low, high),
+        )
+        return rows.fetchall()
+
+    # --- 採番 ---
+
+    def record_numbers(self, directory: Path, mtime_ns: int, used: Iterable[tuple[int, str]]) -> None:
+        key = str(directory)
+        with self.conn:
+            self.conn.execute("DELETE FROM numbers WHERE directory = ?", (key,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO numbers (directory, number, name) VALUES (?, ?, ?)",
+                [(key, number, name) for number, name in used],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO directories (path, mtime_ns, scanned_ns) VALUES (?, ?, ?)",
+                (key, mtime_ns, time.time_ns()),
+            )
+
+    def refresh_numbers(self, directory: Path) -> None:
+        """ディレクトリの mtime が記録と同じなら何もしない。変わっていればファイル名だけ一覧し直す。"""
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            return
+        row = self.conn.execute(
+            "SELECT mtime_ns, scanned_ns FROM directories WHERE path = ?", (str(directory),)
+        ).fetchone()
+        if row is not None and row[0] == mtime_ns and row[1] - mtime_ns >= MTIME_SETTLE_NS:
+            return
+        used: list[tuple[int, str]] = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                match = NUMBERED_NOTE_RE.match(entry.name)
+                if match:
+                    used.append((int(match.group(1)), entry.name))
+        self.record_numbers(directory, mtime_ns, used)
+
+    def used_numbers(self, directory: Path) -> set[int]:
+        self.refresh_numbers(directory)
+        rows = self.conn.execute("SELECT DISTINCT number FROM numbers WHERE directory = ?", (str(directory),))
+        return {number for (number,) in rows}
+
+    def free_numbers(self, directory: Path, start: int, end: int) -> list[int]:
+        """番号帯 start-end の空き番号。帯の番号を SQL で並べ、(directory, number) の主キーで引く。"""
+        self.refresh_numbers(directory)
+        rows = self.conn.execute(
+            """
+            WITH RECURSIVE band(n) AS (SELECT ? UNION ALL SELECT n + 1 FROM band WHERE n < ?)
+            SELECT n FROM band
+            WHERE NOT EXISTS (SELECT 1 FROM numbers WHERE directory = ? AND number = band.n)
+            ORDER BY n
+            """,
+            (start, end, str(directory)),
+        )
+        return [number for (number,) in rows]
+
+    def summary(self, total_files: int) -> str:
+        return (
+            f"[INFO] カタログ: 再解析 {self.parsed} / {total_files} ファイル、"
+            f"再利用 {self.reused} ファイル、削除を反映 {self.removed} ファイル（{self.db_file}）"
+        )
+
+
+def restore_hits(value: Any) -> Any:
+    if isinstance(value, list):
+        return [tuple(item) if isinstance(item, list) else item for item in value]
+    return value
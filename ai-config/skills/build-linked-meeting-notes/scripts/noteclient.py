@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Thin client for notedaemon.py; runs the script in-process when no daemon is listening."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import runpy
+import socket
+import stat
+import sys
+from pathlib import Path
+from typing import Any
+
+
+PROTOCOL_VERSION = 1
+SOCKET_ENV = "NOTE_DAEMON_SOCKET"
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+# デーモン経由で呼べるスクリプト。名前 -> スクリプトのパス
+SCRIPTS = {
+    "check_links": SKILLS_DIR / "build-linked-meeting-notes" / "scripts" / "check_links.py",
+    "check_placeholders": SKILLS_DIR / "build-linked-meeting-notes" / "scripts" / "check_placeholders.py",
+    "validate_note_links": SKILLS_DIR / "research-note-authoring" / "scripts" / "validate_note_links.py",
+    "update_readme_index": SKILLS_DIR / "research-note-authoring" / "scripts" / "update_readme_index.py",
+    "create_note": SKILLS_DIR / "research-note-authoring" / "scripts" / "create_note.py",
+}
+CONTROL_COMMANDS = ("status", "stop")
+# 常駐して終わらないので、デーモンに渡さず手元で動かすオプション（argparse の省略形 --wat なども同じ）
+LOCAL_ONLY_FLAGS = ("--watch",)
+
+
+def default_socket_path() -> Path:
+    """NOTE_DAEMON_SOCKET、なければ $XDG_RUNTIME_DIR/notedaemon.sock、なければ /tmp/notedaemon-<uid>.sock。"""
+    if os.environ.get(SOCKET_ENV):
+        return Path(os.environ[SOCKET_ENV])
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return Path(runtime_dir) / "notedaemon.sock"
+    return Path("/tmp") / f"notedaemon-{os.getuid()}.sock"
+
+
+def has_flag(argv: list[str], flags: tuple[str, ...]) -> bool:
+    """argv に flags のどれかがあれば True。argparse は一意な省略形（--wat など）も受け付けるので前方一致で比べる。"""
+    for token in argv:
+        if token.startswith("--") and token != "--":
+            name = token.split("=", 1)[0]
+            if any(flag.startswith(name) for flag in flags):
+                return True
+    return False
+
+
+def check_socket(socket_path: Path) -> bool:
+    """socket_path が本人の Unix ソケットなら True、何もなければ False。
+
+    既定の /tmp/notedaemon-<uid>.sock は名前を推測できるので、別のユーザーが先に作った
+    ソケット（やソケット以外のもの）なら ValueError にして、引数や cwd を渡さないようにする。
+    """
+    try:
+        st = os.lstat(socket_path)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISSOCK(st.st_mode):
+        raise ValueError(f"ソケットではありません: {socket_path}")
+    if st.st_uid != os.getuid():
+        raise ValueError(f"ソケットの持ち主が別のユーザー（uid {st.st_uid}）です: {socket_path}")
+    return True
+
+
+def send_request(socket_path: Path, request: dict[str, Any]) -> dict[str, Any] | None:
+    """1 要求 1 接続。デーモンがいない（ソケットがない・接続を拒否された）ときは None。"""
+    try:
+        if not check_socket(socket_path):
+            return None
+    except ValueError as exc:
+        print(f"[WARN] {exc}。このソケットには接続しません。", file=sys.stderr)
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(str(socket_path))
+            conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            conn.shutdown(socket.SHUT_WR)
+            with conn.makefile("rb") as reader:
+                line = reader.readline()
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def run_in_process(script: str, args: list[str]) -> None:
+    # python3 <script> と同じ形で実行する（sys.exit もそのまま伝わる）
+    path = SCRIPTS[script]
+    sys.argv = [str(path), *args]
+    sys.path.insert(0, str(path.parent))
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="notedaemon.py に検査・索引・採番を依頼する。デーモンがいなければ同じスクリプトをこのプロセスで実行する。"
+    )
+    parser.add_argument("--socket", type=Path, help="デーモンのソケット（既定は NOTE_DAEMON_SOCKET など）")
+    parser.add_argument("command", choices=[*SCRIPTS, *CONTROL_COMMANDS], help="実行するスクリプト、または status / stop")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="スクリプトに渡す引数")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    socket_path = args.socket or default_socket_path()
+
+    if args.command in CONTROL_COMMANDS:
+        response = send_request(socket_path, {"version": PROTOCOL_VERSION, "op": args.command})
+        if response is None:
+            print(f"[INFO] デーモンは動いていません: {socket_path}")
+            return 1
+        print(json.dumps(response, ensure_ascii=False, indent=2))
+        return 0
+
+    if not has_flag(args.args, LOCAL_ONLY_FLAGS):
+        request = {
+            "version": PROTOCOL_VERSION,
+            "op": "run",
+            "script": args.command,
+            "argv": args.args,
+            "cwd": os.getcwd(),
+        }
+        response = send_request(socket_path, request)
+        if response is not None and "error" in response:
+            print(f"[WARN] デーモンが要求を受け付けませんでした（{response['error']}）。このプロセスで実行します。", file=sys.stderr)
+        elif response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            return response["exit"]
+
+    run_in_process(args.command, args.args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
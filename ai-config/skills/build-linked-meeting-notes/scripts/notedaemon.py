@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""Resident Unix-socket server that keeps the note scripts and their parsed corpus warm."""
+
+from __future__ import annotations
+
+import argparse
+import ctypes
+import importlib
+import io
+import json
+import os
+import re
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable
+
+import notelint
+from linkcache import StatState, stat_state
+from notecatalog import link_target
+from noteclient import LOCAL_ONLY_FLAGS, PROTOCOL_VERSION, SCRIPTS, check_socket, default_socket_path, has_flag
+from noteprofile import PROFILE, run_main
+from notewalk import ALWAYS_PRUNED, NoteWalker
+
+
+# 出力が木の内容だけで決まる検査。同じ引数の要求には、木が変わるまで前回の応答をそのまま返す
+MEMO_SCRIPTS = frozenset({"check_links", "check_placeholders", "validate_note_links"})
+# 付いていたら応答を使い回さないオプション（キャッシュの集計・時刻・外部の状態・計測で出力が変わる）。
+# argparse の省略形（--cach など）も前方一致で同じに扱う
+NO_MEMO_FLAGS = (
+    "--cache",
+    "--cache-dir",
+    "--catalog",
+    "--catalog-file",
+    "--external",
+    "--include-hidden",
+    "--profile",
+    "--stats-json",
+    "--profile-dump",
+)
+MEMO_LIMIT = 256
+# 解析結果のメモは、消えたファイルの分も残るので、この件数を超えたら捨てて作り直す
+LINT_MEMO_LIMIT = 500_000
+# 応答を使い回すとき、行き先が見張りの外（--root の外や隠し・node_modules の中）なら stat を確かめ直すリンクの規則
+DEPENDENCY_RULES = ("links", "note-links")
+NUMBER_RE = re.compile(r"[0-9.,-]+")
+REQUEST_TIMEOUT = 30.0
+
+# <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def watched_directories(root: Path) -> list[str]:
+    # 各スクリプトと同じく隠し・node_modules には降りない。.noteignore はサブフォルダを
+    # 検査対象にしたときに効かなくなるので、ここでは使わない（除外した木も見張る）
+    walker = NoteWalker(root, ignore_file=Path(os.devnull))
+    return [directory for directory, _ in walker.iter_directories()]
+
+
+class InotifyWatcher:
+    """Linux の inotify で root 配下のディレクトリを見張る。変更があったかは drain() で知る。
+
+    書き込みを終えたファイルのイベントは write(2) の時点でキューに入るので、要求を受けてから
+    drain() すれば、クライアントが依頼前に保存した変更は必ず拾える。
+    """
+
+    mode = "inotify"
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 に失敗しました")
+        # 監視記述子 -> ディレクトリ
+        self.dirs: dict[int, str] = {}
+        # 起動後に見張りを足せなかったディレクトリがあれば、以後は常に「変更あり」と答える
+        self.incomplete = False
+        try:
+            for directory in watched_directories(root):
+                self._add(directory)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def fileno(self) -> int:
+        return self.fd
+
+    @property
+    def watched(self) -> int:
+        return len(self.dirs)
+
+    def directories(self) -> set[str]:
+        return set(self.dirs.values())
+
+    def _add(self, directory: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if errno in (2, 20):  # ENOENT / ENOTDIR: 見張る前に消えた
+                return
+            # ENOSPC は fs.inotify.max_user_watches の上限。呼び出し側で定期確認に切り替える
+            raise OSError(errno, os.strerror(errno), directory)
+        self.dirs[wd] = directory
+
+    def _add_tree(self, directory: str) -> None:
+        name = os.path.basename(directory)
+        if name.startswith(".") or name in ALWAYS_PRUNED:
+            return
+        for subdir in watched_directories(Path(directory)):
+            self._add(subdir)
+
+    def drain(self) -> bool:
+        """溜まったイベントを読み切り、木に変更があったかを返す。新しいディレクトリは見張りに加える。"""
+        changed = False
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = changed = True
+                elif mask & IN_IGNORED:
+                    # 消えたディレクトリ。変更そのものは親ディレクトリのイベントで届いている
+                    self.dirs.pop(wd, None)
+                else:
+                    changed = True
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and wd in self.dirs:
+                        self._guarded(self._add_tree, os.path.join(self.dirs[wd], os.fsdecode(name)))
+        if overflowed:
+            # 取りこぼしたイベントに新しいディレクトリが含まれていたかもしれない
+            for directory in watched_directories(self.root):
+                self._guarded(self._add, directory)
+        return changed or self.incomplete
+
+    def _guarded(self, add: Callable[[str], None], directory: str) -> None:
+        try:
+            add(directory)
+        except OSError as exc:
+            if not self.incomplete:
+                print(f"[WARN] 見張りを追加できないため、以後は応答を使い回しません: {exc}", file=sys.stderr)
+            self.incomplete = True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """inotify が使えないとき。要求のたびにディレクトリとノートの (mtime, サイズ) を比べる。"""
+
+    mode = "polling"
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.dirs: set[str] = set()
+        self.state = self._fingerprint()
+
+    def fileno(self) -> int | None:
+        return None
+
+    @property
+    def watched(self) -> int:
+        return len(self.state)
+
+    def directories(self) -> set[str]:
+        return self.dirs
+
+    def _fingerprint(self) -> dict[str, tuple[int, int]]:
+        state: dict[str, tuple[int, int]] = {}
+        self.dirs = set()
+        walker = NoteWalker(self.root, ignore_file=Path(os.devnull))
+        for directory, entries in walker.iter_directories():
+            self.dirs.add(directory)
+            for path in [directory, *(entry.path for entry in entries)]:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                state[path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def drain(self) -> bool:
+        state = self._fingerprint()
+        changed = state != self.state
+        self.state = state
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(root: Path) -> InotifyWatcher | PollingWatcher:
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as exc:
+            print(f"[WARN] inotify を使えないため、要求ごとに木を確認します: {exc}", file=sys.stderr)
+    return PollingWatcher(root)
+
+
+LintKey = tuple[str, tuple[str, ...], int, bool]
+
+
+class LintMemo:
+    """notelint.lint_files の差し替え。stat が前回と同じファイルは読み直さずに前回の結果を返す。
+
+    (パス, 規則, しきい値, 指紋の有無) -> (読む前の stat 状態, 結果) を持つ。読んでいる間に
+    変わっても、次回は stat が合わずに読み直す。
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[LintKey, tuple[StatState, notelint.FileLint]] = {}
+        # take_linted() を前回呼んでから返した (パス, 結果)
+        self.linted: list[tuple[str, notelint.FileLint]] = []
+
+    def __call__(
+        self,
+        paths: list[str],
+        rules: tuple[str, ...],
+        jobs: int,
+        large_bytes: int,
+        with_digest: bool,
+    ) -> list[notelint.FileLint]:
+        results: dict[int, notelint.FileLint] = {}
+        stale: list[tuple[int, LintKey, StatState | None]] = []
+        for index, path in enumerate(paths):
+            key = (path, rules, large_bytes, with_digest)
+            state = stat_state(path)
+            cached = self.entries.get(key)
+            if state is not None and cached is not None and cached[0] == state:
+                results[index] = cached[1]
+            else:
+                stale.append((index, key, state))
+        PROFILE.add_cache("lint_memo", len(paths) - len(stale), len(stale))
+        if len(self.entries) + len(stale) > LINT_MEMO_LIMIT:
+            self.entries.clear()
+        scanned = notelint.scan_files([key[0] for _, key, _ in stale], rules, jobs, large_bytes, with_digest)
+        for (index, key, state), result in zip(stale, scanned):
+            results[index] = result
+            if result.error is None and state is not None:
+                self.entries[key] = (state, result)
+        ordered = [results[index] for index in range(len(paths))]
+        self.linted.extend(zip(paths, ordered))
+        return ordered
+
+    def take_linted(self) -> list[tuple[str, notelint.FileLint]]:
+        linted, self.linted = self.linted, []
+        return linted
+
+
+def is_within(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class NoteDaemon:
+    def __init__(self, root: Path, verbose: bool = False) -> None:
+        self.root = root
+        self.verbose = verbose
+        self.started = time.time()
+        self.running = True
+        self.watcher = open_watcher(root)
+        self.modules: dict[str, ModuleType] = {}
+        # (スクリプト, 引数, 相対パスがあれば cwd) -> (応答, 見張りの外のリンク先の stat 状態)。
+        # 木が変わったら全部捨てる。見張りの外のリンク先は使い回す前に stat を比べる
+        self.memo: dict[tuple[Any, ...], tuple[dict[str, Any], dict[str, StatState]]] = {}
+        # ノート -> (解析結果, ディレクトリ -> 自身とリンク先のパス)
+        self.targets: dict[str, tuple[notelint.FileLint, dict[str, list[str]]]] = {}
+        self.generation = 0
+        self.requests = 0
+        self.memo_hits = 0
+        self.lint_memo = LintMemo()
+        notelint.set_backend(self.lint_memo)
+        for script_path in SCRIPTS.values():
+            if str(script_path.parent) not in sys.path:
+                sys.path.insert(0, str(script_path.parent))
+        for name in SCRIPTS:
+            self.modules[name] = importlib.import_module(name)
+
+    def refresh(self) -> None:
+        if self.watcher.drain():
+            self.generation += 1
+            self.memo.clear()
+
+    def memo_key(self, script: str, argv: list[str], cwd: str) -> tuple[Any, ...] | None:
+        if script not in MEMO_SCRIPTS:
+            return None
+        if has_flag(argv, NO_MEMO_FLAGS):
+            return None
+        relative = False
+        for token in argv:
+            if token.startswith("-") or NUMBER_RE.fullmatch(token):
+                continue
+            # 見張っている木の外のファイルは、変わっても気づけない
+            if not is_within(os.path.realpath(os.path.join(cwd, token)), str(self.root)):
+                return None
+            relative = relative or not os.path.isabs(token)
+        return (script, tuple(argv), cwd if relative else None)
+
+    def unwatched_dependencies(self, linted: list[tuple[str, notelint.FileLint]]) -> dict[str, StatState]:
+        """検査したファイルとリンク先のうち、見張っていないディレクトリにあるものの stat 状態。
+
+        --root の外や .auto-index/ などの枝刈りしたフォルダの変更は inotify では届かないので、
+        応答を使い回す前にこれらの stat を比べ直す。
+        """
+        watched = self.watcher.directories()
+        if len(self.targets) > LINT_MEMO_LIMIT:
+            # 消えたノートの分も残るので、解析結果のメモと同じ上限で作り直す
+            self.targets.clear()
+        dependencies: dict[str, StatState] = {}
+        for path, result in linted:
+            for directory, targets in self.link_targets(path, result).items():
+                if directory in watched:
+                    continue
+                for target in targets:
+                    if target not in dependencies:
+                        dependencies[target] = stat_state(target)
+        return dependencies
+
+    def link_targets(self, path: str, result: notelint.FileLint) -> dict[str, list[str]]:
+        """ディレクトリ -> その中の path 自身とリンク先。解析結果（LintMemo が同じものを返す）ごとに 1 回だけ求める。"""
+        cached = self.targets.get(path)
+        if cached is not None and cached[0] is result:
+            return cached[1]
+        by_directory: dict[str, list[str]] = {os.path.dirname(path): [path]}
+        for rule in DEPENDENCY_RULES:
+            for _, raw in result.hits.get(rule, ()):
+                target = link_target(path, rule, raw)
+                by_directory.setdefault(os.path.dirname(target), []).append(target)
+        self.targets[path] = (result, by_directory)
+        return by_directory
+
+    def memo_lookup(self, key: tuple[Any, ...]) -> dict[str, Any] | None:
+        entry = self.memo.get(key)
+        if entry is None:
+            return None
+        response, dependencies = entry
+        if any(stat_state(path) != state for path, state in dependencies.items()):
+            del self.memo[key]
+            return None
+        return response
+
+    def run_script(self, script: str, argv: list[str], cwd: str) -> dict[str, Any]:
+        module = self.modules[script]
+        stdout, stderr = io.StringIO(), io.StringIO()
+        saved_argv = sys.argv
+        sys.argv = [str(SCRIPTS[script]), *argv]
+        exit_code: Any = 0
+        try:
+            os.chdir(cwd)
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                exit_code = run_main(module.main, script)
+        except SystemExit as exc:
+            exit_code = exc.code
+        except Exception:
+            traceback.print_exc(file=stderr)
+            exit_code = 1
+        finally:
+            sys.argv = saved_argv
+            os.chdir(self.root)
+        if exit_code is None:
+            exit_code = 0
+        elif not isinstance(exit_code, int):
+            stderr.write(f"{exit_code}\n")
+            exit_code = 1
+        return {"exit": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        if request.get("version") != PROTOCOL_VERSION:
+            return {"error": f"プロトコルの版が違います（{request.get('version')}）"}
+        op = request.get("op")
+        if op == "status":
+            return self.status()
+        if op == "stop":
+            self.running = False
+            return {"stopped": True, "pid": os.getpid()}
+        if op != "run" or request.get("script") not in SCRIPTS:
+            return {"error": f"不明な要求です: {op} {request.get('script', '')}".rstrip()}
+
+        script, argv, cwd = request["script"], list(request.get("argv", [])), request.get("cwd") or str(self.root)
+        if has_flag(argv, LOCAL_ONLY_FLAGS):
+            # 1 スレッドで答えているので、常駐する --watch を受けると以後の要求に答えられなくなる
+            return {"error": "--watch はデーモンでは実行しません"}
+        self.requests += 1
+        # 依頼の前に保存された変更を、答える前に必ず反映する
+        self.refresh()
+        key = self.memo_key(script, argv, cwd)
+        cached = self.memo_lookup(key) if key is not None else None
+        if cached is not None:
+            self.memo_hits += 1
+            return {**cached, "cached": True}
+        generation = self.generation
+        self.lint_memo.take_linted()
+        response = self.run_script(script, argv, cwd)
+        linted = self.lint_memo.take_linted()
+        # 実行中に木が変わっていたら、その結果は覚えない
+        self.refresh()
+        if key is not None and generation == self.generation:
+            if len(self.memo) >= MEMO_LIMIT:
+                self.memo.clear()
+            self.memo[key] = (response, self.unwatched_dependencies(linted))
+        return {**response, "cached": False}
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "root": str(self.root),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "watch": self.watcher.mode,
+            "watched": self.watcher.watched,
+            "generation": self.generation,
+            "requests": self.requests,
+            "memo_hits": self.memo_hits,
+            "memo_entries": len(self.memo),
+            "lint_memo_files": len(self.lint_memo.entries),
+        }
+
+    def warm(self) -> None:
+        """起動時に検査を 1 回ずつ流し、全ノートの解析結果と応答を用意しておく。"""
+        started = time.perf_counter()
+        for script in sorted(MEMO_SCRIPTS):
+            self.handle({"version": PROTOCOL_VERSION, "op": "run", "script": script, "argv": [str(self.root)]})
+        self.requests = 0
+        print(
+            f"[INFO] 事前読み込み: 解析結果 {len(self.lint_memo.entries)} 件（{time.perf_counter() - started:.1f} 秒）",
+            file=sys.stderr,
+        )
+
+    def serve_connection(self, conn: socket.socket) -> None:
+        started = time.perf_counter()
+        with conn:
+            conn.settimeout(REQUEST_TIMEOUT)
+            try:
+                with conn.makefile("rb") as reader:
+                    line = reader.readline()
+                request = json.loads(line)
+            except (OSError, ValueError):
+                return
+            try:
+                response = self.handle(request)
+            except Exception as exc:
+                traceback.print_exc()
+                response = {"error": f"{type(exc).__name__}: {exc}"}
+            try:
+                conn.sendall(json.dumps(response).encode("utf-8") + b"\n")
+            except OSError:
+                return
+        if self.verbose and request.get("op") == "run":
+            reuse = "（応答を再利用）" if response.get("cached") else ""
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"[INFO] {request.get('script')} {elapsed:.1f} ms{reuse}", file=sys.stderr)
+
+
+def bind_socket(socket_path: Path) -> socket.socket:
+    try:
+        exists = check_socket(socket_path)
+    except ValueError as exc:
+        raise SystemExit(f"[ERROR] {exc}")
+    if exists:
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            # 前回の異常終了で残ったソケット
+            socket_path.unlink(missing_ok=True)
+        else:
+            raise SystemExit(f"[ERROR] すでにデーモンが動いています: {socket_path}")
+        finally:
+            probe.close()
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # 本人以外は接続できないようにする
+    previous = os.umask(0o177)
+    try:
+        server.bind(str(socket_path))
+    finally:
+        os.umask(previous)
+    server.listen(16)
+    return server
+
+
+def serve(daemon: NoteDaemon, server: socket.socket) -> None:
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "accept")
+    if daemon.watcher.fileno() is not None:
+        # 待っている間もイベントを読み、キューがあふれないようにする
+        selector.register(daemon.watcher.fileno(), selectors.EVENT_READ, "watch")
+    while daemon.running:
+        for key, _ in selector.select():
+            if key.data == "watch":
+                daemon.refresh()
+            else:
+                conn, _ = server.accept()
+                daemon.serve_connection(conn)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="ノートの検査・索引・採番スクリプトを常駐させ、Unix ソケットで要求を受ける（クライアントは noteclient.py）"
+    )
+    parser.add_argument("--root", type=Path, required=True, help="見張るノートの木（この配下の検査結果を使い回す）")
+    parser.add_argument("--socket", type=Path, help="待ち受けるソケット（既定は NOTE_DAEMON_SOCKET など。noteclient.py と同じ）")
+    parser.add_argument("--no-warm", action="store_true", help="起動時の事前読み込みをしない")
+    parser.add_argument("--verbose", action="store_true", help="要求ごとの処理時間を標準エラーに表示する")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    root = args.root.expanduser().resolve()
+    if not root.is_dir():
+        print(f"[ERROR] ディレクトリを指定してください: {root}")
+        return 2
+    socket_path = (args.socket or default_socket_path()).expanduser().absolute()
+    server = bind_socket(socket_path)
+    # SIGTERM でも後始末（ソケットの削除）をしてから終わる。SystemExit はスクリプトの終了と
+    # 区別できないので、Ctrl+C と同じ KeyboardInterrupt にする
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        daemon = NoteDaemon(root, args.verbose)
+        os.chdir(root)
+        if not args.no_warm:
+            daemon.warm()
+        print(
+            f"[OK] 待ち受けを開始しました: {socket_path}（{root}、{daemon.watcher.mode} で "
+            f"{daemon.watcher.watched} 件を監視）",
+            file=sys.stderr,
+        )
+        serve(daemon, server)
+        daemon.watcher.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        socket_path.unlink(missing_ok=True)
+    print("[INFO] 終了しました", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
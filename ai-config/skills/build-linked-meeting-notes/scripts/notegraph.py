@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Note-to-note link graph: backlinks, orphans and strongly connected clusters."""
+
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+from notelint import BACKLINKS_END, BACKLINKS_START
+
+
+BACKLINKS_HEADING = "## 被リンク"
+BACKLINKS_BLOCK_RE = re.compile(re.escape(BACKLINKS_START) + r".*?" + re.escape(BACKLINKS_END) + r"\n?", re.DOTALL)
+# リンク先に書くとリンクの記法が崩れる文字。notelint が unquote するので % で符号化する
+LINK_ESCAPES = str.maketrans({"%": "%25", " ": "%20", "(": "%28", ")": "%29", "<": "%3C", ">": "%3E"})
+
+
+class LinkGraph:
+    """ノートを頂点、ノート間のリンクを辺とする有向グラフ。
+
+    頂点は paths の並び順の整数 id で持ち、順方向は id のリスト、逆方向は (リンク元 id, 行番号)
+    のリストにする。add() は辺 1 本あたり辞書引き 1 回なので、構築はファイル数 + リンク数に比例する。
+    """
+
+    def __init__(self, paths: list[str]) -> None:
+        self.paths = paths
+        self.ids = {path: node for node, path in enumerate(paths)}
+        self.forward: list[list[int]] = [[] for _ in paths]
+        self.reverse: list[list[tuple[int, int]]] = [[] for _ in paths]
+        self.links = 0
+        # 対象の外（ノート以外・対象フォルダの外）へ向かうリンクの数
+        self.outside = 0
+
+    def add(self, source: int, line: int, target: str) -> None:
+        node = self.ids.get(target)
+        if node is None:
+            self.outside += 1
+            return
+        if node == source:
+            # 同じページ内のアンカーへのリンクは辺にしない
+            return
+        self.links += 1
+        self.forward[source].append(node)
+        self.reverse[node].append((source, line))
+
+    def orphans(self) -> list[int]:
+        """他のノートから 1 本もリンクされていないノート。"""
+        return [node for node, sources in enumerate(self.reverse) if not sources]
+
+    def clusters(self) -> list[list[int]]:
+        """2 ノート以上の強連結成分（互いに行き来できるまとまり）。大きい順。"""
+        components = [sorted(component) for component in strongly_connected(self.forward) if len(component) > 1]
+        return sorted(components, key=lambda component: (-len(component), component[0]))
+
+    def sources_of(self, node: int) -> list[int]:
+        """node へリンクしているノート（重複なし、id 順）。"""
+        return sorted({source for source, _ in self.reverse[node]})
+
+    def to_json(self, root: Path) -> dict[str, Any]:
+        names = [relative_name(path, root) for path in self.paths]
+        return {
+            "root": str(root),
+            "files": len(self.paths),
+            "links": self.links,
+            "outside_links": self.outside,
+            "backlinks": {
+                names[node]: [{"source": names[source], "line": line} for source, line in sorted(sources)]
+                for node, sources in enumerate(self.reverse)
+            },
+            "orphans": [names[node] for node in self.orphans()],
+            "clusters": [[names[node] for node in component] for component in self.clusters()],
+        }
+
+
+def strongly_connected(forward: list[list[int]]) -> list[list[int]]:
+    """Tarjan 法（再帰なし）。深い連鎖でも再帰上限に当たらないよう、走査位置を自前のスタックに積む。"""
+    count = len(forward)
+    order = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for start in range(count):
+        if order[start] != -1:
+            continue
+        order[start] = low[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack[start] = True
+        work = [(start, 0)]
+        while work:
+            node, position = work[-1]
+            edges = forward[node]
+            if position < len(edges):
+                work[-1] = (node, position + 1)
+                child = edges[position]
+                if order[child] == -1:
+                    order[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, 0))
+                elif on_stack[child] and order[child] < low[node]:
+                    low[node] = order[child]
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[node] < low[parent]:
+                    low[parent] = low[node]
+            if low[node] == order[node]:
+                component: list[int] = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def relative_name(path: str, root: Path) -> str:
+    try:
+        return Path(path).relative_to(root).as_posix()
+    except ValueError:
+        return path
+
+
+def link_from(source: str, target: str) -> str:
+    """target のページから source への相対リンク。"""
+    return os.path.relpath(source, os.path.dirname(target)).replace(os.sep, "/").translate(LINK_ESCAPES)
+
+
+def render_backlinks(graph: LinkGraph, node: int, titles: dict[str, str]) -> str:
+    target = graph.paths[node]
+    lines = [BACKLINKS_START, BACKLINKS_HEADING, ""]
+    for source in graph.sources_of(node):
+        path = graph.paths[source]
+        title = (titles.get(path) or Path(path).stem).replace("]", "\\]")
+        lines.append(f"- [{title}]({link_from(path, target)})")
+    lines.append(BACKLINKS_END)
+    return "\n".join(lines) + "\n"
+
+
+def with_backlinks(text: str, block: str | None) -> str:
+    """被リンク欄を block に差し替えた本文。block が None なら欄を取り除く。欄がなければ末尾に足す。"""
+    if BACKLINKS_BLOCK_RE.search(text):
+        replaced = BACKLINKS_BLOCK_RE.sub(lambda _: block or "", text, count=1)
+        return replaced.rstrip("\n") + "\n" if block is None else replaced
+    if block is None:
+        return text
+    return text.rstrip("\n") + "\n\n" + block
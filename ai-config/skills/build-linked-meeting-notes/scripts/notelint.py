@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""One-read multi-rule Markdown lint engine shared by the note checkers.
+
+Each file is read once (or memory-mapped once when large), decoded and masked
+at most once, and every requested rule extracts its hits from that single
+Document. Cross-file checks (link targets, anchors) are left to the callers.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+from contextlib import ExitStack
+from functools import cached_property, lru_cache, partial
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+from urllib.parse import unquote
+
+from jobpool import map_in_pool
+from linkcache import content_digest
+from mdscan import (
+    LARGE_FILE_BYTES,
+    LineIndex,
+    ScanResult,
+    Source,
+    decode_text,
+    iter_source_lines,
+    iter_window_bounds,
+    lines_of_offsets,
+    mask_ignored_regions,
+    open_source,
+    paged_find,
+    release,
+    scan_markdown,
+    scan_markdown_windows,
+    scan_masked,
+)
+from noteprofile import PROFILE
+
+
+SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+PLACEHOLDER_RE = re.compile(r"\{\{[^{}\n]+\}\}")
+# mmap したバイト列用。read_text では \r も改行になるので、それも除く
+PLACEHOLDER_BYTES_RE = re.compile(rb"\{\{[^{}\r\n]+\}\}")
+# research-note-authoring 側の行単位のリンク記法（コメント・コードも対象）
+NOTE_LINK_RE = re.compile(r"(?<!\!)\[[^\]]+\]\(([^)]+)\)")
+PLACEHOLDER_OPEN = b"{{"
+# research-note-authoring の README 索引に出すタイトル（先頭 30 行以内の最初の # 見出し）
+TITLE_RE = re.compile(r"^#\s+(.+?)\s*$")
+TITLE_SEARCH_LINES = 30
+# link_graph.py --write-backlinks が各ノートに書く被リンク欄の目印
+BACKLINKS_START = "<!-- BACKLINKS:START -->"
+BACKLINKS_END = "<!-- BACKLINKS:END -->"
+
+SKILLS_DIR = Path(__file__).resolve().parents[2]
+# 既知プレースホルダの出どころ。各スキルの雛形に残っている {{...}} をそのまま使う
+TEMPLATE_DIRS = (
+    SKILLS_DIR / "build-linked-meeting-notes" / "assets" / "templates",
+    SKILLS_DIR / "research-note-authoring" / "assets" / "templates",
+)
+
+
+class Document:
+    """1 ファイル分の読み込み結果。本文・マスク済み走査・行分割は必要になったときに 1 回だけ作る。"""
+
+    def __init__(self, path: str, data: Source) -> None:
+        self.path = path
+        self.data = data
+
+    @property
+    def mapped(self) -> bool:
+        return isinstance(self.data, mmap.mmap)
+
+    @cached_property
+    def text(self) -> str:
+        return decode_text(self.data)
+
+    @cached_property
+    def scan(self) -> ScanResult:
+        # 大きなファイルは本文を文字列にせず、窓ごとに走査する
+        return scan_markdown_windows(self.data) if self.mapped else scan_markdown(self.text)
+
+    def lines(self) -> Iterator[str]:
+        return iter_source_lines(self.data) if self.mapped else iter(self.text.splitlines())
+
+    @cached_property
+    def digest(self) -> str:
+        return content_digest(self.data)
+
+
+class ProfiledDocument(Document):
+    """--profile 用。デコード・マスク・解析・要約を別々の段階として計る。"""
+
+    @cached_property
+    def text(self) -> str:
+        with PROFILE.phase("decode"):
+            return decode_text(self.data)
+
+    @cached_property
+    def scan(self) -> ScanResult:
+        if self.mapped:
+            with PROFILE.phase("parse"):
+                return scan_markdown_windows(self.data)
+        text = self.text
+        with PROFILE.phase("mask"):
+            masked = mask_ignored_regions(text)
+        with PROFILE.phase("parse"):
+            return scan_masked(text, masked)
+
+    @cached_property
+    def digest(self) -> str:
+        with PROFILE.phase("digest"):
+            return content_digest(self.data)
+
+
+class FileLint(NamedTuple):
+    digest: str | None
+    # 規則名 -> その規則がこのファイルで拾ったもの
+    hits: dict[str, Any]
+    # 読み込みに失敗したときの例外（呼び出し側が表示方法を決める）
+    error: OSError | None = None
+
+
+def normalize_link_target(raw_target: str) -> str:
+    target = raw_target.strip()
+    if not target:
+        return target
+
+    # Markdown の title 指定 (path "title") を簡易的に除去
+    if " " in target and not target.startswith("<"):
+        target = target.split(" ", 1)[0]
+
+    if target.startswith("<") and target.endswith(">"):
+        target = target[1:-1]
+
+    return unquote(target)
+
+
+def is_external_link(target: str) -> bool:
+    return bool(SCHEME_RE.match(target))
+
+
+def iter_local_links(scan: ScanResult) -> Iterable[tuple[int, str]]:
+    for token in scan.links:
+        link_target = normalize_link_target(token.value)
+        if not link_target:
+            continue
+        if is_external_link(link_target):
+            continue
+        yield scan.line_of(token.start), link_target
+
+
+def is_http_link(link: str) -> bool:
+    lower = link.lower()
+    return lower.startswith("http://") or lower.startswith("https://")
+
+
+def is_external_note_link(link: str) -> bool:
+    lower = link.lower()
+    return (
+        lower.startswith("http://")
+        or lower.startswith("https://")
+        or lower.startswith("mailto:")
+        or lower.startswith("javascript:")
+        or lower.startswith("#")
+    )
+
+
+def normalize_note_link(link: str) -> str:
+    value = link.strip()
+    if value.startswith("<") and value.endswith(">"):
+        value = value[1:-1].strip()
+    if " " in value and not value.startswith("./") and not value.startswith("../"):
+        value = value.split(" ", 1)[0]
+    return value
+
+
+def iter_template_placeholders(template_dirs: Iterable[Path] = TEMPLATE_DIRS) -> Iterator[str]:
+    for template_dir in template_dirs:
+        for template in sorted(template_dir.glob("*.md")):
+            yield from PLACEHOLDER_RE.findall(template.read_text(encoding="utf-8"))
+
+
+@lru_cache(maxsize=None)
+def known_placeholder_patterns() -> tuple[re.Pattern[str], re.Pattern[bytes]]:
+    """雛形の既知プレースホルダを 1 本の選言にまとめた正規表現 (str 用, bytes 用)。
+
+    どれも {{ で始まるので、先頭の {{ を探してから候補を枝分かれで照合する
+    多パターン照合になる。長いものを先に並べ、最長一致にする。
+    """
+    known = sorted(set(iter_template_placeholders()), key=lambda value: (-len(value), value))
+    if not known:
+        # 雛形が見つからないときは何にも一致させない
+        return re.compile(r"(?!)"), re.compile(rb"(?!)")
+    text_pattern = "|".join(re.escape(value) for value in known)
+    bytes_pattern = b"|".join(re.escape(value.encode("utf-8")) for value in known)
+    return re.compile(text_pattern), re.compile(bytes_pattern)
+
+
+def placeholders_in_text(text: str, pattern: re.Pattern[str] = PLACEHOLDER_RE) -> list[tuple[int, str]]:
+    lines = LineIndex(text)
+    return [(lines.line_of(match.start()), match.group(0)) for match in pattern.finditer(text)]
+
+
+def placeholders_in_mapped(
+    data: mmap.mmap,
+    pattern: re.Pattern[bytes] = PLACEHOLDER_BYTES_RE,
+) -> list[tuple[int, str]]:
+    # プレースホルダは行をまたがないので、行末で切った窓ごとにバイト列のまま探す。
+    # 行番号は一致箇所についてだけ、改行を数えて求める
+    found: list[tuple[int, bytes]] = []
+    for start, end in iter_window_bounds(data):
+        for match in pattern.finditer(data, start, end):
+            found.append((match.start(), match.group(0)))
+        release(data, start, end)
+    lines = lines_of_offsets(data, [offset for offset, _ in found])
+    return [(line, raw.decode("utf-8")) for line, (_, raw) in zip(lines, found)]
+
+
+def has_placeholder_open(data: Source) -> bool:
+    """{{ を含まないファイルは、デコードも正規表現もせずに素通しする。"""
+    if isinstance(data, mmap.mmap):
+        return paged_find(data, PLACEHOLDER_OPEN, 0) != -1
+    return PLACEHOLDER_OPEN in data
+
+
+def rule_links(doc: Document) -> list[tuple[int, str]]:
+    """コメント・コードを除いた相対リンク (行番号, リンク先)。"""
+    return [(line, target) for line, target in iter_local_links(doc.scan) if not target.startswith("/")]
+
+
+def rule_absolute(doc: Document) -> list[tuple[int, str]]:
+    """コメント・コードを除いた絶対パスのリンク (行番号, リンク先)。警告用。"""
+    return [(line, target) for line, target in iter_local_links(doc.scan) if target.startswith("/")]
+
+
+def rule_anchors(doc: Document) -> list[str]:
+    """見出しと HTML アンカーから作ったアンカー名の一覧。"""
+    return sorted(doc.scan.anchors())
+
+
+def rule_placeholders(doc: Document) -> list[tuple[int, str]]:
+    """未置換プレースホルダ (行番号, {{...}})。コメント・コードの中も対象。"""
+    if not has_placeholder_open(doc.data):
+        return []
+    return placeholders_in_mapped(doc.data) if doc.mapped else placeholders_in_text(doc.text)
+
+
+def rule_known_placeholders(doc: Document) -> list[tuple[int, str]]:
+    """雛形に出てくる既知プレースホルダだけを拾う。{{...}} を使う本文（テンプレート言語の例など）は対象外。"""
+    if not has_placeholder_open(doc.data):
+        return []
+    text_re, bytes_re = known_placeholder_patterns()
+    return placeholders_in_mapped(doc.data, bytes_re) if doc.mapped else placeholders_in_text(doc.text, text_re)
+
+
+def rule_note_links(doc: Document) -> list[tuple[int, str]]:
+    """行ごとに拾うローカルリンク (行番号, リンク)。validate_note_links.py の判定。"""
+    hits: list[tuple[int, str]] = []
+    for lineno, line in enumerate(doc.lines(), start=1):
+        for match in NOTE_LINK_RE.finditer(line):
+            raw_link = normalize_note_link(match.group(1))
+            if not raw_link or is_external_note_link(raw_link):
+                continue
+            if not raw_link.split("#", 1)[0]:
+                continue
+            hits.append((lineno, raw_link))
+    return hits
+
+
+def rule_external(doc: Document) -> list[tuple[int, str]]:
+    """コメント・コードを除いた http/https のリンク (行番号, URL)。check_links.py --external 用。"""
+    hits: list[tuple[int, str]] = []
+    for token in doc.scan.links:
+        link_target = normalize_link_target(token.value)
+        if is_http_link(link_target):
+            hits.append((doc.scan.line_of(token.start), link_target))
+    return hits
+
+
+def rule_note_external(doc: Document) -> list[tuple[int, str]]:
+    """行ごとに拾う http/https のリンク (行番号, URL)。validate_note_links.py --external 用。"""
+    hits: list[tuple[int, str]] = []
+    for lineno, line in enumerate(doc.lines(), start=1):
+        for match in NOTE_LINK_RE.finditer(line):
+            raw_link = normalize_note_link(match.group(1))
+            if is_http_link(raw_link):
+                hits.append((lineno, raw_link))
+    return hits
+
+
+def rule_title(doc: Document) -> str | None:
+    """先頭 TITLE_SEARCH_LINES 行以内の最初の # 見出し。なければ None（呼び出し側でファイル名にする）。"""
+    # decode_text で改行は \n にそろっているので、先頭の数行だけを切り出す
+    lines = doc.lines() if doc.mapped else iter(doc.text.split("\n", TITLE_SEARCH_LINES))
+    for line in islice(lines, TITLE_SEARCH_LINES):
+        match = TITLE_RE.match(line)
+        if match:
+            return match.group(1)
+    return None
+
+
+def rule_backlinks_block(doc: Document) -> tuple[int, int] | None:
+    """被リンク欄（自動生成）の (開始行, 終了行)。なければ None。リンクグラフはこの範囲のリンクを数えない。"""
+    if doc.mapped:
+        start = paged_find(doc.data, BACKLINKS_START.encode("utf-8"), 0)
+        end = paged_find(doc.data, BACKLINKS_END.encode("utf-8"), start) if start != -1 else -1
+        if end == -1:
+            return None
+        first, last = lines_of_offsets(doc.data, [start, end])
+        return first, last
+    start = doc.text.find(BACKLINKS_START)
+    end = doc.text.find(BACKLINKS_END, start) if start != -1 else -1
+    if end == -1:
+        return None
+    return doc.text.count("\n", 0, start) + 1, doc.text.count("\n", 0, end) + 1
+
+
+# 規則名 -> 抽出関数。規則を足すときはここに登録する
+RULES: dict[str, Callable[[Document], Any]] = {
+    "links": rule_links,
+    "absolute": rule_absolute,
+    "anchors": rule_anchors,
+    "placeholders": rule_placeholders,
+    "known-placeholders": rule_known_placeholders,
+    "note-links": rule_note_links,
+    "external": rule_external,
+    "note-external": rule_note_external,
+    "title": rule_title,
+    "backlinks-block": rule_backlinks_block,
+}
+
+
+def lint_file(
+    path: str,
+    rules: Iterable[str],
+    large_bytes: int = LARGE_FILE_BYTES,
+    with_digest: bool = False,
+) -> FileLint:
+    """1 ファイルを 1 回だけ読み、rules の各規則を同じ読み込み結果に適用する。
+
+    プロセスプールのワーカーからも呼ぶので、戻り値は小さな組み込み型だけにする。
+    読み込みの OSError は FileLint.error に入れて返す。
+    """
+    try:
+        with open_source(path, large_bytes) as data:
+            doc = Document(path, data)
+            hits = {name: RULES[name](doc) for name in rules}
+            return FileLint(doc.digest if with_digest else None, hits)
+    except OSError as error:
+        return FileLint(None, {}, error)
+
+
+# (paths, rules, jobs, large_bytes, with_digest) -> 結果。lint_files の代わりに呼ぶ実装
+LintBackend = Callable[[list[str], tuple[str, ...], int, int, bool], list[FileLint]]
+# 常駐プロセス（notedaemon.py）が結果を使い回す実装に差し替える。None なら毎回読む
+_backend: LintBackend | None = None
+
+
+def set_backend(backend: LintBackend | None) -> None:
+    """以後の lint_files / lint_path を backend に任せる（None で元に戻す）。backend は scan_files で読む。"""
+    global _backend
+    _backend = backend
+
+
+def lint_files(
+    paths: list[str],
+    rules: Iterable[str],
+    jobs: int = 1,
+    large_bytes: int = LARGE_FILE_BYTES,
+    with_digest: bool = False,
+) -> list[FileLint]:
+    rules = tuple(rules)
+    if _backend is not None:
+        return _backend(paths, rules, jobs, large_bytes, with_digest)
+    return scan_files(paths, rules, jobs, large_bytes, with_digest)
+
+
+def scan_files(
+    paths: list[str],
+    rules: tuple[str, ...],
+    jobs: int,
+    large_bytes: int,
+    with_digest: bool,
+) -> list[FileLint]:
+    """差し替えの有無によらず、paths を実際に読んで検査する。"""
+    if PROFILE.enabled and jobs <= 1:
+        return [_lint_file_profiled(path, rules, large_bytes, with_digest) for path in paths]
+    worker = partial(lint_file, rules=rules, large_bytes=large_bytes, with_digest=with_digest)
+    PROFILE.add("files_scanned", len(paths))
+    with PROFILE.phase("lint"):
+        return map_in_pool(worker, paths, jobs)
+
+
+def _lint_file_profiled(path: str, rules: tuple[str, ...], large_bytes: int, with_digest: bool) -> FileLint:
+    # lint_file と同じ処理を、読み込み・デコード・マスク・解析・規則の段階に分けて計る。
+    # --jobs 2 以上ではワーカーの中を計れないので、lint_files 全体を "lint" として数える
+    try:
+        with ExitStack() as stack:
+            with PROFILE.phase("read"):
+                data = stack.enter_context(open_source(path, large_bytes))
+            PROFILE.add("files_scanned")
+            PROFILE.add("bytes_read", len(data))
+            doc = ProfiledDocument(path, data)
+            with PROFILE.phase("rules"):
+                hits = {name: RULES[name](doc) for name in rules}
+            return FileLint(doc.digest if with_digest else None, hits)
+    except OSError as error:
+        return FileLint(None, {}, error)
+
+
+def lint_path(path: Path, rules: Iterable[str], large_bytes: int = LARGE_FILE_BYTES) -> dict[str, Any]:
+    """1 ファイルだけを検査する。読み込み失敗はそのまま例外にする。"""
+    result = lint_files([str(path)], rules, 1, large_bytes)[0]
+    if result.error is not None:
+        raise result.error
+    return result.hits
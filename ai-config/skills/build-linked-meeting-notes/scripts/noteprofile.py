@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Per-phase timers and counters behind the note scripts' --profile / --stats-json."""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import resource
+import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, ContextManager
+
+
+STATS_VERSION = 1
+# 段階に入っていない時間（引数解析・import 後の準備など）の名前
+OTHER_PHASE = "other"
+# /proc/self/io の項目 -> 出力名（Linux のみ。読み書きのシステムコール数とバイト数）
+PROC_IO_FIELDS = {
+    "syscr": "read_syscalls",
+    "syscw": "write_syscalls",
+    "rchar": "read_chars",
+    "wchar": "write_chars",
+    "read_bytes": "storage_read_bytes",
+}
+NULL_PHASE = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "started", "children")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.children = 0.0
+        self.profiler._stack.append(self)
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc: object) -> None:
+        elapsed = time.perf_counter() - self.started
+        stack = self.profiler._stack
+        stack.pop()
+        # 入れ子の段階の時間は内側にだけ数える（各段階の合計が実時間になるように）
+        phases = self.profiler.phases
+        phases[self.name] = phases.get(self.name, 0.0) + elapsed - self.children
+        if stack:
+            stack[-1].children += elapsed
+
+
+class Profiler:
+    """段階ごとの実時間と件数のカウンタ。start() するまでは phase() も add() も何もしない。"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.phases: dict[str, float] = {}
+        self.counters: Counter[str] = Counter()
+        self._stack: list[_Phase] = []
+        self._started = 0.0
+        self._io: dict[str, int] = {}
+        self._usage: resource.struct_rusage | None = None
+        self._children: resource.struct_rusage | None = None
+
+    def start(self) -> None:
+        # 常駐プロセス（notedaemon.py）では要求ごとに計り直す
+        self.phases.clear()
+        self.counters.clear()
+        self._stack.clear()
+        self.enabled = True
+        self._io = read_proc_io()
+        self._usage = resource.getrusage(resource.RUSAGE_SELF)
+        self._children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def phase(self, name: str) -> ContextManager[None]:
+        return _Phase(self, name) if self.enabled else NULL_PHASE
+
+    def add(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += value
+
+    def add_cache(self, name: str, hits: int, misses: int) -> None:
+        """キャッシュ・カタログの再利用数（hits）と読み直し数（misses）。"""
+        self.add(f"{name}.hits", hits)
+        self.add(f"{name}.misses", misses)
+
+    def add_snapshot(self, snapshot: Any) -> None:
+        """FsSnapshot の表で答えた回数・実ファイルを見に行った回数・省いた stat 系呼び出し。"""
+        self.add("fs.table_hits", snapshot.hits)
+        self.add("fs.fallbacks", snapshot.fallbacks)
+        self.add("fs.saved_calls", snapshot.saved_calls)
+
+    def report(self, script: str, exit_code: Any) -> dict[str, Any]:
+        wall = time.perf_counter() - self._started
+        phases = dict(sorted(self.phases.items(), key=lambda item: -item[1]))
+        phases[OTHER_PHASE] = max(0.0, wall - sum(self.phases.values()))
+        return {
+            "version": STATS_VERSION,
+            "script": script,
+            "argv": sys.argv[1:],
+            "exit": exit_code,
+            "wall_seconds": wall,
+            "phases": phases,
+            "counters": dict(sorted(self.counters.items())),
+            "process": self._process_stats(),
+        }
+
+    def _process_stats(self) -> dict[str, Any]:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        before = self._usage or usage
+        children_before = self._children or children
+        stats: dict[str, Any] = {
+            "user_seconds": usage.ru_utime - before.ru_utime,
+            "system_seconds": usage.ru_stime - before.ru_stime,
+            # Linux は KiB、macOS はバイト
+            "max_rss_kb": usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss,
+            "block_inputs": usage.ru_inblock - before.ru_inblock,
+            "block_outputs": usage.ru_oublock - before.ru_oublock,
+            "voluntary_context_switches": usage.ru_nvcsw - before.ru_nvcsw,
+            # --jobs N のワーカーなど、計測中に終了した子プロセスの合計
+            "children_user_seconds": children.ru_utime - children_before.ru_utime,
+            "children_system_seconds": children.ru_stime - children_before.ru_stime,
+        }
+        now = read_proc_io()
+        for field, name in PROC_IO_FIELDS.items():
+            if field in now and field in self._io:
+                stats[name] = now[field] - self._io[field]
+        return stats
+
+
+# プロセスに 1 つ。各スクリプトと共通モジュールはこれに段階と件数を積む
+PROFILE = Profiler()
+
+
+def read_proc_io() -> dict[str, int]:
+    try:
+        text = Path("/proc/self/io").read_text(encoding="ascii")
+    except OSError:
+        return {}
+    values: dict[str, int] = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        if value.strip().isdigit():
+            values[key] = int(value)
+    return values
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """--profile / --stats-json / --profile-dump（5 つのノート用スクリプト共通）。"""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="段階ごとの実時間（走査・読み込み・デコード・マスク・解析・リンク解決・出力など）と件数・キャッシュ・システムコールの数を標準エラーに表示する",
+    )
+    parser.add_argument(
+        "--stats-json",
+        type=Path,
+        metavar="FILE",
+        help="--profile と同じ内容を JSON で FILE に書き出す",
+    )
+    parser.add_argument(
+        "--profile-dump",
+        type=Path,
+        metavar="FILE",
+        help="cProfile の結果を FILE に書き出す（python3 -m pstats FILE で見る）",
+    )
+
+
+def _profile_options() -> argparse.Namespace:
+    # 各スクリプトの引数解析の前に、計測の指定だけを先に読む（省略形は受け付けない）
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    add_profile_arguments(parser)
+    return parser.parse_known_args()[0]
+
+
+def format_report(report: dict[str, Any]) -> list[str]:
+    wall = report["wall_seconds"] or 1e-9
+    lines = [f"[INFO] プロファイル: {report['script']} 全体 {report['wall_seconds'] * 1000:.1f} ms"]
+    for name, seconds in report["phases"].items():
+        lines.append(f"  - {name}: {seconds * 1000:.1f} ms（{seconds / wall:.0%}）")
+    if report["counters"]:
+        lines.append("[INFO] 件数: " + "、".join(f"{name} {value}" for name, value in report["counters"].items()))
+    process = report["process"]
+    io = [f"{name} {process[name]}" for name in PROC_IO_FIELDS.values() if name in process]
+    lines.append(
+        f"[INFO] プロセス: user {process['user_seconds']:.3f} 秒、sys {process['system_seconds']:.3f} 秒、"
+        f"最大 RSS {process['max_rss_kb'] / 1024:.1f} MB" + ("、" + "、".join(io) if io else "")
+    )
+    return lines
+
+
+def run_main(main: Callable[[], int | None], script: str) -> int | None:
+    """main() を実行する。--profile / --stats-json / --profile-dump があれば計測して報告する。
+
+    報告は標準エラー（とファイル）にだけ出すので、標準出力は計測しないときと同じになる。
+    """
+    options = _profile_options()
+    if not (options.profile or options.stats_json or options.profile_dump):
+        return main()
+
+    PROFILE.start()
+    profiler = cProfile.Profile() if options.profile_dump else None
+    exit_code: Any = 0
+    try:
+        if profiler is not None:
+            profiler.enable()
+        exit_code = main()
+    except SystemExit as exc:
+        exit_code = exc.code
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        PROFILE.stop()
+    if exit_code is None:
+        exit_code = 0
+    elif not isinstance(exit_code, int):
+        # SystemExit("[ERROR] ...") と同じく標準エラーに出して 1 で終わる（報告より先に出す）
+        print(exit_code, file=sys.stderr)
+        exit_code = 1
+    report = PROFILE.report(script, exit_code)
+    if profiler is not None:
+        profiler.dump_stats(str(options.profile_dump))
+    if options.stats_json:
+        options.stats_json.parent.mkdir(parents=True, exist_ok=True)
+        options.stats_json.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if options.profile:
+        sys.stdout.flush()
+        for line in format_report(report):
+            print(line, file=sys.stderr)
+    return exit_code
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""On-disk full-text index for Markdown notes (character bigrams, SQLite)."""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from mdscan import FENCE, decode_text
+from notecatalog import MTIME_SETTLE_NS, open_database, under
+from notelint import TITLE_RE, TITLE_SEARCH_LINES
+from notewalk import WalkEntry
+
+
+INDEX_DIRNAME = ".cache"
+INDEX_FILENAME = "note_search.sqlite3"
+# スキーマや字句の切り方を変えたら上げる（古い索引は作り直す）
+SCHEMA_VERSION = 2
+
+# 欄（0=タイトル, 1=見出し, 2=本文）の重み。同じ語でもタイトル・見出しに出るノートを上位にする
+FIELD_WEIGHTS = (5.0, 3.0, 1.0)
+
+# 英数字・かな・漢字の連続（句読点・記号・空白で区切る）
+RUN_RE = re.compile(r"[^\W_]+")
+HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")
+
+# SQLite のページキャッシュ（KiB）。転置リストへの追加は bigram ごとに散らばるので、既定より大きく取る
+CACHE_KIB = 64 * 1024
+
+SNIPPETS_PER_HIT = 3
+SNIPPET_WIDTH = 80
+
+SCHEMA = """
+CREATE TABLE docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    scanned_ns INTEGER NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE postings (
+    gram TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    -- 欄ごとの 重み x (1 + log 出現数) の和。重みを変えたら SCHEMA_VERSION を上げて作り直す
+    weight REAL NOT NULL,
+    PRIMARY KEY (gram, doc)
+) WITHOUT ROWID;
+CREATE INDEX postings_doc ON postings (doc);
+CREATE TABLE grams (
+    gram TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+TABLES = ("docs", "postings", "grams")
+
+
+class Hit(NamedTuple):
+    path: str
+    title: str
+    score: float
+    # (行番号, 抜粋)
+    snippets: list[tuple[int, str]]
+
+
+def normalize(text: str) -> str:
+    """全角英数・半角カナの揺れと大文字小文字をそろえる。"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def gram_counts(text: str, tails: bool = False) -> Counter[str]:
+    """正規化済みの text の文字 bigram の出現数。1 文字だけの連続はその 1 文字を数える。
+
+    tails なら連続の末尾の 1 文字も数える（索引用）。末尾以外の文字はその文字で始まる bigram があるので、
+    1 文字の語を「その文字で始まるキー」の範囲で引けば、どこに出てくるノートも漏れない。
+    """
+    counts: Counter[str] = Counter()
+    for run in RUN_RE.findall(text):
+        if len(run) == 1:
+            counts[run] += 1
+        else:
+            counts.update(run[i : i + 2] for i in range(len(run) - 1))
+            if tails:
+                counts[run[-1]] += 1
+    return counts
+
+
+def note_fields(text: str, fallback_title: str) -> tuple[str, list[str], list[str]]:
+    """(タイトル, 見出しの行, 本文の行)。コードフェンス内の # 行は見出しとして扱わない。"""
+    title: str | None = None
+    headings: list[str] = []
+    body: list[str] = []
+    in_fence = False
+    for number, line in enumerate(text.split("\n")):
+        if line.lstrip().startswith(FENCE):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if match is None:
+            body.append(line)
+            continue
+        if title is None and number < TITLE_SEARCH_LINES and TITLE_RE.match(line):
+            title = match.group(1)
+        else:
+            headings.append(match.group(1))
+    return title or fallback_title, headings, body
+
+
+def prefix_end(key: str) -> str:
+    """key で始まる文字列がすべて収まる範囲 [key, prefix_end(key)) の上端。"""
+    return key[:-1] + chr(ord(key[-1]) + 1)
+
+
+def snippet(line: str, term: str) -> str:
+    """line のうち term の周辺 SNIPPET_WIDTH 文字。正規化で長さが変わる行は正規化後の文字列で切る。"""
+    text = line.strip()
+    folded = normalize(text)
+    if len(text) <= SNIPPET_WIDTH:
+        return text
+    source = text if len(folded) == len(text) else folded
+    pos = max(folded.find(term), 0)
+    start = max(0, min(pos - SNIPPET_WIDTH // 3, len(source) - SNIPPET_WIDTH))
+    end = start + SNIPPET_WIDTH
+    return ("…" if start else "") + source[start:end] + ("…" if end < len(source) else "")
+
+
+class SearchIndex:
+    """ノートの全文索引。docs にファイルの指紋、postings に (bigram, ノート) -> 欄の重みを足した値を置く。
+
+    refresh() で走査結果と突き合わせ、追加・変更されたノートだけ読み直す（削除されたものは外す）。
+    search() は語ごとの bigram をすべて含むノートを欄の重み付き tf-idf で並べ、上位から実際の
+    本文で語を確かめて（bigram の偶然の一致を除き）行番号付きの抜粋を返す。
+    """
+
+    def __init__(self, db_file: Path) -> None:
+        self.db_file = db_file
+        self.conn = open_database(db_file, SCHEMA, SCHEMA_VERSION, TABLES, CACHE_KIB)
+        self.parsed = 0
+        self.reused = 0
+        self.removed = 0
+
+    @classmethod
+    def open(cls, root: Path, db_file: Path | None = None) -> SearchIndex:
+        return cls(db_file or root / INDEX_DIRNAME / INDEX_FILENAME)
+
+    def __enter__(self) -> SearchIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+    # --- 索引の更新 ---
+
+    def refresh(self, entries: Iterable[WalkEntry], scope: Path) -> None:
+        """entries（stat 付き）を索引に反映する。scope 配下で entries にないノートは外す。"""
+        low, high = under(scope)
+        known = {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                "SELECT path, id, mtime_ns, size, scanned_ns FROM docs WHERE path >= ? AND path < ?",
+                (low, high),
+            )
+        }
+        present: set[str] = set()
+        # 文書頻度は bigram ごとの増減をまとめ、最後に 1 回だけ書く
+        self._df_delta: Counter[str] = Counter()
+        with self.conn:
+            for entry in entries:
+                present.add(entry.path)
+                st = entry.stat or os.stat(entry.path)
+                record = known.get(entry.path)
+                if (
+                    record is not None
+                    and record[1:3] == (st.st_mtime_ns, st.st_size)
+                    and record[3] - st.st_mtime_ns >= MTIME_SETTLE_NS
+                ):
+                    self.reused += 1
+                    continue
+                if record is not None:
+                    self._remove(record[0])
+                self._add(entry.path, st)
+            for path, record in known.items():
+                if path not in present:
+                    self.removed += 1
+                    self._remove(record[0])
+            self.conn.executemany(
+                "INSERT INTO grams (gram, df) VALUES (?, ?) ON CONFLICT (gram) DO UPDATE SET df = df + excluded.df",
+                [item for item in self._df_delta.items() if item[1]],
+            )
+            self.conn.execute("DELETE FROM grams WHERE df <= 0")
+
+    def _add(self, path: str, st: os.stat_result) -> None:
+        try:
+            text = decode_text(Path(path).read_bytes())
+        except (OSError, UnicodeDecodeError):
+            return
+        self.parsed += 1
+        title, headings, body = note_fields(text, Path(path).stem)
+        cursor = self.conn.execute(
+            "INSERT INTO docs (path, mtime_ns, size, scanned_ns, title) VALUES (?, ?, ?, ?, ?)",
+            (path, st.st_mtime_ns, st.st_size, time.time_ns(), title),
+        )
+        doc = cursor.lastrowid
+        weights: dict[str, float] = {}
+        for field, part in enumerate((title, "\n".join(headings), "\n".join(body))):
+            for gram, tf in gram_counts(normalize(part), tails=True).items():
+                weights[gram] = weights.get(gram, 0.0) + FIELD_WEIGHTS[field] * (1 + math.log(tf))
+        self.conn.executemany(
+            "INSERT INTO postings (gram, doc, weight) VALUES (?, ?, ?)",
+            [(gram, doc, weight) for gram, weight in weights.items()],
+        )
+        self._df_delta.update(weights.keys())
+
+    def _remove(self, doc: int) -> None:
+        self._df_delta.subtract(gram for (gram,) in self.conn.execute("SELECT gram FROM postings WHERE doc = ?", (doc,)))
+        self.conn.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        self.conn.execute("DELETE FROM docs WHERE id = ?", (doc,))
+
+    def summary(self, total: int) -> str:
+        return (
+            f"[INFO] 検索索引: 再解析 {self.parsed} / {total} ファイル、再利用 {self.reused} ファイル、"
+            f"削除を反映 {self.removed} ファイル（{self.db_file}）"
+        )
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # --- 検索 ---
+
+    def _document_frequency(self, key: str) -> int:
+        if len(key) == 1:
+            # 1 文字の語は、その文字で始まるキー（bigram と連続末尾の 1 文字）全体で引く
+            row = self.conn.execute(
+                "SELECT SUM(df) FROM grams WHERE gram >= ? AND gram < ?", (key, prefix_end(key))
+            ).fetchone()
+        else:
+            row = self.conn.execute("SELECT df FROM grams WHERE gram = ?", (key,)).fetchone()
+        return (row[0] or 0) if row else 0
+
+    def candidates(
+        self, terms: list[str], scope: Path | None = None, limit: int = 10, offset: int = 0
+    ) -> tuple[list[tuple[str, str, float]], int]:
+        """すべての語の bigram を含むノートの (パス, タイトル, スコア) をスコアの降順に limit 件と、候補の総数。
+
+        集計は SQLite の中で行う（ノートごとに 重み x idf を bigram について足す）。
+        """
+        keys = sorted({gram for term in terms for gram in gram_counts(term)})
+        if not keys:
+            return [], 0
+        total = max(self.count(), 1)
+        idf: dict[str, float] = {}
+        for key in keys:
+            frequency = self._document_frequency(key)
+            if not frequency:
+                return [], 0
+            idf[key] = math.log(1 + total / frequency)
+        if all(len(key) == 2 for key in keys):
+            # 最も珍しい bigram の転置リストを起点に、残りは (gram, doc) の主キーで引く
+            keys.sort(key=idf.__getitem__, reverse=True)
+            ranked, params = self._joined_sql(keys, idf)
+        else:
+            ranked, params = self._grouped_sql(keys, idf)
+        if scope is not None:
+            ranked += ", scoped (doc, score) AS (SELECT ranked.doc, ranked.score FROM ranked JOIN docs AS d" \
+                " ON d.id = ranked.doc WHERE d.path >= ? AND d.path < ?)"
+            params += under(scope)
+        # 並べ替えと件数は id のまま済ませ、パスとタイトルは表示する分だけ引く
+        rows = self.conn.execute(
+            f"""
+            WITH {ranked},
+            page AS (
+                SELECT doc, score, COUNT(*) OVER () AS total
+                FROM {"scoped" if scope is not None else "ranked"}
+                ORDER BY score DESC, doc
+                LIMIT ? OFFSET ?
+            )
+            SELECT d.path, d.title, page.score, page.total
+            FROM page JOIN docs AS d ON d.id = page.doc
+            ORDER BY page.score DESC, page.doc
+            """,
+            [*params, limit, offset],
+        ).fetchall()
+        return [row[:3] for row in rows], rows[0][3] if rows else 0
+
+    @staticmethod
+    def _joined_sql(keys: list[str], idf: dict[str, float]) -> tuple[str, list[object]]:
+        """bigram だけの語。keys[0] の転置リストを走査し、残りの bigram をノートごとに主キーで突き合わせる。"""
+        joins = "".join(
+            f" CROSS JOIN postings AS p{i} ON p{i}.gram = ? AND p{i}.doc = p0.doc" for i in range(1, len(keys))
+        )
+        score = " + ".join(f"p{i}.weight * ?" for i in range(len(keys)))
+        sql = f"ranked (doc, score) AS (SELECT p0.doc, {score} FROM postings AS p0{joins} WHERE p0.gram = ?)"
+        return sql, [*(idf[key] for key in keys), *keys[1:], keys[0]]
+
+    @staticmethod
+    def _grouped_sql(keys: list[str], idf: dict[str, float]) -> tuple[str, list[object]]:
+        """1 文字の語を含むとき。キーで始まる範囲の転置リストをノートごとに集計し、全キーがそろうものを残す。"""
+        values = ", ".join(["(?, ?, ?, ?)"] * len(keys))
+        sql = f"""q (key, low, high, idf) AS (VALUES {values}),
+            ranked (doc, score) AS (
+                SELECT p.doc, SUM(p.weight * q.idf)
+                FROM q JOIN postings AS p ON p.gram >= q.low AND p.gram < q.high
+                GROUP BY p.doc
+                HAVING COUNT(DISTINCT q.key) = {len(keys)}
+            )"""
+        params: list[object] = []
+        for key in keys:
+            params += [key, key, prefix_end(key), idf[key]]
+        return sql, params
+
+    def search(self, query: str, limit: int = 10, scope: Path | None = None) -> tuple[list[Hit], int]:
+        """(上位 limit 件のヒット, bigram で絞った候補数)。空白区切りの語はすべて含むものだけ返す。"""
+        terms = [normalize(term) for term in query.split()]
+        terms = [term for term in terms if RUN_RE.search(term)]
+        hits: list[Hit] = []
+        page = max(limit * 2, 20)
+        offset = total = 0
+        while len(hits) < limit:
+            # bigram の偶然の一致は本文で確かめて落とすので、足りなければ次の候補を引く
+            ranked, count = self.candidates(terms, scope, page, offset)
+            total = total or count
+            for path, title, score in ranked:
+                hit = self._verify(path, title, score, terms)
+                if hit is not None:
+                    hits.append(hit)
+                    if len(hits) >= limit:
+                        break
+            if len(ranked) < page:
+                break
+            offset += page
+        return hits, total
+
+    def _verify(self, path: str, title: str, score: float, terms: list[str]) -> Hit | None:
+        """本文を読み、すべての語が実際に現れるかを確かめて抜粋を作る。読めない・語がなければ None。"""
+        try:
+            text = decode_text(Path(path).read_bytes())
+        except (OSError, UnicodeDecodeError):
+            return None
+        folded = normalize(text)
+        if not all(term in folded for term in terms):
+            return None
+        snippets: list[tuple[int, str]] = []
+        for number, line in enumerate(text.split("\n"), start=1):
+            folded_line = normalize(line)
+            term = next((term for term in terms if term in folded_line), None)
+            if term is None or (number <= TITLE_SEARCH_LINES and line.strip() == f"# {title}"):
+                # タイトル行は結果の見出しに出しているので抜粋にしない
+                continue
+            snippets.append((number, snippet(line, term)))
+            if len(snippets) >= SNIPPETS_PER_HIT:
+                break
+        return Hit(path, title, score, snippets)
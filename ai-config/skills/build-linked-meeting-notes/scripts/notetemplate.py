@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Compiled {{slot}} template engine shared by create_note.py and the meeting-notes templates."""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from typing import Mapping
+
+
+# check_placeholders.py の PLACEHOLDER_RE と同じ形を 1 つのスロットとして扱う
+SLOT_RE = re.compile(r"\{\{([^{}\n]+)\}\}")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class CompiledTemplate:
+    """テンプレートを 1 回だけ [リテラル, スロット名, リテラル, ...] に分解して持つ。"""
+
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, text: str) -> None:
+        # 偶数番目がリテラル、奇数番目がスロット名
+        self.parts = SLOT_RE.split(text)
+        self.slots = frozenset(self.parts[1::2])
+
+    def ordered_slots(self) -> list[str]:
+        return list(dict.fromkeys(self.parts[1::2]))
+
+    def render(self, values: Mapping[str, object]) -> str:
+        """全スロットを 1 回の join で埋める。埋まらないスロットや余分なキーがあれば TemplateError。"""
+        missing = [name for name in self.ordered_slots() if name not in values]
+        unknown = sorted(values.keys() - self.slots)
+        if missing or unknown:
+            problems = []
+            if missing:
+                problems.append(f"値のないスロット: {', '.join(missing)}")
+            if unknown:
+                problems.append(f"テンプレートにないキー: {', '.join(unknown)}")
+            raise TemplateError(" / ".join(problems))
+        parts = list(self.parts)
+        parts[1::2] = [str(values[name]) for name in self.parts[1::2]]
+        return "".join(parts)
+
+
+# 解決済みパス -> ((mtime_ns, size), コンパイル結果)
+_compiled: dict[str, tuple[tuple[int, int], CompiledTemplate]] = {}
+
+
+def load_template(path: Path) -> CompiledTemplate:
+    """テンプレートファイルをコンパイルしてキャッシュする。ファイルが変わったときだけ読み直す。"""
+    key = str(path.resolve())
+    st = path.stat()
+    state = (st.st_mtime_ns, st.st_size)
+    cached = _compiled.get(key)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    template = CompiledTemplate(path.read_text(encoding="utf-8"))
+    _compiled[key] = (state, template)
+    return template
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Pruning os.scandir directory walker shared by the note scripts."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+
+IGNORE_FILENAME = ".noteignore"
+# 隠しディレクトリでなくても、ノートを置かない大きな木は常に降りない
+ALWAYS_PRUNED = frozenset({"node_modules", "__pycache__"})
+
+
+class WalkEntry(NamedTuple):
+    path: str
+    # 走査ルートからの相対パス（/ 区切り）
+    rel: str
+    # with_stat=True のときだけ入る（呼び出し側で stat し直さなくてよい）
+    stat: os.stat_result | None = None
+
+
+def read_ignore_patterns(ignore_file: Path) -> list[str]:
+    """gitignore 風の簡易パターン。空行と # 行は無視し、末尾 / はディレクトリだけに効く。"""
+    try:
+        lines = ignore_file.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+class NoteWalker:
+    """root 配下を os.scandir で走査し、隠し・除外ディレクトリには降りる前に枝刈りする。
+
+    シンボリックリンクのディレクトリには降りない（rglob と同じ）。threads > 1 のときは
+    同じ深さのディレクトリをスレッドで並行に一覧する（遅いファイルシステム向け）。
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        include_hidden: bool = False,
+        ignore_file: Path | None = None,
+        threads: int = 1,
+    ) -> None:
+        self.root = str(root)
+        self.include_hidden = include_hidden
+        self.threads = max(1, threads)
+        self.patterns = read_ignore_patterns(ignore_file or Path(root) / IGNORE_FILENAME)
+        # 枝刈りしたエントリと、読めなかったディレクトリ
+        self.pruned: list[os.DirEntry] = []
+        self.unreadable: list[str] = []
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def is_ignored(self, entry: os.DirEntry, is_dir: bool) -> bool:
+        if not self.include_hidden and entry.name.startswith("."):
+            return True
+        if is_dir and entry.name in ALWAYS_PRUNED:
+            return True
+        if not self.patterns:
+            return False
+        rel = self._relative(entry.path)
+        for pattern in self.patterns:
+            if pattern.endswith("/"):
+                if not is_dir:
+                    continue
+                pattern = pattern.rstrip("/")
+            if fnmatchcase(entry.name, pattern) or fnmatchcase(rel, pattern.lstrip("/")):
+                return True
+        return False
+
+    def _list(self, directory: str) -> tuple[str, list[os.DirEntry] | None]:
+        try:
+            with os.scandir(directory) as it:
+                return directory, list(it)
+        except OSError:
+            return directory, None
+
+    def _filter(self, directory: str, entries: list[os.DirEntry] | None) -> tuple[list[os.DirEntry], list[str]]:
+        if entries is None:
+            self.unreadable.append(directory)
+            return [], []
+        kept: list[os.DirEntry] = []
+        subdirs: list[str] = []
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if self.is_ignored(entry, is_dir):
+                self.pruned.append(entry)
+                continue
+            kept.append(entry)
+            if is_dir:
+                subdirs.append(entry.path)
+        return kept, subdirs
+
+    def iter_directories(self) -> Iterator[tuple[str, list[os.DirEntry]]]:
+        """(ディレクトリ, 枝刈り後のエントリ) をディレクトリごとに返す。"""
+        if self.threads == 1:
+            stack = [self.root]
+            while stack:
+                directory = stack.pop()
+                kept, subdirs = self._filter(*self._list(directory))
+                yield directory, kept
+                stack.extend(subdirs)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            level = [self.root]
+            while level:
+                next_level: list[str] = []
+                for directory, entries in executor.map(self._list, level):
+                    kept, subdirs = self._filter(directory, entries)
+                    yield directory, kept
+                    next_level.extend(subdirs)
+                level = next_level
+
+    def files(self, suffix: str = ".md", with_stat: bool = False) -> list[WalkEntry]:
+        """suffix で終わる通常ファイル（リンク先がファイルのシンボリックリンクを含む）を走査順に返す。"""
+        found: list[WalkEntry] = []
+        for _, entries in self.iter_directories():
+            for entry in entries:
+                if not entry.name.endswith(suffix) or not entry.is_file():
+                    continue
+                stat_result = None
+                if with_stat:
+                    try:
+                        stat_result = entry.stat()
+                    except OSError:
+                        continue
+                found.append(WalkEntry(entry.path, self._relative(entry.path), stat_result))
+        return found
+
+
+def markdown_paths(
+    root: Path,
+    include_hidden: bool = False,
+    threads: int = 1,
+) -> list[Path]:
+    """root 配下の .md ファイルを Path のソート順で返す。"""
+    walker = NoteWalker(root, include_hidden=include_hidden, threads=threads)
+    return sorted(Path(entry.path) for entry in walker.files())
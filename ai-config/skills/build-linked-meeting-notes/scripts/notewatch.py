@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Polling watch loop shared by the Markdown checkers (--watch)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple
+
+from notewalk import IGNORE_FILENAME, NoteWalker
+
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.5
+
+
+class Finding(NamedTuple):
+    # 行番号を含まない識別子。編集で行がずれても同じ指摘として扱う
+    key: tuple[str, ...]
+    display: str
+
+
+def tree_fingerprint(
+    root: Path,
+    exclude: Iterable[Path] = (),
+    include_hidden: bool = False,
+) -> dict[str, tuple[int, int]]:
+    """検査と同じ範囲（NoteWalker の枝刈り後）のエントリの (mtime_ns, size) を集める。
+
+    .git/ や node_modules/ など検査しない木の変化では再検査しない。.noteignore は枝刈りされても見張る。
+    """
+    skipped = tuple(str(path) for path in exclude)
+    walker = NoteWalker(root, include_hidden=include_hidden)
+    fingerprint: dict[str, tuple[int, int]] = {}
+    for _, entries in walker.iter_directories():
+        for entry in entries:
+            if any(entry.path == path or entry.path.startswith(path + os.sep) for path in skipped):
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            fingerprint[entry.path] = (st.st_mtime_ns, st.st_size)
+    ignore_file = root / IGNORE_FILENAME
+    try:
+        st = ignore_file.stat()
+    except OSError:
+        return fingerprint
+    fingerprint[str(ignore_file)] = (st.st_mtime_ns, st.st_size)
+    return fingerprint
+
+
+def paths_fingerprint(paths: Iterable[str]) -> dict[str, tuple[int, int] | None]:
+    fingerprint: dict[str, tuple[int, int] | None] = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            fingerprint[path] = None
+            continue
+        fingerprint[path] = (st.st_mtime_ns, st.st_size)
+    return fingerprint
+
+
+def wait_for_change(
+    fingerprint: Callable[[], object],
+    last: object,
+    interval: float,
+    debounce: float,
+) -> object:
+    """変化を検出したら、書き込みが debounce 秒落ち着くまで待ってから新しい状態を返す。"""
+    while True:
+        time.sleep(interval)
+        state = fingerprint()
+        if state != last:
+            break
+    while True:
+        time.sleep(debounce)
+        settled = fingerprint()
+        if settled == state:
+            return settled
+        state = settled
+
+
+def watch_new_paths(fingerprint: Callable[[], object], state: object) -> object:
+    """検査で新しく分かったリンク先など、state にないパスは検査後の状態を基準にする。
+
+    state にあるパスは検査前の値のままなので、検査中の変更も次の比較で拾う。
+    """
+    latest = fingerprint()
+    if isinstance(state, dict) and isinstance(latest, dict):
+        return {**latest, **state}
+    return state
+
+
+def diff_findings(previous: list[Finding], current: list[Finding]) -> tuple[list[Finding], list[Finding]]:
+    remaining = Counter(finding.key for finding in previous)
+    added: list[Finding] = []
+    for finding in current:
+        if remaining[finding.key] > 0:
+            remaining[finding.key] -= 1
+        else:
+            added.append(finding)
+    still = Counter(finding.key for finding in current)
+    fixed: list[Finding] = []
+    for finding in previous:
+        if still[finding.key] > 0:
+            still[finding.key] -= 1
+        else:
+            fixed.append(finding)
+    return added, fixed
+
+
+def watch_loop(
+    run_cycle: Callable[[], list[Finding]],
+    fingerprint: Callable[[], object],
+    interval: float = DEFAULT_INTERVAL,
+    debounce: float = DEFAULT_DEBOUNCE,
+) -> int:
+    """run_cycle を変更のたびに呼び、前回との差分（新規 / 解消）だけを表示する。Ctrl+C で終了。"""
+    state = fingerprint()
+    previous = run_cycle()
+    state = watch_new_paths(fingerprint, state)
+    print(f"[WATCH] 監視を開始しました（指摘 {len(previous)} 件）。Ctrl+C で終了します。")
+    for finding in previous:
+        print(f"  {finding.display}")
+    sys.stdout.flush()
+
+    try:
+        while True:
+            state = wait_for_change(fingerprint, state, interval, debounce)
+            current = run_cycle()
+            state = watch_new_paths(fingerprint, state)
+            added, fixed = diff_findings(previous, current)
+            stamp = datetime.now().strftime("%H:%M:%S")
+            print(
+                f"[WATCH] {stamp} 再検査: 新規 {len(added)} 件 / 解消 {len(fixed)} 件 / 残り {len(current)} 件"
+            )
+            for finding in added:
+                print(f"+ {finding.display}")
+            for finding in fixed:
+                print(f"- {finding.display}")
+            # パイプ越しに読むエージェントへ、サイクルごとに確実に届ける
+            sys.stdout.flush()
+            previous = current
+    except KeyboardInterrupt:
+        print("[WATCH] 監視を終了しました。")
+        return 1 if previous else 0
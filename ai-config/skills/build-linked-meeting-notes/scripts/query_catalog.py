@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Answer questions about a note tree from the shared SQLite catalog."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from notecatalog import NoteCatalog, locate_catalog
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="ノートの共有カタログ（.cache/notes.sqlite3）に問い合わせる。"
+        "カタログは各スクリプトを --catalog 付きで実行したときに作られ、更新される。"
+    )
+    parser.add_argument(
+        "--catalog-file",
+        type=Path,
+        help="カタログのファイル（省略時は対象パスから上位へたどって探す）",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    links_into = commands.add_parser("links-into", help="指定ファイルへ向かうリンクの一覧（逆リンク）")
+    links_into.add_argument("path", type=Path, help="リンク先の Markdown ファイル")
+
+    free = commands.add_parser("free-numbers", help="フォルダの番号帯の空き番号")
+    free.add_argument("directory", type=Path, help="ノートのフォルダ")
+    free.add_argument("range", help="番号帯（例: 10-19）")
+
+    anchors = commands.add_parser("anchors", help="ファイルの見出し・HTML アンカーの一覧")
+    anchors.add_argument("path", type=Path, help="Markdown ファイル")
+
+    placeholders = commands.add_parser("placeholders", help="フォルダ配下で記録済みの未置換プレースホルダ")
+    placeholders.add_argument("directory", type=Path, help="検索するフォルダ")
+    return parser.parse_args()
+
+
+def parse_range(value: str) -> tuple[int, int]:
+    try:
+        start_text, end_text = value.split("-", 1)
+        start, end = int(start_text), int(end_text)
+    except ValueError:
+        raise ValueError(f"番号帯は 10-19 の形式で指定してください: {value}") from None
+    if not (1 <= start <= end <= 99):
+        raise ValueError(f"番号帯は 01-99 の範囲で指定してください: {value}")
+    return start, end
+
+
+def main() -> int:
+    args = parse_args()
+    subject = (getattr(args, "path", None) or args.directory).expanduser().resolve()
+    catalog_file = args.catalog_file.expanduser().resolve() if args.catalog_file else locate_catalog(subject)
+    if not catalog_file.is_file():
+        print(f"[ERROR] カタログが見つかりません: {catalog_file}")
+        print("[NEXT] 先に check_links.py などを --catalog 付きで実行してください。")
+        return 2
+
+    with NoteCatalog(catalog_file) as catalog:
+        try:
+            if args.command == "links-into":
+                rows = catalog.links_into(subject)
+                for source, line, rule, raw in rows:
+                    print(f"{source}:{line} [{rule}] {raw}")
+                print(f"[INFO] {subject} へのリンク: {len(rows)} 件")
+            elif args.command == "free-numbers":
+                start, end = parse_range(args.range)
+                free = catalog.free_numbers(subject, start, end)
+                print(" ".join(f"{num:02d}" for num in free) or "（空きなし）")
+                print(f"[INFO] {start:02d}-{end:02d} の空き: {len(free)} / {end - start + 1}")
+            elif args.command == "anchors":
+                for anchor in sorted(catalog.anchors_of(subject)):
+                    print(anchor)
+            else:
+                rows = catalog.placeholders_under(subject)
+                for path, line, rule, text in rows:
+                    print(f"{path}:{line} [{rule}] {text}")
+                print(f"[INFO] 記録済みの未置換プレースホルダ: {len(rows)} 件")
+        except ValueError as exc:
+            print(f"[ERROR] {exc}")
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from fsutil import write_atomic
+from notetemplate import CompiledTemplate, TemplateError, load_template
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parents[1] / "assets" / "templates"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="議事録テンプレート（assets/templates）の {{...}} を JSON の値で埋めて出力する。"
+        "値のないスロットや余分なキーがあればエラーにし、何も書き込まない。"
+    )
+    parser.add_argument(
+        "template",
+        nargs="?",
+        help="テンプレート名（index / memo / topic）またはテンプレートファイルのパス",
+    )
+    parser.add_argument(
+        "--values",
+        help="スロット名 -> 値 の JSON ファイル（- で標準入力）",
+    )
+    parser.add_argument(
+        "--output",
+        help="出力先ファイル（省略時は標準出力）",
+    )
+    parser.add_argument(
+        "--batch",
+        help='複数ページをまとめて作る JSON（[{"template": ..., "output": ..., "values": {...}}, ...]、- で標準入力）',
+    )
+    parser.add_argument(
+        "--list-slots",
+        action="store_true",
+        help="テンプレートのスロット名を出現順に表示して終了する",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="出力先が存在する場合に上書きする",
+    )
+    return parser.parse_args()
+
+
+def resolve_template(name: str) -> Path:
+    candidate = Path(name)
+    if candidate.suffix.lower() == ".md" and candidate.exists():
+        return candidate
+    bundled = TEMPLATES_DIR / (name if name.endswith(".md") else f"{name}.md")
+    if bundled.exists():
+        return bundled
+    choices = ", ".join(path.stem for path in sorted(TEMPLATES_DIR.glob("*.md")))
+    raise ValueError(f"テンプレートが見つかりません: {name}（同梱: {choices}）")
+
+
+def read_json(source: str) -> Any:
+    try:
+        text = sys.stdin.read() if source == "-" else Path(source).read_text(encoding="utf-8")
+        return json.loads(text)
+    except (OSError, ValueError) as exc:
+        raise ValueError(f"JSON を読めません: {source} ({exc})") from exc
+
+
+def render_job(template_name: str, values: Any) -> str:
+    if not isinstance(values, dict):
+        raise ValueError("values はスロット名 -> 値 のオブジェクトで指定してください。")
+    template: CompiledTemplate = load_template(resolve_template(template_name))
+    try:
+        return template.render(values)
+    except TemplateError as exc:
+        raise ValueError(f"{template_name}: {exc}") from exc
+
+
+def write_output(output: Path, content: str, overwrite: bool) -> None:
+    if output.exists() and not overwrite:
+        raise ValueError(f"既に存在します: {output}（必要なら --overwrite を付けてください）")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(output, content)
+
+
+def load_batch(source: str) -> list[tuple[str, Path, Any]]:
+    jobs = read_json(source)
+    if not isinstance(jobs, list) or not jobs:
+        raise ValueError("--batch はページごとのオブジェクトの配列で指定してください。")
+    parsed: list[tuple[str, Path, Any]] = []
+    for index, job in enumerate(jobs, start=1):
+        if not isinstance(job, dict) or not job.get("template") or not job.get("output"):
+            raise ValueError(f"--batch の {index} 件目に template と output が必要です。")
+        parsed.append((str(job["template"]), Path(job["output"]), job.get("values", {})))
+    return parsed
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        if args.list_slots:
+            if not args.template:
+                raise ValueError("--list-slots にはテンプレートを指定してください。")
+            for name in load_template(resolve_template(args.template)).ordered_slots():
+                print(name)
+            return 0
+
+        if args.batch:
+            if args.template or args.values or args.output:
+                raise ValueError("--batch とテンプレート / --values / --output は同時に指定できません。")
+            jobs = load_batch(args.batch)
+            # 全ページを先に埋めてから書き込むので、1 件でもエラーがあれば何も書かない
+            rendered = [(output, render_job(template, values)) for template, output, values in jobs]
+            for output, _ in rendered:
+                if output.exists() and not args.overwrite:
+                    raise ValueError(f"既に存在します: {output}（必要なら --overwrite を付けてください）")
+            for output, content in rendered:
+                write_output(output, content, args.overwrite)
+            print(f"[OK] {len(rendered)} ページを作成しました")
+            return 0
+
+        if not args.template or not args.values:
+            raise ValueError("テンプレートと --values を指定してください（まとめて作る場合は --batch）。")
+        content = render_job(args.template, read_json(args.values))
+    except ValueError as exc:
+        print(f"[ERROR] {exc}")
+        return 1
+
+    if args.output:
+        try:
+            write_output(Path(args.output), content, args.overwrite)
+        except ValueError as exc:
+            print(f"[ERROR] {exc}")
+            return 1
+        print(f"[OK] 作成しました: {args.output}")
+    else:
+        sys.stdout.write(content)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
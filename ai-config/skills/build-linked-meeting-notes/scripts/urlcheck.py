@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Concurrent, rate-limited and cached checks of external (http/https) links."""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from urllib.parse import quote, urljoin, urlsplit
+
+from fsutil import write_atomic
+from mdscan import LARGE_FILE_BYTES
+from notecatalog import NoteCatalog
+from notelint import is_http_link, lint_files
+
+
+EXTERNAL_CACHE_FILE = "external_links.json"
+EXTERNAL_CACHE_VERSION = 1
+DEFAULT_TTL_HOURS = 24.0
+# 接続できなかった結果は一時的なことが多いので、TTL より短い時間だけ使い回す
+UNREACHABLE_TTL_SECONDS = 15 * 60
+DEFAULT_WORKERS = 8
+# 1 ホストあたりの毎秒の要求数（同じホストへは 1 本の接続で順に問い合わせる）
+DEFAULT_RATE = 2.0
+DEFAULT_TIMEOUT = 10.0
+
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+# GET では本文をこれ以上読まない（読み切れなかった接続は閉じ、次の要求で張り直す）
+GET_BODY_LIMIT = 64 * 1024
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; note-link-checker)",
+    "Accept": "*/*",
+}
+# URL のパス・クエリで、そのまま送ってよい文字（それ以外は %XX にする）
+PATH_SAFE = "/%:@!$&'()*+,;=~-._"
+QUERY_SAFE = PATH_SAFE + "?"
+
+
+class UrlStatus(NamedTuple):
+    # 最終的な HTTP ステータス（リダイレクトをたどった後）。接続できなければ None
+    status: int | None
+    # 接続できなかった理由
+    error: str | None
+    checked_at: float
+    # URL として解釈できない（問い合わせていない。キャッシュにも残さない）
+    invalid: bool = False
+
+    @property
+    def broken(self) -> bool:
+        return self.status is not None and self.status >= 400
+
+    @property
+    def unreachable(self) -> bool:
+        return self.status is None and not self.invalid
+
+
+def strip_fragment(url: str) -> str:
+    return url.split("#", 1)[0]
+
+
+def describe(error: BaseException) -> str:
+    return str(error) or type(error).__name__
+
+
+def host_key(url: str) -> tuple[str, str]:
+    """(スキーム, ホスト:ポート) を小文字で。解釈できない URL（[ の閉じ忘れ、数字でないポートなど）は ValueError。"""
+    parts = urlsplit(url)
+    parts.port  # 数字でないポートはここで ValueError になる
+    if not parts.hostname:
+        raise ValueError("ホスト名がありません")
+    return parts.scheme.lower(), parts.netloc.lower()
+
+
+def external_links(
+    paths: list[str],
+    rule: str,
+    jobs: int = 1,
+    large_bytes: int = LARGE_FILE_BYTES,
+    catalog: NoteCatalog | None = None,
+) -> list[list[tuple[int, str]]]:
+    """各ファイルの外部リンク (行番号, URL)。読めないファイルは空にする（ローカルリンク側で報告される）。"""
+    if catalog is not None:
+        linted = catalog.lint_files(paths, (rule,), jobs, large_bytes)
+    else:
+        linted = lint_files(paths, (rule,), jobs, large_bytes)
+    return [result.hits[rule] if result.error is None else [] for result in linted]
+
+
+class ExternalCache:
+    """URL（フラグメントなし）-> 確認結果。確認から ttl 秒（接続できなかったものは最長 15 分）を過ぎたら確認し直す。"""
+
+    def __init__(self, cache_file: Path | None, ttl_seconds: float) -> None:
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.entries: dict[str, UrlStatus] = {}
+
+    @classmethod
+    def open(cls, cache_dir: Path, ttl_seconds: float) -> ExternalCache:
+        cache = cls(cache_dir / EXTERNAL_CACHE_FILE, ttl_seconds)
+        try:
+            raw = json.loads(cache.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cache
+        if raw.get("version") != EXTERNAL_CACHE_VERSION:
+            return cache
+        cache.entries = {url: UrlStatus(*entry) for url, entry in raw.get("urls", {}).items()}
+        return cache
+
+    def fresh(self, entry: UrlStatus, now: float) -> bool:
+        ttl = min(self.ttl_seconds, UNREACHABLE_TTL_SECONDS) if entry.unreachable else self.ttl_seconds
+        return now - entry.checked_at <= ttl
+
+    def get(self, url: str) -> UrlStatus | None:
+        entry = self.entries.get(url)
+        if entry is None or not self.fresh(entry, time.time()):
+            return None
+        return entry
+
+    def put(self, url: str, status: UrlStatus) -> None:
+        self.entries[url] = status
+
+    def save(self) -> None:
+        if self.cache_file is None:
+            return
+        # 期限切れの記録は次回も使わないので捨てる
+        now = time.time()
+        urls = {url: list(entry) for url, entry in self.entries.items() if self.fresh(entry, now)}
+        payload = {"version": EXTERNAL_CACHE_VERSION, "urls": urls}
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.cache_file, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+
+class HostSession:
+    """1 ホスト分の持続接続。要求の間隔を interval 秒以上あけ、接続は切られるまで使い回す。"""
+
+    def __init__(self, scheme: str, netloc: str, timeout: float, interval: float) -> None:
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.interval = interval
+        self.conn: http.client.HTTPConnection | None = None
+        self.next_at = 0.0
+        self.requests = 0
+        self.connects = 0
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.conn is None:
+            parts = urlsplit(f"{self.scheme}://{self.netloc}")
+            host = (parts.hostname or "").encode("idna").decode("ascii")
+            if self.scheme == "https":
+                self.conn = http.client.HTTPSConnection(
+                    host, parts.port, timeout=self.timeout, context=ssl.create_default_context()
+                )
+            else:
+                self.conn = http.client.HTTPConnection(host, parts.port, timeout=self.timeout)
+            self.connects += 1
+        return self.conn
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _wait_turn(self) -> None:
+        delay = self.next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_at = time.monotonic() + self.interval
+
+    def request(self, method: str, target: str) -> tuple[int, str | None]:
+        """(ステータス, Location)。使い回した接続が相手に切られていたら 1 回だけ張り直す。"""
+        self._wait_turn()
+        for attempt in (0, 1):
+            reused = self.conn is not None
+            try:
+                conn = self._connection()
+                conn.request(method, target, headers=REQUEST_HEADERS)
+                response = conn.getresponse()
+                response.read(GET_BODY_LIMIT)
+                if not response.isclosed() or response.will_close:
+                    self.close()
+                self.requests += 1
+                return response.status, response.getheader("Location")
+            except (OSError, http.client.HTTPException):
+                self.close()
+                if attempt or not reused:
+                    raise
+        raise AssertionError("unreachable")
+
+
+def request_target(url: str) -> str:
+    parts = urlsplit(url)
+    target = quote(parts.path or "/", safe=PATH_SAFE)
+    if parts.query:
+        target += "?" + quote(parts.query, safe=QUERY_SAFE)
+    return target
+
+
+class ExternalChecker:
+    """重複を除いた URL をホストごとにまとめ、ホスト単位でスレッドプールに流す。
+
+    同じホストへの要求は 1 本の持続接続で順に送り、間隔を 1/rate 秒以上あける。
+    各 URL はまず HEAD で確かめ、4xx/5xx（HEAD を受け付けないサーバーを含む）なら GET で確かめ直す。
+    """
+
+    def __init__(
+        self,
+        cache: ExternalCache,
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.timeout = timeout
+        self.results: dict[str, UrlStatus] = {}
+        self.reused = 0
+        self.fetched = 0
+        self.requests = 0
+        self.connects = 0
+        self._lock = threading.Lock()
+
+    def check(self, urls: Iterable[str]) -> dict[str, UrlStatus]:
+        """URL（フラグメント付きでもよい）-> 結果。キャッシュにない URL だけ問い合わせる。"""
+        hosts: dict[tuple[str, str], list[str]] = {}
+        for url in dict.fromkeys(strip_fragment(url) for url in urls):
+            cached = self.cache.get(url)
+            if cached is not None:
+                self.results[url] = cached
+                self.reused += 1
+                continue
+            try:
+                key = host_key(url)
+            except ValueError as error:
+                self.results[url] = UrlStatus(None, describe(error), time.time(), invalid=True)
+                continue
+            hosts.setdefault(key, []).append(url)
+        if hosts:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(hosts))) as pool:
+                for _ in pool.map(self._check_host, hosts.items()):
+                    pass
+        return self.results
+
+    def save(self) -> None:
+        # 問い合わせていなければキャッシュは変わらない（.cache/ も作らない）
+        if self.fetched:
+            self.cache.save()
+
+    def status_of(self, url: str) -> UrlStatus:
+        return self.results[strip_fragment(url)]
+
+    def _check_host(self, item: tuple[tuple[str, str], list[str]]) -> None:
+        (scheme, netloc), urls = item
+        session = HostSession(scheme, netloc, self.timeout, self.interval)
+        try:
+            for url in urls:
+                status = self._check_url(session, url)
+                with self._lock:
+                    self.results[url] = status
+                    self.cache.put(url, status)
+                    self.fetched += 1
+        finally:
+            session.close()
+            with self._lock:
+                self.requests += session.requests
+                self.connects += session.connects
+
+    def _check_url(self, session: HostSession, url: str) -> UrlStatus:
+        status = self._fetch(session, url, "HEAD")
+        if status.broken:
+            status = self._fetch(session, url, "GET")
+        return status
+
+    def _fetch(self, session: HostSession, url: str, method: str) -> UrlStatus:
+        """url に method で問い合わせ、リダイレクトを MAX_REDIRECTS 回までたどる。"""
+        current = url
+        for _ in range(MAX_REDIRECTS + 1):
+            try:
+                key = host_key(current)
+            except ValueError as error:
+                return UrlStatus(None, f"不正なリダイレクト先（{describe(error)}）: {current}", time.time())
+            same_host = key == (session.scheme, session.netloc)
+            # 別ホストへのリダイレクトは、その場限りの接続で確かめる
+            target_session = session if same_host else HostSession(*key, self.timeout, 0.0)
+            try:
+                code, location = target_session.request(method, request_target(current))
+            except (OSError, http.client.HTTPException, UnicodeError, ValueError) as error:
+                return UrlStatus(None, describe(error), time.time())
+            finally:
+                if not same_host:
+                    target_session.close()
+                    with self._lock:
+                        self.requests += target_session.requests
+                        self.connects += target_session.connects
+            if code not in REDIRECT_STATUSES or not location:
+                return UrlStatus(code, None, time.time())
+            try:
+                current = urljoin(current, location)
+            except ValueError as error:
+                return UrlStatus(None, f"不正なリダイレクト先（{describe(error)}）: {location}", time.time())
+            if not is_http_link(current):
+                return UrlStatus(None, f"http(s) 以外へのリダイレクト: {current}", time.time())
+        return UrlStatus(None, f"リダイレクトが {MAX_REDIRECTS} 回を超えました", time.time())
+
+    def summary(self) -> str:
+        broken = sum(1 for status in self.results.values() if status.broken)
+        unreachable = sum(1 for status in self.results.values() if status.unreachable)
+        invalid = sum(1 for status in self.results.values() if status.invalid)
+        return (
+            f"[INFO] 外部リンク: URL {len(self.results)} 件（キャッシュ再利用 {self.reused} 件、"
+            f"問い合わせ {self.fetched} 件 / 要求 {self.requests} 回 / 接続 {self.connects} 回）、"
+            f"切れ {broken} 件、確認できず {unreachable} 件" + (f"、不正な URL {invalid} 件" if invalid else "")
+        )
+
+
+def add_external_arguments(parser: argparse.ArgumentParser) -> None:
+    """--external とその調整用オプション（check_links.py / validate_note_links.py 共通）。"""
+    parser.add_argument(
+        "--external",
+        action="store_true",
+        help=f"http/https の外部リンクも確認する（URL ごとに 1 回だけ問い合わせ、結果を .cache/{EXTERNAL_CACHE_FILE} に残す）",
+    )
+    parser.add_argument(
+        "--external-ttl",
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        metavar="HOURS",
+        help="外部リンクの確認結果を使い回す時間（既定 %(default)g。0 で毎回確認する）",
+    )
+    parser.add_argument(
+        "--external-workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        metavar="N",
+        help="同時に確認するホストの数（既定 %(default)d）",
+    )
+    parser.add_argument(
+        "--external-rate",
+        type=float,
+        default=DEFAULT_RATE,
+        metavar="R",
+        help="1 ホストあたり毎秒の要求数の上限（既定 %(default)g。0 で制限なし）",
+    )
+    parser.add_argument(
+        "--external-timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        metavar="SEC",
+        help="1 要求あたりのタイムアウト（秒、既定 %(default)g）",
+    )
+
+
+def checker_from_args(args: argparse.Namespace, cache_dir: Path) -> ExternalChecker:
+    cache = ExternalCache.open(cache_dir, args.external_ttl * 3600)
+    return ExternalChecker(cache, args.external_workers, args.external_rate, args.external_timeout)
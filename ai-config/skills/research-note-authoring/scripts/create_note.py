@@ -4,10 +4,27 @@
 from __future__ import annotations
 
 import argparse
+import csv
+import json
 import os
 import re
+import sys
+import time
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+# テンプレートエンジンは build-linked-meeting-notes スキル側に置いている
+SHARED_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "build-linked-meeting-notes" / "scripts"
+sys.path.insert(0, str(SHARED_SCRIPTS_DIR))
+
+from fsutil import temp_path, write_atomic  # noqa: E402
+from notecatalog import MTIME_SETTLE_NS, NoteCatalog  # noqa: E402
+from noteprofile import PROFILE, add_profile_arguments, run_main  # noqa: E402
+from notetemplate import CompiledTemplate, TemplateError  # noqa: E402
+from notetemplate import load_template as load_compiled_template  # noqa: E402
+from notewalk import NoteWalker  # noqa: E402
 
 
 MODE_DIRS = {
@@ -20,6 +37,14 @@ TEMPLATE_FILES = {
     "project": "project-note.md",
 }
 
+# 異常終了で残った採番予約をこの秒数より古ければ取り消す
+CLAIM_STALE_SECONDS = 600
+
+NUMBERED_NOTE_RE = re.compile(r"^(\d{2})_.*\.md$")
+# 採番インデックス（--root 配下）。ディレクトリの mtime が変わったら作り直す
+NUMBER_INDEX_FILE = Path(".cache") / "note_numbers.json"
+NUMBER_INDEX_VERSION = 1
+
 CATEGORY_RANGES = {
     "general": {
         "dify": (1, 9),
@@ -59,42 +84,275 @@ def sanitize_title_for_filename(title: str) -> str:
 def collect_existing_numbers(directory: Path) -> set[int]:
     numbers: set[int] = set()
     for path in directory.glob("*.md"):
-        match = re.match(r"^(\d{2})_.*\.md$", path.name)
+        match = NUMBERED_NOTE_RE.match(path.name)
         if match:
             numbers.add(int(match.group(1)))
     return numbers
 
 
-def get_next_number(directory: Path, number_range: tuple[int, int] | None = None) -> int:
-    existing = collect_existing_numbers(directory)
-    if number_range is None:
-        next_num = (max(existing) + 1) if existing else 1
-        if not (1 <= next_num <= 99):
-            raise SystemExit(
-                "[ERROR] 採番が 99 を超えます。--range または --category を指定して番号帯を明示してください。"
-            )
+def numbers_bitmap(numbers: Iterable[int]) -> int:
+    used = 0
+    for num in numbers:
+        used |= 1 << num
+    return used
+
+
+class NumberAllocator:
+    """1 ディレクトリの使用済み番号を int のビット（n 番 = n ビット目）で持ち、続けて採番する。"""
+
+    def __init__(self, used: int = 0) -> None:
+        self.used = used
+
+    @classmethod
+    def scan(cls, directory: Path) -> NumberAllocator:
+        return cls(numbers_bitmap(collect_existing_numbers(directory)))
+
+    def allocate(self, number_range: tuple[int, int] | None = None) -> int:
+        if number_range is None:
+            # 最大の使用済み番号 + 1（未使用なら 1）
+            next_num = max(self.used.bit_length(), 1)
+            if not (1 <= next_num <= 99):
+                raise SystemExit(
+                    "[ERROR] 採番が 99 を超えます。--range または --category を指定して番号帯を明示してください。"
+                )
+        else:
+            start, end = number_range
+            free = ~self.used & ((1 << (end + 1)) - 1) & ~((1 << start) - 1)
+            if not free:
+                raise SystemExit(
+                    f"[ERROR] 指定した番号帯 {start:02d}-{end:02d} は空きがありません。"
+                )
+            # 番号帯の中で最も小さい空き番号
+            next_num = (free & -free).bit_length() - 1
+        self.used |= 1 << next_num
         return next_num
 
-    start, end = number_range
-    for num in range(start, end + 1):
-        if num not in existing:
-            return num
-    raise SystemExit(
-        f"[ERROR] 指定した番号帯 {start:02d}-{end:02d} は空きがありません。"
-    )
+
+def get_next_number(directory: Path, number_range: tuple[int, int] | None = None) -> int:
+    return NumberAllocator.scan(directory).allocate(number_range)
+
+
+class NumberIndex:
+    """ディレクトリ -> 使用済み番号ビットマップ を --root/.cache/ に保存する採番インデックス（--cache 指定時）。
+
+    ディレクトリの mtime が記録と同じなら走査せずにビットマップを返す。
+    番号の確定は claim_number の予約と再確認で行うので、インデックスは候補選びにだけ使う。
+    """
+
+    def __init__(self, index_file: Path | None) -> None:
+        self.index_file = index_file
+        # 絶対パス -> {"mtime_ns": int, "scanned_ns": int, "used": int}
+        self.entries: dict[str, dict[str, int]] = {}
+        self.dirty = False
+        # 記録をそのまま使った回数と、ディレクトリを一覧し直した回数
+        self.hits = 0
+        self.scans = 0
+
+    @classmethod
+    def open(cls, root: Path) -> NumberIndex:
+        index = cls(root / NUMBER_INDEX_FILE)
+        try:
+            raw = json.loads(index.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return index
+        if isinstance(raw, dict) and raw.get("version") == NUMBER_INDEX_VERSION:
+            index.entries = raw.get("directories", {})
+        return index
+
+    def record(self, directory: Path, mtime_ns: int, numbered: Iterable[tuple[int, str]]) -> None:
+        """走査済みの (番号, ファイル名) を記録する。"""
+        self._remember(directory, mtime_ns, numbers_bitmap(num for num, _ in numbered))
+
+    def _remember(self, directory: Path, mtime_ns: int, used: int) -> None:
+        self.entries[str(directory)] = {"mtime_ns": mtime_ns, "scanned_ns": time.time_ns(), "used": used}
+        self.dirty = True
+
+    def bitmap(self, directory: Path) -> int:
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            return 0
+        entry = self.entries.get(str(directory))
+        if (
+            entry is not None
+            and entry.get("mtime_ns") == mtime_ns
+            and entry.get("scanned_ns", 0) - mtime_ns >= MTIME_SETTLE_NS
+        ):
+            self.hits += 1
+            return entry["used"]
+        self.scans += 1
+        used = numbers_bitmap(collect_existing_numbers(directory))
+        self._remember(directory, mtime_ns, used)
+        return used
+
+    def allocator(self, directory: Path) -> NumberAllocator:
+        return NumberAllocator(self.bitmap(directory))
+
+    def __enter__(self) -> NumberIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """JSON のインデックスは開いたままのものがないので何もしない（保存は save）。"""
+
+    def save(self) -> None:
+        if self.index_file is None or not self.dirty:
+            return
+        payload = {"version": NUMBER_INDEX_VERSION, "directories": self.entries}
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.index_file, json.dumps(payload, separators=(",", ":")))
+        except OSError:
+            # インデックスは高速化のためだけのものなので、書けなくても採番は続ける
+            pass
+
+
+class CatalogNumberIndex(NumberIndex):
+    """--catalog 指定時。使用済み番号を共有カタログ（notecatalog.py）の numbers 表に置く。"""
+
+    def __init__(self, catalog: NoteCatalog) -> None:
+        super().__init__(None)
+        self.catalog = catalog
+
+    def record(self, directory: Path, mtime_ns: int, numbered: Iterable[tuple[int, str]]) -> None:
+        self.catalog.record_numbers(directory, mtime_ns, numbered)
+
+    def bitmap(self, directory: Path) -> int:
+        return numbers_bitmap(self.catalog.used_numbers(directory))
+
+    def save(self) -> None:
+        self.catalog.conn.commit()
+
+    def close(self) -> None:
+        # デーモンは同じプロセスで何度も呼ぶので、接続を残さない
+        self.catalog.close()
+
+
+def open_number_index(root: Path, use_catalog: bool, use_cache: bool) -> NumberIndex:
+    """--catalog ならカタログ、--cache なら JSON のインデックス。どちらもなければ毎回走査する（何も保存しない）。"""
+    with PROFILE.phase("cache"):
+        if use_catalog:
+            return CatalogNumberIndex(NoteCatalog.open(root))
+        return NumberIndex.open(root) if use_cache else NumberIndex(None)
+
+
+def save_number_index(index: NumberIndex) -> None:
+    with PROFILE.phase("cache"):
+        index.save()
+    record_index_stats(index)
+
+
+def record_index_stats(index: NumberIndex) -> None:
+    # --catalog のときはカタログ側で判定するので、記録の再利用数は数えない
+    if index.index_file is not None:
+        PROFILE.add_cache("number_index", index.hits, index.scans)
+
+
+def claim_path(directory: Path, num: int) -> Path:
+    return directory / f".{num:02d}.claim"
+
+
+def break_stale_claim(path: Path) -> bool:
+    """CLAIM_STALE_SECONDS より古い予約を取り消す。取り消した（または既に無い）なら True。"""
+    try:
+        if time.time() - path.stat().st_mtime < CLAIM_STALE_SECONDS:
+            return False
+        # rename は 1 プロセスしか成功しないので、同時に取り消そうとしても二重には消さない
+        moved = path.with_name(f"{path.name}.{os.getpid()}.stale")
+        os.rename(path, moved)
+    except FileNotFoundError:
+        return True
+    if time.time() - moved.stat().st_mtime < CLAIM_STALE_SECONDS:
+        # 確認後に新しく作られた予約を掴んだ場合は元に戻す
+        try:
+            os.link(moved, path)
+        except FileExistsError:
+            pass
+        moved.unlink()
+        return False
+    moved.unlink()
+    return True
+
+
+def try_claim(directory: Path, num: int) -> Path | None:
+    """番号 num の予約ファイルを O_EXCL で作る。他の作成処理が予約中なら None。"""
+    path = claim_path(directory, num)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if not break_stale_claim(path):
+                return None
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"{os.getpid()}\n")
+        return path
+    return None
 
 
-def load_template(skill_root: Path, mode: str) -> str:
+def number_in_use(directory: Path, num: int) -> bool:
+    return any(directory.glob(f"{num:02d}_*.md"))
+
+
+def claim_number(
+    directory: Path,
+    allocator: NumberAllocator,
+    number_range: tuple[int, int] | None,
+    first: int | None = None,
+) -> tuple[int, Path]:
+    """予約ファイルで番号を確保する。衝突したら次の空き番号で取り直す。
+
+    予約を取ったあとで NN_*.md が無いことを確かめ直すので、走査後に別の作成処理が
+    書き終えた番号も使わない。予約はノートを書き終えたら呼び出し側で消す。
+    """
+    num = first if first is not None else allocator.allocate(number_range)
+    while True:
+        claim = try_claim(directory, num)
+        if claim is not None:
+            if not number_in_use(directory, num):
+                return num, claim
+            claim.unlink(missing_ok=True)
+        num = allocator.allocate(number_range)
+
+
+def write_temp(target_file: Path, content: str) -> Path:
+    temp_file = temp_path(target_file)
+    temp_file.write_text(content, encoding="utf-8")
+    return temp_file
+
+
+def publish(temp_file: Path, target_file: Path, overwrite: bool) -> None:
+    """一時ファイルを本来の名前にする。overwrite でなければ既存ファイルがあると FileExistsError。"""
+    if overwrite:
+        os.replace(temp_file, target_file)
+        return
+    # link は既存の名前を上書きしないので、同名ファイルを作った別の処理とも競合しない
+    try:
+        os.link(temp_file, target_file)
+    except FileExistsError:
+        temp_file.unlink()
+        raise
+    except OSError:
+        # ハードリンクを作れないファイルシステムでは O_EXCL で作って中身を写す
+        fd = os.open(target_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            f.write(temp_file.read_bytes())
+    temp_file.unlink()
+
+
+def load_template(skill_root: Path, mode: str) -> CompiledTemplate:
     template_path = skill_root / "assets" / "templates" / TEMPLATE_FILES[mode]
-    return template_path.read_text(encoding="utf-8")
+    return load_compiled_template(template_path)
 
 
-def render_template(template: str, title: str, root_readme_rel: str) -> str:
-    content = template
-    content = content.replace("{{TITLE}}", title)
-    content = content.replace("{{ROOT_README_REL}}", root_readme_rel)
-    content = content.replace("{{DATE_JST}}", jst_now_text())
-    return content
+def render_template(template: CompiledTemplate, title: str, root_readme_rel: str) -> str:
+    values = {"TITLE": title, "ROOT_README_REL": root_readme_rel, "DATE_JST": jst_now_text()}
+    try:
+        return template.render(values)
+    except TemplateError as exc:
+        raise SystemExit(f"[ERROR] テンプレートを埋められません: {exc}") from None
 
 
 def parse_args() -> argparse.Namespace:
@@ -110,8 +368,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--mode",
         choices=sorted(MODE_DIRS.keys()),
-        required=True,
-        help="general=一般資料, project=PJ特化ノート",
+        help="general=一般資料, project=PJ特化ノート（--manifest では各行の mode の既定値）",
     )
     parser.add_argument("--title", help="ノートタイトル（H1 とファイル名に使用）")
     parser.add_argument(
@@ -132,6 +389,26 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="指定モードで使えるカテゴリ一覧を表示して終了（--mode 必須）",
     )
+    parser.add_argument(
+        "--report",
+        action="store_true",
+        help="--root 配下の全フォルダについて、番号帯ごとの使用状況と空きの断片化を表示して終了（--mode で絞り込み可）",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"使用済み番号を --root/{NUMBER_INDEX_FILE.as_posix()} に記録し、更新時刻の変わっていないフォルダは走査し直さない（--report も同じ）",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="使用済み番号を共有カタログ（--root 以上の .cache/notes.sqlite3）で管理する（--report も同じ）",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        help="複数ノートをまとめて作成する JSON / CSV（列: title, mode, subdir, category, range）",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -142,6 +419,7 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="同名ファイルが存在する場合に上書きする",
     )
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
@@ -197,21 +475,9 @@ def print_categories(mode: str) -> None:
         print(f"- {name}: {start:02d}-{end:02d}")
 
 
-def main() -> int:
-    args = parse_args()
-    if args.list_categories:
-        if not args.mode:
-            raise SystemExit("[ERROR] --list-categories を使う場合は --mode が必要です。")
-        print_categories(args.mode)
-        return 0
-    if not args.title:
-        raise SystemExit("[ERROR] 新規ノート作成時は --title が必要です。")
-
-    root = args.root.resolve()
-    if not root.exists() or not root.is_dir():
-        raise SystemExit(f"[ERROR] --root が存在しないディレクトリです: {root}")
-
-    mode_root = root / MODE_DIRS[args.mode]
+def resolve_mode_root(root: Path, mode: str) -> tuple[Path, Path]:
+    """(モード対象ディレクトリ, そのルートREADME) を返す。どちらかが無ければ終了する。"""
+    mode_root = root / MODE_DIRS[mode]
     if not mode_root.exists() or not mode_root.is_dir():
         raise SystemExit(
             f"[ERROR] モード対象ディレクトリが見つかりません: {mode_root}\n"
@@ -224,9 +490,12 @@ def main() -> int:
             f"[ERROR] ルートREADMEが見つかりません: {root_readme}\n"
             "誤った --root を指定している可能性があります。"
         )
+    return mode_root, root_readme
+
 
-    if args.subdir:
-        subdir_path = Path(args.subdir)
+def resolve_target_dir(mode_root: Path, subdir: str | None) -> Path:
+    if subdir:
+        subdir_path = Path(subdir)
         if subdir_path.is_absolute():
             raise SystemExit("[ERROR] --subdir に絶対パスは指定できません。")
         target_dir = (mode_root / subdir_path).resolve()
@@ -236,25 +505,344 @@ def main() -> int:
 
     if target_dir.exists() and not target_dir.is_dir():
         raise SystemExit(f"[ERROR] 作成先がディレクトリではありません: {target_dir}")
+    return target_dir
+
+
+def already_exists(target_file: Path) -> str:
+    return (
+        f"[ERROR] 既に存在します: {target_file}\n"
+        "必要なら --overwrite を付けてください。"
+    )
+
+
+def print_next_hint(skill_root: Path, root: Path, mode: str) -> None:
+    print(
+        "[NEXT] README索引を更新する場合は "
+        f"`python3 {skill_root / 'scripts' / 'update_readme_index.py'} --root {root} --mode {mode}`"
+    )
+
+
+class PlannedNote(NamedTuple):
+    mode: str
+    number: int
+    number_range: tuple[int, int] | None
+    category: str | None
+    target_dir: Path
+    safe_title: str
+    content: str
+
+    @property
+    def target_file(self) -> Path:
+        return self.target_dir / f"{self.number:02d}_{self.safe_title}.md"
+
+
+def read_manifest(manifest: Path) -> list[dict[str, Any]]:
+    """JSON（オブジェクトの配列、または {"notes": [...]}）か CSV（ヘッダ行あり）を読む。"""
+    try:
+        text = manifest.read_text(encoding="utf-8-sig")
+    except OSError as exc:
+        raise SystemExit(f"[ERROR] manifest を読めません: {manifest} ({exc})") from exc
+
+    if manifest.suffix.lower() == ".csv":
+        rows: Any = list(csv.DictReader(text.splitlines()))
+    else:
+        try:
+            rows = json.loads(text)
+        except ValueError as exc:
+            raise SystemExit(f"[ERROR] manifest の JSON が不正です: {manifest} ({exc})") from exc
+        if isinstance(rows, dict):
+            rows = rows.get("notes")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise SystemExit("[ERROR] manifest はノートごとのオブジェクト（行）の並びで指定してください。")
+    if not rows:
+        raise SystemExit(f"[ERROR] manifest にノートがありません: {manifest}")
+    return rows
+
+
+def manifest_value(row: dict[str, Any], key: str) -> str | None:
+    value = row.get(key)
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def plan_manifest(
+    rows: list[dict[str, Any]],
+    root: Path,
+    default_mode: str | None,
+    skill_root: Path,
+    overwrite: bool,
+    number_index: NumberIndex,
+) -> tuple[list[PlannedNote], dict[Path, NumberAllocator]]:
+    """全行を検証して採番まで済ませる。ディレクトリ走査・テンプレート読み込み・README 確認は 1 回ずつ。"""
+    mode_roots: dict[str, tuple[Path, Path]] = {}
+    templates: dict[str, str] = {}
+    allocators: dict[Path, NumberAllocator] = {}
+    planned: list[PlannedNote] = []
+    seen_files: set[Path] = set()
+
+    for index, row in enumerate(rows, start=1):
+        title = manifest_value(row, "title")
+        try:
+            if not title:
+                raise SystemExit("[ERROR] title が必要です。")
+            mode = manifest_value(row, "mode") or default_mode
+            if mode not in MODE_DIRS:
+                raise SystemExit(f"[ERROR] mode は {' / '.join(sorted(MODE_DIRS))} のいずれかを指定してください: {mode}")
+            if mode not in mode_roots:
+                mode_roots[mode] = resolve_mode_root(root, mode)
+                templates[mode] = load_template(skill_root, mode)
+            mode_root, root_readme = mode_roots[mode]
+
+            target_dir = resolve_target_dir(mode_root, manifest_value(row, "subdir"))
+            category = manifest_value(row, "category")
+            selected_range = resolve_number_range(mode, manifest_value(row, "range"), category)
+            allocator = allocators.get(target_dir)
+            if allocator is None:
+                allocator = allocators[target_dir] = (
+                    number_index.allocator(target_dir) if target_dir.is_dir() else NumberAllocator()
+                )
+            note = PlannedNote(
+                mode,
+                allocator.allocate(selected_range),
+                selected_range,
+                category,
+                target_dir,
+                sanitize_title_for_filename(title),
+                "",
+            )
+            if note.target_file in seen_files or (note.target_file.exists() and not overwrite):
+                raise SystemExit(already_exists(note.target_file))
+        except SystemExit as exc:
+            detail = str(exc).removeprefix("[ERROR] ")
+            raise SystemExit(f"[ERROR] manifest の {index} 件目（{title or 'title なし'}）: {detail}") from None
+
+        seen_files.add(note.target_file)
+        root_readme_rel = Path(os.path.relpath(root_readme, start=target_dir)).as_posix()
+        planned.append(note._replace(content=render_template(templates[mode], title, root_readme_rel)))
+    return planned, allocators
+
+
+def write_notes(
+    planned: list[PlannedNote],
+    allocators: dict[Path, NumberAllocator],
+    overwrite: bool,
+) -> list[PlannedNote]:
+    """全ノートの番号を予約し、一時ファイルに書けてから一括で本来の名前にする。
+
+    並行して作成する別の処理と番号が衝突したノートは、予約の時点で次の空き番号に振り直す。
+    途中で失敗したら、作ったノート・一時ファイル・予約をすべて消して 1 件も残さない。
+    """
+    claims: list[Path] = []
+    temp_files: list[Path] = []
+    created: list[Path] = []
+    written: list[PlannedNote] = []
+    try:
+        for note in planned:
+            note.target_dir.mkdir(parents=True, exist_ok=True)
+            number, claim = claim_number(
+                note.target_dir, allocators[note.target_dir], note.number_range, first=note.number
+            )
+            claims.append(claim)
+            written.append(note._replace(number=number))
+        for note in written:
+            temp_files.append(write_temp(note.target_file, note.content))
+        for temp_file, note in zip(temp_files, written):
+            publish(temp_file, note.target_file, overwrite)
+            created.append(note.target_file)
+    except (OSError, SystemExit) as exc:
+        for path in [*created, *temp_files]:
+            path.unlink(missing_ok=True)
+        detail = already_exists(exc.filename2 or exc.filename) if isinstance(exc, FileExistsError) else str(exc)
+        raise SystemExit(f"{detail}\n[ERROR] 書き込みに失敗したため、1 件も作成していません。") from None
+    finally:
+        for claim in claims:
+            claim.unlink(missing_ok=True)
+    return written
+
+
+def describe_allocation(note: PlannedNote) -> str:
+    details = [f"mode={note.mode}", f"number={note.number:02d}"]
+    if note.number_range:
+        details.append(f"number_range={note.number_range[0]:02d}-{note.number_range[1]:02d}")
+    if note.category:
+        details.append(f"category={note.category}")
+    return " ".join(details)
+
+
+def run_manifest(args: argparse.Namespace, root: Path, skill_root: Path) -> int:
+    with open_number_index(root, args.catalog, args.cache) as index:
+        rows = read_manifest(args.manifest)
+        with PROFILE.phase("plan"):
+            planned, allocators = plan_manifest(rows, root, args.mode, skill_root, args.overwrite, index)
+        if args.dry_run:
+            record_index_stats(index)
+        else:
+            save_number_index(index)
+    PROFILE.add("notes_planned", len(planned))
+    if args.dry_run:
+        for note in planned:
+            print(f"[DRY-RUN] 作成先: {note.target_file} ({describe_allocation(note)})")
+        print(f"[DRY-RUN] 作成予定: {len(planned)} 件")
+        return 0
+
+    with PROFILE.phase("write"):
+        planned = write_notes(planned, allocators, args.overwrite)
+    for note in planned:
+        print(f"[OK] 作成しました: {note.target_file} ({describe_allocation(note)})")
+    print(f"[INFO] 作成件数: {len(planned)}")
+    for mode in dict.fromkeys(note.mode for note in planned):
+        print_next_hint(skill_root, root, mode)
+    return 0
+
+
+def format_numbers(numbers: Iterable[int]) -> str:
+    """[1, 3, 4, 5] -> "01, 03-05"。"""
+    runs: list[list[int]] = []
+    for num in sorted(numbers):
+        if runs and runs[-1][1] == num - 1:
+            runs[-1][1] = num
+        else:
+            runs.append([num, num])
+    return ", ".join(f"{start:02d}" if start == end else f"{start:02d}-{end:02d}" for start, end in runs)
+
+
+def band_usage(used: int, start: int, end: int) -> tuple[list[int], list[int], int]:
+    """(使用番号, 空き番号, 穴の数)。穴は帯内で最大の使用番号より手前にある空きの連なり。"""
+    taken = [num for num in range(start, end + 1) if used >> num & 1]
+    free = [num for num in range(start, end + 1) if not used >> num & 1]
+    holes = 0
+    previous = start - 1
+    for num in taken:
+        if num > previous + 1:
+            holes += 1
+        previous = num
+    return taken, free, holes
+
+
+def category_bands(mode: str) -> list[tuple[tuple[int, int], list[str]]]:
+    bands: dict[tuple[int, int], list[str]] = {}
+    for name, number_range in CATEGORY_RANGES.get(mode, {}).items():
+        bands.setdefault(number_range, []).append(name)
+    return sorted(bands.items())
+
+
+def print_number_report(
+    root: Path,
+    only_mode: str | None,
+    use_catalog: bool = False,
+    use_cache: bool = False,
+) -> int:
+    """--root 配下を 1 回だけ走査し、フォルダごと・番号帯ごとの使用状況を表示する。"""
+    modes = [only_mode] if only_mode else sorted(MODE_DIRS)
+    with open_number_index(root, use_catalog, use_cache) as index:
+        print(f"[INFO] 採番レポート: {root}")
+        for mode in modes:
+            mode_root = root / MODE_DIRS[mode]
+            print(f"## {mode}（{MODE_DIRS[mode]}）")
+            if not mode_root.is_dir():
+                print(f"- フォルダがありません: {mode_root}")
+                continue
+
+            folders: list[tuple[str, Counter[int]]] = []
+            with PROFILE.phase("walk"):
+                listed = list(NoteWalker(mode_root).iter_directories())
+            for directory, entries in listed:
+                counts: Counter[int] = Counter()
+                numbered: list[tuple[int, str]] = []
+                for entry in entries:
+                    match = NUMBERED_NOTE_RE.match(entry.name)
+                    if match and entry.is_file():
+                        counts[int(match.group(1))] += 1
+                        numbered.append((int(match.group(1)), entry.name))
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+                # 走査結果は採番インデックスにもそのまま記録する
+                index.record(Path(directory), mtime_ns, numbered)
+                if counts or directory == str(mode_root):
+                    folders.append((Path(directory).relative_to(root).as_posix(), counts))
+
+            bands = category_bands(mode)
+            for folder, counts in sorted(folders):
+                used = numbers_bitmap(counts)
+                print(f"- {folder}: 番号付きノート {sum(counts.values())} 件")
+                duplicates = sorted(num for num, count in counts.items() if count > 1)
+                if duplicates:
+                    print(f"  [WARN] 同じ番号のノートが複数あります: {format_numbers(duplicates)}")
+                for (start, end), names in bands:
+                    taken, free, holes = band_usage(used, start, end)
+                    free_text = format_numbers(free) if free else "なし"
+                    print(
+                        f"  - {start:02d}-{end:02d} [{', '.join(sorted(names))}]: "
+                        f"使用 {len(taken)}/{end - start + 1}、空き {free_text}、穴 {holes}"
+                    )
+                in_band = numbers_bitmap(num for (start, end), _ in bands for num in range(start, end + 1))
+                outside = [num for num in counts if not in_band >> num & 1]
+                if outside:
+                    print(f"  - 帯外: {format_numbers(outside)}")
+        save_number_index(index)
+    return 0
+
+
+def main() -> int:
+    args = parse_args()
+    if args.list_categories:
+        if not args.mode:
+            raise SystemExit("[ERROR] --list-categories を使う場合は --mode が必要です。")
+        print_categories(args.mode)
+        return 0
+
+    skill_root = Path(__file__).resolve().parents[1]
+    if args.report:
+        root = args.root.resolve()
+        if not root.exists() or not root.is_dir():
+            raise SystemExit(f"[ERROR] --root が存在しないディレクトリです: {root}")
+        return print_number_report(root, args.mode, args.catalog, args.cache)
+    if args.manifest:
+        if args.title or args.subdir or args.number_range or args.category:
+            raise SystemExit("[ERROR] --manifest と --title / --subdir / --range / --category は同時に指定できません。")
+        root = args.root.resolve()
+        if not root.exists() or not root.is_dir():
+            raise SystemExit(f"[ERROR] --root が存在しないディレクトリです: {root}")
+        return run_manifest(args, root, skill_root)
+
+    if not args.mode:
+        raise SystemExit("[ERROR] --mode が必要です（--manifest を使わない場合）。")
+    if not args.title:
+        raise SystemExit("[ERROR] 新規ノート作成時は --title が必要です。")
+
+    root = args.root.resolve()
+    if not root.exists() or not root.is_dir():
+        raise SystemExit(f"[ERROR] --root が存在しないディレクトリです: {root}")
+
+    mode_root, root_readme = resolve_mode_root(root, args.mode)
+    target_dir = resolve_target_dir(mode_root, args.subdir)
     target_dir.mkdir(parents=True, exist_ok=True)
 
     selected_range = resolve_number_range(args.mode, args.number_range, args.category)
-    next_num = get_next_number(target_dir, selected_range)
+    with open_number_index(root, args.catalog, args.cache) as index:
+        with PROFILE.phase("plan"):
+            allocator = index.allocator(target_dir)
+            next_num = allocator.allocate(selected_range)
+        if args.dry_run:
+            record_index_stats(index)
+        else:
+            save_number_index(index)
     safe_title = sanitize_title_for_filename(args.title)
     filename = f"{next_num:02d}_{safe_title}.md"
     target_file = target_dir / filename
 
     if target_file.exists() and not args.overwrite:
-        raise SystemExit(
-            f"[ERROR] 既に存在します: {target_file}\n"
-            "必要なら --overwrite を付けてください。"
-        )
+        raise SystemExit(already_exists(target_file))
 
-    skill_root = Path(__file__).resolve().parents[1]
-    template = load_template(skill_root, args.mode)
-    root_readme_rel = Path(os.path.relpath(root_readme, start=target_dir)).as_posix()
+    with PROFILE.phase("template"):
+        template = load_template(skill_root, args.mode)
+        root_readme_rel = Path(os.path.relpath(root_readme, start=target_dir)).as_posix()
 
-    content = render_template(template, args.title, root_readme_rel)
+        content = render_template(template, args.title, root_readme_rel)
 
     if args.dry_run:
         print(f"[DRY-RUN] 作成先: {target_file}")
@@ -266,19 +854,28 @@ def main() -> int:
         print(content)
         return 0
 
-    target_file.write_text(content, encoding="utf-8")
+    # 並行して作成する別の処理と同じ番号にならないよう、予約してから書く
+    with PROFILE.phase("write"):
+        next_num, claim = claim_number(target_dir, allocator, selected_range, first=next_num)
+        target_file = target_dir / f"{next_num:02d}_{safe_title}.md"
+        temp_file = temp_path(target_file)
+        try:
+            publish(write_temp(target_file, content), target_file, args.overwrite)
+        except FileExistsError:
+            raise SystemExit(already_exists(target_file)) from None
+        finally:
+            # 書き込みや publish が途中で失敗しても一時ファイルを残さない（成功時は publish が消し済み）
+            temp_file.unlink(missing_ok=True)
+            claim.unlink(missing_ok=True)
     print(f"[OK] 作成しました: {target_file}")
     print(f"[INFO] mode={args.mode} next_number={next_num:02d}")
     if selected_range:
         print(f"[INFO] number_range={selected_range[0]:02d}-{selected_range[1]:02d}")
     if args.category:
         print(f"[INFO] category={args.category}")
-    print(
-        "[NEXT] README索引を更新する場合は "
-        f"`python3 {skill_root / 'scripts' / 'update_readme_index.py'} --root {root} --mode {args.mode}`"
-    )
+    print_next_hint(skill_root, root, args.mode)
     return 0
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    raise SystemExit(run_main(main, "create_note"))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Search existing notes through an incrementally updated full-text index."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import TextIO
+
+# 走査・索引の共通モジュールは build-linked-meeting-notes スキル側に置いている
+SHARED_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "build-linked-meeting-notes" / "scripts"
+sys.path.insert(0, str(SHARED_SCRIPTS_DIR))
+
+from notesearch import INDEX_DIRNAME, INDEX_FILENAME, Hit, SearchIndex  # noqa: E402
+from notewalk import NoteWalker  # noqa: E402
+
+
+MODE_DIRS = {
+    "general": "一般資料",
+    "project": "PJ特化ノート",
+}
+
+EXIT_NO_HITS = 1
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="ノートを全文検索する（文字 bigram の索引を --root/.cache/ に置き、変更されたノートだけ索引し直す）"
+    )
+    parser.add_argument(
+        "query",
+        nargs="*",
+        help="検索語（空白区切りの語はすべて含むノートだけを返す）",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=Path.cwd(),
+        help="ノート管理ルート（例: /root/mywork/note）",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=sorted(MODE_DIRS.keys()),
+        help="general=一般資料, project=PJ特化ノート（省略時は --root 配下すべて）",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        metavar="N",
+        help="表示する件数（既定 10）",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="結果を JSON で出力する",
+    )
+    parser.add_argument(
+        "--index-file",
+        type=Path,
+        help=f"索引のファイル（既定: --root/{INDEX_DIRNAME}/{INDEX_FILENAME}）",
+    )
+    parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="ノートを走査せず、既存の索引だけで検索する（走査を省くぶん速い。変更の反映は次の通常実行で行う）",
+    )
+    parser.add_argument(
+        "--index-only",
+        action="store_true",
+        help="索引を更新するだけで検索しない",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    return parser.parse_args()
+
+
+def refresh_index(index: SearchIndex, root: Path, threads: int, log: TextIO) -> None:
+    entries = NoteWalker(root, threads=threads).files(".md", with_stat=True)
+    index.refresh(entries, root)
+    print(index.summary(len(entries)), file=log)
+
+
+def print_hits(hits: list[Hit], root: Path) -> None:
+    for rank, hit in enumerate(hits, start=1):
+        try:
+            shown = Path(hit.path).relative_to(root).as_posix()
+        except ValueError:
+            shown = hit.path
+        print(f"{rank}. {shown} — {hit.title}（スコア {hit.score:.1f}）")
+        for line, text in hit.snippets:
+            print(f"    L{line}: {text}")
+
+
+def main() -> int:
+    args = parse_args()
+    root = args.root.expanduser().resolve()
+    if not root.is_dir():
+        print(f"[ERROR] ノート管理ルートが見つかりません: {root}")
+        return 2
+    if not args.query and not args.index_only:
+        print("[ERROR] 検索語を指定してください（索引の更新だけなら --index-only）")
+        return 2
+    if args.limit < 1:
+        print("[ERROR] --limit は 1 以上を指定してください")
+        return 2
+    index_file = args.index_file.expanduser().resolve() if args.index_file else None
+    scope = root / MODE_DIRS[args.mode] if args.mode else None
+    # --json のときは標準出力を JSON だけにし、[INFO] などは標準エラーへ出す
+    log = sys.stderr if args.json else sys.stdout
+
+    with SearchIndex.open(root, index_file) as index:
+        if not args.no_refresh:
+            refresh_index(index, root, args.walk_threads, log)
+        elif not index.count():
+            print(f"[ERROR] 検索索引が空です: {index.db_file}")
+            print("[NEXT] --no-refresh を外して実行し、索引を作ってください。")
+            return 2
+        if args.index_only:
+            return 0
+
+        query = " ".join(args.query)
+        started = time.perf_counter()
+        hits, candidates = index.search(query, args.limit, scope)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(
+            json.dumps(
+                [
+                    {
+                        "path": hit.path,
+                        "title": hit.title,
+                        "score": round(hit.score, 3),
+                        "snippets": [{"line": line, "text": text} for line, text in hit.snippets],
+                    }
+                    for hit in hits
+                ],
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+    else:
+        print_hits(hits, root)
+    if not hits:
+        print(f"[INFO] 該当するノートはありません: {query}", file=log)
+        return EXIT_NO_HITS
+    print(f"[INFO] {len(hits)} 件を表示（候補 {candidates} 件、検索 {elapsed_ms:.1f} ms）", file=log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
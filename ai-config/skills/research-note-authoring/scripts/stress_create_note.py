@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Stress-test concurrent numbering of create_note.py against one folder."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+NUMBERED_RE = re.compile(r"^(\d{2})_.*\.md$")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="create_note.py を多数のプロセスから同時に実行し、採番の重複が起きないことを確かめる"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        metavar="N",
+        help="同時に動かす作成プロセス数（既定 8）",
+    )
+    parser.add_argument(
+        "--notes",
+        type=int,
+        default=80,
+        metavar="M",
+        help="作成するノートの総数（既定 80。99 以下）",
+    )
+    parser.add_argument(
+        "--range",
+        dest="number_range",
+        help="各ノートを --range で作成する（例: 10-19）。空きが尽きた作成は失敗として数える",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="1 件ずつではなく、プロセスごとに --manifest でまとめて作成する",
+    )
+    parser.add_argument(
+        "--script",
+        type=Path,
+        default=Path(__file__).resolve().with_name("create_note.py"),
+        help="検査する create_note.py（既定はこのスクリプトと同じフォルダのもの）",
+    )
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="作業フォルダを削除せずに残す",
+    )
+    return parser.parse_args()
+
+
+def run_single(script: Path, root: Path, index: int, number_range: str | None) -> int:
+    command = [sys.executable, str(script), "--root", str(root), "--mode", "general", "--title", f"stress-{index:03d}"]
+    if number_range:
+        command += ["--range", number_range]
+    return subprocess.run(command, capture_output=True, text=True).returncode
+
+
+def run_manifest(script: Path, root: Path, worker: int, indexes: list[int], number_range: str | None) -> int:
+    rows = [{"title": f"stress-{index:03d}"} for index in indexes]
+    if number_range:
+        for row in rows:
+            row["range"] = number_range
+    manifest = root / f"manifest-{worker}.json"
+    manifest.write_text(json.dumps(rows, ensure_ascii=False), encoding="utf-8")
+    command = [sys.executable, str(script), "--root", str(root), "--mode", "general", "--manifest", str(manifest)]
+    return subprocess.run(command, capture_output=True, text=True).returncode
+
+
+def main() -> int:
+    args = parse_args()
+    if not (1 <= args.notes <= 99) or args.workers < 1:
+        print("[ERROR] --notes は 1-99、--workers は 1 以上で指定してください。")
+        return 2
+
+    work_dir = Path(tempfile.mkdtemp(prefix="stress_create_note_"))
+    note_dir = work_dir / "一般資料"
+    note_dir.mkdir()
+    (note_dir / "README.md").write_text("# 一般資料\n", encoding="utf-8")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        if args.manifest:
+            batches = [list(range(args.notes))[worker :: args.workers] for worker in range(args.workers)]
+            futures = [
+                executor.submit(run_manifest, args.script, work_dir, worker, batch, args.number_range)
+                for worker, batch in enumerate(batches)
+                if batch
+            ]
+        else:
+            futures = [
+                executor.submit(run_single, args.script, work_dir, index, args.number_range)
+                for index in range(args.notes)
+            ]
+        failures = sum(1 for future in futures if future.result() != 0)
+    elapsed = time.perf_counter() - started
+
+    numbers = Counter(
+        int(match.group(1)) for path in note_dir.iterdir() if (match := NUMBERED_RE.match(path.name))
+    )
+    duplicates = sorted(num for num, count in numbers.items() if count > 1)
+    leftovers = sorted(path.name for path in note_dir.iterdir() if path.name.startswith("."))
+
+    print(f"[INFO] 作業フォルダ: {work_dir}")
+    print(
+        f"[INFO] 作成 {sum(numbers.values())} 件 / 依頼 {args.notes} 件、失敗した実行 {failures} 件、"
+        f"{args.workers} 並列で {elapsed:.2f} 秒"
+    )
+    if not args.keep:
+        for path in sorted(work_dir.rglob("*"), reverse=True):
+            path.rmdir() if path.is_dir() else path.unlink()
+        work_dir.rmdir()
+
+    if duplicates or leftovers:
+        print("[NG] 採番の重複または後始末漏れがあります。")
+        if duplicates:
+            print(f"- 重複した番号: {', '.join(f'{num:02d}' for num in duplicates)}")
+        if leftovers:
+            print(f"- 残った予約・一時ファイル: {', '.join(leftovers)}")
+        return 1
+
+    print("[OK] 採番の重複はありませんでした")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,11 +4,24 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import os
 import re
+import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+# フォルダ走査の共通モジュールは build-linked-meeting-notes スキル側に置いている
+SHARED_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "build-linked-meeting-notes" / "scripts"
+sys.path.insert(0, str(SHARED_SCRIPTS_DIR))
+
+from fsutil import write_atomic  # noqa: E402
+from linkcache import default_cache_dir  # noqa: E402
+from notecatalog import NoteCatalog  # noqa: E402
+from noteprofile import PROFILE, add_profile_arguments, run_main  # noqa: E402
+from notewalk import NoteWalker, WalkEntry  # noqa: E402
+
 
 MODE_DIRS = {
     "general": "一般資料",
@@ -17,6 +30,18 @@ MODE_DIRS = {
 
 START_MARKER = "<!-- AUTO-INDEX:START -->"
 END_MARKER = "<!-- AUTO-INDEX:END -->"
+BLOCK_RE = re.compile(re.escape(START_MARKER) + r".*?" + re.escape(END_MARKER) + r"\n?", re.DOTALL)
+# 索引の中身が同じかどうかは、この行（更新時刻）を除いて比べる
+TIMESTAMP_PREFIX = "> 更新時刻:"
+
+# --shard のときのグループ別索引ページの置き場所（README と同じディレクトリ。隠しフォルダなので索引対象にならない）
+SHARD_DIRNAME = ".auto-index"
+
+# --exit-code 付きで、索引に変更がなく README を書き換えなかったときの終了コード（1 はエラー、2 は引数エラー）
+EXIT_UNCHANGED = 3
+
+TITLE_CACHE_FILE = "readme_titles.json"
+TITLE_CACHE_VERSION = 1
 
 
 def jst_now_text() -> str:
@@ -40,6 +65,11 @@ def parse_args() -> argparse.Namespace:
         help="general=一般資料, project=PJ特化ノート（--readme 未指定時に使用）",
     )
     parser.add_argument("--readme", type=Path, help="更新対象 README.md のパス")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="--root 配下（--mode 指定時はそのフォルダ）を 1 回だけ走査し、各 README の索引をその README 配下の範囲でまとめて更新する",
+    )
     parser.add_argument(
         "--base-dir",
         type=Path,
@@ -50,6 +80,44 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="README を更新せず、生成ブロックを出力する",
     )
+    parser.add_argument(
+        "--exit-code",
+        action="store_true",
+        help=f"索引に変更がなければ終了コード {EXIT_UNCHANGED} を返す（--dry-run でも同じ判定。既定は変更の有無によらず 0）",
+    )
+    parser.add_argument(
+        "--shard",
+        action="store_true",
+        help=f"索引をグループ（サブフォルダ）ごとのページ（{SHARD_DIRNAME}/ 配下）に分け、README には件数付きの目次だけを置く",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="索引対象ディレクトリの .cache/ にノートのタイトルを保存し、次回は新規・変更ファイルだけ開き直す",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="キャッシュの保存先ディレクトリ（指定時は --cache を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="ノートの共有カタログ（.cache/notes.sqlite3。上位フォルダにあればそれ）からタイトルを引き、変更ファイルだけ開き直す",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        type=Path,
+        help="カタログのファイル（指定時は --catalog を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
@@ -70,20 +138,16 @@ def derive_paths(args: argparse.Namespace) -> tuple[Path, Path]:
     return readme, base_dir
 
 
-def is_hidden_path(path: Path) -> bool:
-    return any(part.startswith(".") for part in path.parts)
-
-
-def iter_markdown_files(base_dir: Path, readme: Path) -> list[Path]:
-    files: list[Path] = []
-    for path in base_dir.rglob("*.md"):
-        if path.resolve() == readme.resolve():
-            continue
-        rel = path.relative_to(base_dir)
-        if is_hidden_path(rel):
-            continue
-        files.append(path)
-    return files
+def iter_markdown_files(base_dir: Path, readme: Path, threads: int = 1) -> list[WalkEntry]:
+    # 隠しディレクトリ（.git など）には降りる前に枝刈りする
+    # README 自身は、走査で得た stat の (デバイス, inode) で除く（ファイルごとに resolve しない）
+    readme_stat = readme.stat()
+    readme_id = (readme_stat.st_dev, readme_stat.st_ino)
+    return [
+        entry
+        for entry in NoteWalker(base_dir, threads=threads).files(with_stat=True)
+        if (entry.stat.st_dev, entry.stat.st_ino) != readme_id
+    ]
 
 
 def sort_key(path: Path) -> tuple[int, int, str]:
@@ -109,6 +173,106 @@ def extract_title(path: Path) -> str:
     return path.stem
 
 
+class TitleCache:
+    """ノートのパス -> [mtime_ns, サイズ, タイトル]。mtime とサイズが同じファイルは開き直さない。
+
+    cache_file が None のときは保存しない（その実行の中だけで使う）。
+    """
+
+    def __init__(self, cache_file: Path | None) -> None:
+        self.cache_file = cache_file
+        self.entries: dict[str, list] = {}
+        # 今回の実行で参照したファイルだけを次回に残す
+        self.seen: dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, cache_dir: Path) -> TitleCache:
+        cache = cls(cache_dir / TITLE_CACHE_FILE)
+        try:
+            raw = json.loads(cache.cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cache
+        if raw.get("version") == TITLE_CACHE_VERSION:
+            cache.entries = raw.get("files", {})
+        return cache
+
+    def title(self, path: Path, st: os.stat_result) -> str:
+        key = str(path)
+        state = [st.st_mtime_ns, st.st_size]
+        cached = self.entries.get(key)
+        if cached is not None and cached[:2] == state:
+            self.hits += 1
+            title = cached[2]
+        else:
+            self.misses += 1
+            title = extract_title(path)
+        self.seen[key] = [*state, title]
+        return title
+
+    def save(self) -> None:
+        if self.cache_file is None or self.seen == self.entries:
+            return
+        payload = {"version": TITLE_CACHE_VERSION, "files": self.seen}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.cache_file, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+        except OSError:
+            # キャッシュが書けなくても索引の更新は続ける
+            pass
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return (
+            f"[INFO] タイトルキャッシュ: 再利用 {self.hits} / {total} ファイル（{rate:.0%}）、"
+            f"読み直し {self.misses} ファイル"
+        )
+
+
+def read_titles(
+    entries: list[WalkEntry],
+    cache: TitleCache,
+    catalog: NoteCatalog | None = None,
+    scope: Path | None = None,
+) -> dict[Path, str]:
+    with PROFILE.phase("titles"):
+        if catalog is not None:
+            return catalog.titles([Path(entry.path) for entry in entries], scope=scope)
+        return {Path(entry.path): cache.title(Path(entry.path), entry.stat) for entry in entries}
+
+
+def record_title_stats(cache: TitleCache) -> None:
+    # キャッシュにないタイトルは、そのファイルを先頭から開いて読んでいる
+    PROFILE.add_cache("title_cache", cache.hits, cache.misses)
+    PROFILE.add("files_scanned", cache.misses)
+
+
+def open_catalog(args: argparse.Namespace, start: Path) -> NoteCatalog | None:
+    if not (args.catalog or args.catalog_file):
+        return None
+    if args.cache or args.cache_dir:
+        raise SystemExit("[ERROR] --catalog と --cache は同時に指定できません。")
+    catalog_file = args.catalog_file.expanduser().resolve() if args.catalog_file else None
+    with PROFILE.phase("cache"):
+        return NoteCatalog.open(start, catalog_file)
+
+
+def readme_scopes(entries: list[WalkEntry], mode_dir: Path) -> dict[Path, list[WalkEntry]]:
+    """1 回分の走査結果から、README ごとにその配下のファイル（README 自身を除く）を集める。"""
+    readmes = {Path(entry.path): entry for entry in entries if os.path.basename(entry.path) == "README.md"}
+    scopes: dict[Path, list[WalkEntry]] = {readme: [] for readme in readmes}
+    for entry in entries:
+        for directory in Path(entry.path).parents:
+            readme = directory / "README.md"
+            if readme in scopes and readmes[readme] is not entry:
+                scopes[readme].append(entry)
+            if directory == mode_dir:
+                break
+    return dict(sorted(scopes.items()))
+
+
 def group_files(files: list[Path], base_dir: Path) -> dict[str, list[Path]]:
     grouped: dict[str, list[Path]] = {}
     for path in files:
@@ -124,13 +288,28 @@ def make_relative_link(path: Path, readme_dir: Path) -> str:
     return Path(os.path.relpath(path, start=readme_dir)).as_posix()
 
 
-def render_block(grouped: dict[str, list[Path]], readme_dir: Path) -> str:
+def group_heading(group_name: str) -> str:
+    return "直下" if group_name == "." else group_name
+
+
+def shard_file(shard_dir: Path, group_name: str) -> Path:
+    # a/b と a__b が同じ名前にならないよう、グループ名のハッシュを付ける
+    digest = hashlib.blake2b(group_name.encode("utf-8"), digest_size=3).hexdigest()
+    return shard_dir / f"{group_heading(group_name).replace('/', '__')}.{digest}.md"
+
+
+def render_block(
+    grouped: dict[str, list[Path]],
+    readme_dir: Path,
+    titles: dict[Path, str],
+    shard_dir: Path | None = None,
+) -> str:
     lines: list[str] = [
         START_MARKER,
         "## 自動生成索引（管理ブロック）",
         "",
         "> このブロックは `research-note-authoring/scripts/update_readme_index.py` で更新",
-        f"> 更新時刻: {jst_now_text()} (JST)",
+        f"{TIMESTAMP_PREFIX} {jst_now_text()} (JST)",
         "",
     ]
 
@@ -138,11 +317,18 @@ def render_block(grouped: dict[str, list[Path]], readme_dir: Path) -> str:
         lines.extend(["- （対象ファイルなし）", "", END_MARKER])
         return "\n".join(lines) + "\n"
 
+    if shard_dir is not None:
+        for group_name, paths in grouped.items():
+            link = make_relative_link(shard_file(shard_dir, group_name), readme_dir)
+            lines.append(f"- [{group_heading(group_name)}]({link})（{len(paths)} 件）")
+        lines.extend(["", END_MARKER])
+        return "\n".join(lines) + "\n"
+
     for group_name, paths in grouped.items():
-        heading = "直下" if group_name == "." else group_name
+        heading = group_heading(group_name)
         lines.append(f"### {heading}")
         for path in paths:
-            title = extract_title(path)
+            title = titles[path]
             rel_link = make_relative_link(path, readme_dir)
             lines.append(f"- [{title}]({rel_link})")
         lines.append("")
@@ -151,20 +337,151 @@ def render_block(grouped: dict[str, list[Path]], readme_dir: Path) -> str:
     return "\n".join(lines) + "\n"
 
 
+def render_shards(grouped: dict[str, list[Path]], readme: Path, titles: dict[Path, str]) -> dict[Path, str]:
+    """グループごとの索引ページ（パス -> 内容）。"""
+    shard_dir = readme.parent / SHARD_DIRNAME
+    back_link = make_relative_link(readme, shard_dir)
+    pages: dict[Path, str] = {}
+    for group_name, paths in grouped.items():
+        lines = [
+            f"# 索引: {group_heading(group_name)}",
+            "",
+            "> このページは `research-note-authoring/scripts/update_readme_index.py --shard` で生成（手で編集しない）",
+            f"{TIMESTAMP_PREFIX} {jst_now_text()} (JST)",
+            f"> 戻る: [README]({back_link})",
+            "",
+        ]
+        lines.extend(f"- [{titles[path]}]({make_relative_link(path, shard_dir)})" for path in paths)
+        pages[shard_file(shard_dir, group_name)] = "\n".join(lines) + "\n"
+    return pages
+
+
+def index_lines(block: str) -> list[str]:
+    return [line for line in block.splitlines() if not line.startswith(TIMESTAMP_PREFIX)]
+
+
+def block_unchanged(readme_text: str, block: str) -> bool:
+    """既存の管理ブロックと、更新時刻の行を除いて同じなら True。"""
+    match = BLOCK_RE.search(readme_text)
+    return match is not None and index_lines(match.group(0)) == index_lines(block)
+
+
 def replace_or_append_block(readme_text: str, block: str) -> str:
-    pattern = re.compile(
-        re.escape(START_MARKER) + r".*?" + re.escape(END_MARKER) + r"\n?",
-        re.DOTALL,
-    )
-    if pattern.search(readme_text):
-        return pattern.sub(block, readme_text, count=1)
+    if BLOCK_RE.search(readme_text):
+        # 置換後の文字列にある \ をエスケープとして解釈させない
+        return BLOCK_RE.sub(lambda _: block, readme_text, count=1)
 
     suffix = "" if readme_text.endswith("\n") else "\n"
     return readme_text + suffix + "\n" + block
 
 
+def apply_shards(pages: dict[Path, str], shard_dir: Path, dry_run: bool) -> int:
+    """内容（更新時刻の行を除く）が変わったページだけを書き、不要になったページを消す。変えたページ数を返す。"""
+    changed = 0
+    for path, content in pages.items():
+        try:
+            current = path.read_text(encoding="utf-8")
+        except OSError:
+            current = None
+        if current is not None and index_lines(current) == index_lines(content):
+            continue
+        changed += 1
+        if dry_run:
+            print(f"[DRY-RUN] 索引ページを更新: {path}")
+            continue
+        shard_dir.mkdir(exist_ok=True)
+        write_atomic(path, content)
+    if shard_dir.is_dir():
+        for stale in sorted(shard_dir.glob("*.md")):
+            if stale in pages:
+                continue
+            changed += 1
+            if dry_run:
+                print(f"[DRY-RUN] 不要になった索引ページを削除: {stale}")
+            else:
+                stale.unlink()
+    return changed
+
+
+def run_all(args: argparse.Namespace) -> int:
+    if args.readme or args.base_dir:
+        raise SystemExit("[ERROR] --all と --readme / --base-dir は同時に指定できません。")
+    root = args.root.resolve()
+    use_cache = args.cache or args.cache_dir is not None
+    catalog = open_catalog(args, root)
+    caches: dict[Path, TitleCache] = {}
+    changed = unchanged = skipped = 0
+
+    for mode in [args.mode] if args.mode else sorted(MODE_DIRS):
+        mode_dir = root / MODE_DIRS[mode]
+        if not mode_dir.is_dir():
+            print(f"[WARN] 索引対象ディレクトリが見つかりません: {mode_dir}")
+            continue
+        with PROFILE.phase("walk"):
+            entries = NoteWalker(mode_dir, threads=args.walk_threads).files(with_stat=True)
+        cache_dir = args.cache_dir or default_cache_dir(mode_dir)
+        if cache_dir not in caches:
+            with PROFILE.phase("cache"):
+                caches[cache_dir] = TitleCache.open(cache_dir) if use_cache else TitleCache(None)
+        # タイトルはファイルごとに 1 回だけ読み、全 README で共有する
+        titles = read_titles(entries, caches[cache_dir], catalog, mode_dir)
+        scopes = readme_scopes(entries, mode_dir)
+        if mode_dir / "README.md" not in scopes:
+            print(f"[WARN] README が見つかりません: {mode_dir / 'README.md'}")
+
+        for readme, scoped in scopes.items():
+            original = readme.read_text(encoding="utf-8")
+            # サブフォルダの README は、管理ブロックを置いてあるものだけ更新する
+            if readme.parent != mode_dir and not BLOCK_RE.search(original):
+                skipped += 1
+                continue
+            with PROFILE.phase("render"):
+                grouped = group_files([Path(entry.path) for entry in scoped], readme.parent)
+                shard_dir = readme.parent / SHARD_DIRNAME if args.shard else None
+                block = render_block(grouped, readme.parent, titles, shard_dir)
+            # 索引ページを先に書き、README の目次が存在しないページを指す時間をなくす
+            shard_changes = 0
+            if shard_dir is not None:
+                with PROFILE.phase("write"):
+                    shard_changes = apply_shards(render_shards(grouped, readme, titles), shard_dir, args.dry_run)
+            if block_unchanged(original, block):
+                if shard_changes:
+                    changed += 1
+                    if not args.dry_run:
+                        print(f"[OK] 索引ページを更新しました: {shard_dir}（{shard_changes} ページ）")
+                else:
+                    unchanged += 1
+                continue
+            changed += 1
+            if args.dry_run:
+                print(f"[DRY-RUN] {readme}")
+                print(block)
+                continue
+            with PROFILE.phase("write"):
+                write_atomic(readme, replace_or_append_block(original, block))
+            print(f"[OK] README を更新しました: {readme}（索引件数: {len(scoped)}）")
+
+    with PROFILE.phase("cache"):
+        for cache in caches.values():
+            cache.save()
+    for cache in caches.values():
+        record_title_stats(cache)
+    if catalog is not None:
+        PROFILE.add_cache("catalog", catalog.reused, catalog.parsed)
+    print(f"[INFO] 更新 {changed} 件、変更なし {unchanged} 件、管理ブロックがないため対象外 {skipped} 件")
+    if use_cache:
+        for cache in caches.values():
+            print(cache.summary())
+    if catalog is not None:
+        print(catalog.summary(catalog.parsed + catalog.reused))
+        catalog.close()
+    return EXIT_UNCHANGED if args.exit_code and not changed else 0
+
+
 def main() -> int:
     args = parse_args()
+    if args.all:
+        return run_all(args)
     readme, base_dir = derive_paths(args)
 
     if not readme.exists():
@@ -172,22 +489,52 @@ def main() -> int:
     if not base_dir.exists():
         raise SystemExit(f"[ERROR] 索引対象ディレクトリが見つかりません: {base_dir}")
 
-    files = iter_markdown_files(base_dir, readme)
-    grouped = group_files(files, base_dir)
-    block = render_block(grouped, readme.parent)
+    with PROFILE.phase("walk"):
+        entries = iter_markdown_files(base_dir, readme, args.walk_threads)
+    use_cache = args.cache or args.cache_dir is not None
+    with PROFILE.phase("cache"):
+        cache = TitleCache.open(args.cache_dir or default_cache_dir(base_dir)) if use_cache else TitleCache(None)
+    catalog = open_catalog(args, readme.parent)
+    titles = read_titles(entries, cache, catalog, base_dir)
+    with PROFILE.phase("cache"):
+        cache.save()
+    record_title_stats(cache)
+    if catalog is not None:
+        PROFILE.add_cache("catalog", catalog.reused, catalog.parsed)
+        catalog.close()
+    with PROFILE.phase("render"):
+        grouped = group_files(list(titles), base_dir)
+        shard_dir = readme.parent / SHARD_DIRNAME if args.shard else None
+        block = render_block(grouped, readme.parent, titles, shard_dir)
 
+    original = readme.read_text(encoding="utf-8")
+    readme_unchanged = block_unchanged(original, block)
     if args.dry_run:
         print(block)
-        return 0
-
-    original = readme.read_text(encoding="utf-8")
-    updated = replace_or_append_block(original, block)
-    readme.write_text(updated, encoding="utf-8")
-    print(f"[OK] README を更新しました: {readme}")
+    shard_changes = 0
+    if shard_dir is not None:
+        with PROFILE.phase("write"):
+            shard_changes = apply_shards(render_shards(grouped, readme, titles), shard_dir, args.dry_run)
+    unchanged = readme_unchanged and not shard_changes
+    if args.dry_run:
+        return EXIT_UNCHANGED if args.exit_code and unchanged else 0
+
+    if readme_unchanged:
+        print(f"[INFO] 索引に変更はないため README は更新しません: {readme}")
+    else:
+        with PROFILE.phase("write"):
+            write_atomic(readme, replace_or_append_block(original, block))
+        print(f"[OK] README を更新しました: {readme}")
+    if shard_changes:
+        print(f"[OK] 索引ページを更新しました: {shard_dir}（{shard_changes} ページ）")
     print(f"[INFO] 対象ディレクトリ: {base_dir}")
     print(f"[INFO] 索引件数: {sum(len(v) for v in grouped.values())}")
-    return 0
+    if use_cache:
+        print(cache.summary())
+    if catalog is not None:
+        print(catalog.summary(len(entries)))
+    return EXIT_UNCHANGED if args.exit_code and unchanged else 0
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    raise SystemExit(run_main(main, "update_readme_index"))
@@ -4,12 +4,34 @@
 from __future__ import annotations
 
 import argparse
-import os
-import re
+import sys
 from pathlib import Path
+from typing import Any, Iterable
 
+# リンク検査の共通モジュールは build-linked-meeting-notes スキル側に置いている
+SHARED_SCRIPTS_DIR = Path(__file__).resolve().parents[2] / "build-linked-meeting-notes" / "scripts"
+sys.path.insert(0, str(SHARED_SCRIPTS_DIR))
 
-LINK_RE = re.compile(r"(?<!\!)\[[^\]]+\]\(([^)]+)\)")
+from jobpool import resolve_jobs  # noqa: E402
+from linkcache import LinkCache, default_cache_dir  # noqa: E402
+from mdscan import LARGE_FILE_BYTES  # noqa: E402
+from notecatalog import NoteCatalog  # noqa: E402
+from notelint import FileLint, lint_files  # noqa: E402
+from noteprofile import PROFILE, add_profile_arguments, run_main  # noqa: E402
+from notewalk import markdown_paths  # noqa: E402
+from notewatch import (  # noqa: E402
+    DEFAULT_DEBOUNCE,
+    DEFAULT_INTERVAL,
+    Finding,
+    paths_fingerprint,
+    tree_fingerprint,
+    watch_loop,
+)
+from urlcheck import ExternalChecker, add_external_arguments, checker_from_args, external_links  # noqa: E402
+
+
+# notelint の規則のうち、このスクリプトが使うもの
+NOTE_RULES = ("note-links",)
 
 
 def parse_args() -> argparse.Namespace:
@@ -20,85 +42,382 @@ def parse_args() -> argparse.Namespace:
         type=Path,
         help="検査対象ディレクトリまたはファイル",
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="先頭の検査対象の .cache/ に解析結果を保存し、次回は変更分だけ再検査する",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        help="キャッシュの保存先ディレクトリ（指定時は --cache を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--catalog",
+        action="store_true",
+        help="ノートの共有カタログ（先頭の検査対象から上位へたどった .cache/notes.sqlite3。なければ先頭の対象に作る）を使い、変更ファイルだけ解析し直す",
+    )
+    parser.add_argument(
+        "--catalog-file",
+        type=Path,
+        help="カタログのファイル（指定時は --catalog を暗黙に有効化）",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="N プロセスで並列に検査する（0 で CPU 数。既定 1）",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="常駐して変更を監視し、変更ファイルとそこへ向かうリンクだけを再検査して差分を表示する",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help=f"--watch のポーリング間隔（秒、既定 {DEFAULT_INTERVAL}）",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        help=f"--watch で変更が落ち着くまで待つ時間（秒、既定 {DEFAULT_DEBOUNCE}）",
+    )
+    parser.add_argument(
+        "--large-file-mb",
+        type=float,
+        default=LARGE_FILE_BYTES / 1024 / 1024,
+        metavar="MB",
+        help="このサイズ以上のファイルは丸ごと読まず、mmap して行の窓ごとに走査する（既定 %(default)g）",
+    )
+    parser.add_argument(
+        "--walk-threads",
+        type=int,
+        default=1,
+        metavar="N",
+        help="フォルダ走査で同じ深さのディレクトリを N スレッドで並行に一覧する（遅いファイルシステム向け。既定 1）",
+    )
+    add_external_arguments(parser)
+    add_profile_arguments(parser)
     return parser.parse_args()
 
 
-def is_external(link: str) -> bool:
-    lower = link.lower()
-    return (
-        lower.startswith("http://")
-        or lower.startswith("https://")
-        or lower.startswith("mailto:")
-        or lower.startswith("javascript:")
-        or lower.startswith("#")
-    )
+def iter_markdown_files(target: Path, threads: int = 1) -> list[Path]:
+    if target.is_file():
+        return [target] if target.suffix.lower() == ".md" else []
+    # 隠しディレクトリ（.git など）には降りる前に枝刈りする
+    return markdown_paths(target, threads=threads)
 
 
-def normalize_link(link: str) -> str:
-    value = link.strip()
-    if value.startswith("<") and value.endswith(">"):
-        value = value[1:-1].strip()
-    if " " in value and not value.startswith("./") and not value.startswith("../"):
-        value = value.split(" ", 1)[0]
-    return value
+class LinkResolver:
+    """(ディレクトリ, リンク先) -> 絶対パス と、絶対パス -> 存在するか のメモ。
 
+    1 回の実行の中で全検査対象ルートが共有する。ルートをまたいで相互リンクしていても、
+    同じリンクの resolve() や同じリンク先の exists() は 1 回しか呼ばない。
+    """
+
+    def __init__(self) -> None:
+        self._resolved: dict[tuple[str, str], str] = {}
+        self._exists: dict[str, bool] = {}
+
+    def resolve(self, directory: Path, link_path: str) -> str:
+        key = (str(directory), link_path)
+        resolved = self._resolved.get(key)
+        if resolved is None:
+            resolved = self._resolved[key] = str((directory / link_path).resolve())
+        return resolved
+
+    def exists(self, path: str) -> bool:
+        found = self._exists.get(path)
+        if found is None:
+            found = self._exists[path] = Path(path).exists()
+        return found
+
+
+def extract_links(path: Path, links: Iterable[tuple[int, str]], resolver: LinkResolver) -> list[list[Any]]:
+    records: list[list[Any]] = []
+    for lineno, raw_link in links:
+        resolved = resolver.resolve(path.parent, raw_link.split("#", 1)[0])
+        records.append([lineno, raw_link, resolved, "ok"])
+    return records
 
-def iter_markdown_files(target: Path) -> list[Path]:
-    if target.is_file():
-        return [target] if target.suffix.lower() == ".md" else []
 
-    files: list[Path] = []
-    for path in target.rglob("*.md"):
-        rel_parts = path.relative_to(target).parts
-        if any(part.startswith(".") for part in rel_parts):
+def format_errors(path: Path, records: list[list[Any]]) -> list[Finding]:
+    return [
+        Finding((str(path), raw_link), f"{path}:{lineno}: リンク切れ -> {raw_link}")
+        for lineno, raw_link, _, status in records
+        if status == "missing"
+    ]
+
+
+def read_error(path: Path, error: OSError) -> Finding:
+    return Finding((str(path), "read"), f"{path}:0: 読み込み失敗: {error}")
+
+
+def check_linted(path: Path, result: FileLint, resolver: LinkResolver) -> list[Finding]:
+    if result.error is not None:
+        return [read_error(path, result.error)]
+    records = extract_links(path, result.hits["note-links"], resolver)
+    PROFILE.add("links_resolved", len(records))
+    for record in records:
+        if not resolver.exists(record[2]):
+            record[3] = "missing"
+    return format_errors(path, records)
+
+
+def check_file_cached(
+    path: Path,
+    cache: LinkCache,
+    affected: set[str],
+    scanned: dict[str, FileLint],
+    resolver: LinkResolver,
+) -> list[Finding]:
+    key = str(path)
+    records = cache.cached_links(key)
+    if records is None:
+        result = scanned[key]
+        if result.error is not None:
+            return [read_error(path, result.error)]
+        cache.parsed += 1
+        cache.record_digest(key, result.digest)
+        records = extract_links(path, result.hits["note-links"], resolver)
+        for record in records:
+            record[3] = "ok" if cache.state(record[2]) is not None else "missing"
+        cache.set_links(key, records, (record[2] for record in records))
+    else:
+        cache.reused += 1
+        if key in affected:
+            for record in records:
+                if record[2] in cache.dirty:
+                    cache.rechecked_links += 1
+                    record[3] = "ok" if cache.state(record[2]) is not None else "missing"
+    PROFILE.add("links_resolved", len(records))
+    return format_errors(path, records)
+
+
+def collect_targets(paths: list[Path], threads: int = 1) -> list[tuple[Path, list[Path] | None]]:
+    # 存在しない検査対象はファイル一覧を None にして、入力順どおりにエラーを出す。
+    # 検査対象が重なっている（ノートルートと 一般資料 など）ときは、先に出てきたルートでだけ検査する
+    targets: list[tuple[Path, list[Path] | None]] = []
+    seen: set[Path] = set()
+    for raw_target in paths:
+        target = raw_target.resolve()
+        if not target.exists():
+            targets.append((raw_target, None))
             continue
-        files.append(path)
-    return sorted(files)
+        md_files = [md_file for md_file in iter_markdown_files(target, threads) if md_file not in seen]
+        seen.update(md_files)
+        targets.append((target, md_files))
+    return targets
+
+
+def unique_files(targets: list[tuple[Path, list[Path] | None]]) -> list[Path]:
+    return [md_file for _, md_files in targets for md_file in md_files or []]
+
 
+def missing_target(target: Path) -> Finding:
+    return Finding((str(target), "target"), f"{target}:0: 対象が存在しません")
 
-def check_file(path: Path) -> list[str]:
-    errors: list[str] = []
-    try:
-        lines = path.read_text(encoding="utf-8").splitlines()
-    except OSError as e:
-        return [f"{path}:0: 読み込み失敗: {e}"]
 
-    for lineno, line in enumerate(lines, start=1):
-        for match in LINK_RE.finditer(line):
-            raw_link = normalize_link(match.group(1))
-            if not raw_link or is_external(raw_link):
+def check_targets(
+    targets: list[tuple[Path, list[Path] | None]],
+    jobs: int,
+    large_bytes: int = LARGE_FILE_BYTES,
+    catalog: NoteCatalog | None = None,
+) -> list[Finding]:
+    # 全ルートのファイルを 1 つのプールでまとめて読み、リンクの解決は親プロセスでメモを共有して行う
+    md_files_all = unique_files(targets)
+    paths = [str(md_file) for md_file in md_files_all]
+    if catalog is not None:
+        with PROFILE.phase("cache"):
+            linted = catalog.lint_files(paths, NOTE_RULES, jobs, large_bytes)
+            for target, md_files in targets:
+                if md_files is not None and target.is_dir():
+                    catalog.forget_missing(target, paths)
+    else:
+        linted = lint_files(paths, NOTE_RULES, jobs, large_bytes)
+    results = dict(zip(md_files_all, linted))
+    resolver = LinkResolver()
+
+    all_errors: list[Finding] = []
+    with PROFILE.phase("resolve"):
+        for target, md_files in targets:
+            if md_files is None:
+                all_errors.append(missing_target(target))
                 continue
-            link_path = raw_link.split("#", 1)[0]
-            if not link_path:
+            for md_file in md_files:
+                all_errors.extend(check_linted(md_file, results[md_file], resolver))
+    return all_errors
+
+
+def check_targets_cached(
+    targets: list[tuple[Path, list[Path] | None]],
+    cache: LinkCache,
+    jobs: int,
+    large_bytes: int = LARGE_FILE_BYTES,
+) -> list[Finding]:
+    with PROFILE.phase("cache"):
+        cache.refresh(unique_files(targets))
+        affected = cache.affected_sources()
+        stale = sorted(md_file for md_file in unique_files(targets) if cache.cached_links(str(md_file)) is None)
+    linted = lint_files([str(path) for path in stale], NOTE_RULES, jobs, large_bytes, with_digest=True)
+    scanned = {str(path): result for path, result in zip(stale, linted)}
+    resolver = LinkResolver()
+
+    all_errors: list[Finding] = []
+    with PROFILE.phase("resolve"):
+        for target, md_files in targets:
+            if md_files is None:
+                all_errors.append(missing_target(target))
                 continue
-            resolved = (path.parent / link_path).resolve()
-            if not resolved.exists():
-                errors.append(f"{path}:{lineno}: リンク切れ -> {raw_link}")
-    return errors
+            for md_file in md_files:
+                all_errors.extend(check_file_cached(md_file, cache, affected, scanned, resolver))
+    with PROFILE.phase("cache"):
+        cache.save()
+    return all_errors
+
+
+def check_external(
+    md_files: list[Path],
+    checker: ExternalChecker,
+    jobs: int,
+    large_bytes: int = LARGE_FILE_BYTES,
+    catalog: NoteCatalog | None = None,
+) -> tuple[list[Finding], list[Finding]]:
+    """(リンク切れ・不正な URL, 確認できなかったもの)。接続できないだけのものは一時的なこともあるので失敗にしない。"""
+    per_file = external_links([str(path) for path in md_files], "note-external", jobs, large_bytes, catalog)
+    checker.check(url for links in per_file for _, url in links)
+    checker.save()
+    errors: list[Finding] = []
+    warnings: list[Finding] = []
+    for path, links in zip(md_files, per_file):
+        for lineno, url in links:
+            status = checker.status_of(url)
+            if status.broken:
+                errors.append(Finding((str(path), url), f"{path}:{lineno}: 外部リンク切れ (HTTP {status.status}) -> {url}"))
+            elif status.invalid:
+                errors.append(Finding((str(path), url), f"{path}:{lineno}: 外部リンクの URL が不正です（{status.error}） -> {url}"))
+            elif status.unreachable:
+                warnings.append(
+                    Finding((str(path), url), f"{path}:{lineno}: 外部リンクを確認できません（{status.error}） -> {url}")
+                )
+    return errors, warnings
+
+
+def watch(paths: list[Path], cache: LinkCache, jobs: int, large_bytes: int, args: argparse.Namespace) -> int:
+    def run_cycle() -> list[Finding]:
+        cache.begin_cycle()
+        return check_targets_cached(collect_targets(paths, args.walk_threads), cache, jobs, large_bytes)
+
+    exclude = [cache.cache_file.parent] if cache.cache_file else []
+
+    def fingerprint() -> object:
+        state: dict[str, object] = {}
+        for raw_target in paths:
+            target = raw_target.resolve()
+            if target.is_dir():
+                state.update(tree_fingerprint(target, exclude))
+            else:
+                state.update(paths_fingerprint([str(target)]))
+        # 走査の外（隠しフォルダや検査対象の外）にある既知のリンク先も見張る
+        state.update(paths_fingerprint([path for path in sorted(cache.graph) if path not in state]))
+        return state
+
+    return watch_loop(run_cycle, fingerprint, args.interval, args.debounce)
+
+
+def print_external_warnings(warnings: list[Finding]) -> None:
+    if warnings:
+        print("[WARN] 確認できなかった外部リンク（接続できない・タイムアウトなど。失敗にはしない）")
+        for warn in warnings:
+            print(warn.display)
 
 
 def main() -> int:
     args = parse_args()
-    all_errors: list[str] = []
+    with PROFILE.phase("walk"):
+        targets = collect_targets(args.paths, args.walk_threads)
 
-    for raw_target in args.paths:
-        target = raw_target.resolve()
-        if not target.exists():
-            all_errors.append(f"{raw_target}:0: 対象が存在しません")
-            continue
+    jobs = resolve_jobs(args.jobs)
+    large_bytes = int(args.large_file_mb * 1024 * 1024)
+    cache: LinkCache | None = None
+    if args.cache or args.cache_dir:
+        existing = [target for target, md_files in targets if md_files is not None]
+        with PROFILE.phase("cache"):
+            if args.cache_dir:
+                cache = LinkCache.open(args.cache_dir.expanduser().resolve(), "validate_note_links")
+            elif existing:
+                cache = LinkCache.open(default_cache_dir(existing[0]), "validate_note_links")
+
+    catalog: NoteCatalog | None = None
+    if args.catalog or args.catalog_file:
+        if cache is not None or args.watch:
+            print("[ERROR] --catalog は --cache / --watch と同時に指定できません。")
+            return 2
+        existing = [target for target, md_files in targets if md_files is not None]
+        if args.catalog_file or existing:
+            catalog_file = args.catalog_file.expanduser().resolve() if args.catalog_file else None
+            with PROFILE.phase("cache"):
+                catalog = NoteCatalog.open(existing[0] if existing else Path.cwd(), catalog_file)
+
+    checker: ExternalChecker | None = None
+    if args.external:
+        if args.watch:
+            print("[ERROR] --external は --watch と同時に指定できません。")
+            return 2
+        existing = [target for target, md_files in targets if md_files is not None]
+        if args.cache_dir:
+            checker = checker_from_args(args, args.cache_dir.expanduser().resolve())
+        else:
+            checker = checker_from_args(args, default_cache_dir(existing[0] if existing else Path.cwd()))
+
+    if args.watch:
+        return watch(args.paths, cache or LinkCache(None, "validate_note_links"), jobs, large_bytes, args)
+
+    if catalog is not None:
+        all_errors = check_targets(targets, jobs, large_bytes, catalog)
+    elif cache is None:
+        all_errors = check_targets(targets, jobs, large_bytes)
+    else:
+        all_errors = check_targets_cached(targets, cache, jobs, large_bytes)
+    external_warnings: list[Finding] = []
+    if checker is not None:
+        with PROFILE.phase("external"):
+            external_errors, external_warnings = check_external(
+                unique_files(targets), checker, jobs, large_bytes, catalog
+            )
+        all_errors += external_errors
+    if PROFILE.enabled:
+        if catalog is not None:
+            PROFILE.add_cache("catalog", catalog.reused, catalog.parsed)
+        elif cache is not None:
+            PROFILE.add_cache("link_cache", cache.reused, cache.parsed)
+        if checker is not None:
+            PROFILE.add_cache("external_cache", checker.reused, checker.fetched)
 
-        for md_file in iter_markdown_files(target):
-            all_errors.extend(check_file(md_file))
+    with PROFILE.phase("output"):
+        if catalog is not None:
+            print(catalog.summary(len(unique_files(targets))))
+            catalog.close()
+        elif cache is not None:
+            print(cache.summary(len(unique_files(targets))))
+        if checker is not None:
+            print(checker.summary())
 
-    if all_errors:
-        print("[NG] リンク切れまたは検査エラーが見つかりました")
-        for err in all_errors:
-            print(err)
-        return 1
+        if all_errors:
+            print("[NG] リンク切れまたは検査エラーが見つかりました")
+            for err in all_errors:
+                print(err.display)
+            print_external_warnings(external_warnings)
+            return 1
 
-    print("[OK] ローカルMarkdownリンクの検査で問題は見つかりませんでした")
-    return 0
+        print("[OK] ローカルMarkdownリンクの検査で問題は見つかりませんでした")
+        print_external_warnings(external_warnings)
+        return 0
 
 
 if __name__ == "__main__":
-    raise SystemExit(main())
+    raise SystemExit(run_main(main, "validate_note_links"))
@@ -0,0 +1,136 @@
+#!/usr/bin/env bash
+# tests/external-links.sh — check_links.py / validate_note_links.py --external against a local http.server.
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+CHECK_LINKS="${ROOT_DIR}/ai-config/skills/build-linked-meeting-notes/scripts/check_links.py"
+VALIDATE="${ROOT_DIR}/ai-config/skills/research-note-authoring/scripts/validate_note_links.py"
+TMP_WORK="$(mktemp -d)"
+SERVER_PID=""
+PASS=0
+FAIL=0
+
+GREEN='\033[0;32m'
+RED='\033[0;31m'
+NC='\033[0m'
+
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP_WORK}"
+}
+trap cleanup EXIT
+
+pass() { PASS=$((PASS + 1)); printf "${GREEN}  PASS${NC} %s\n" "$1"; }
+fail() { FAIL=$((FAIL + 1)); printf "${RED}  FAIL${NC} %s\n" "$1"; }
+
+# ─── local stand-in server ───
+cat > "${TMP_WORK}/server.py" <<'PY'
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# path -> (HEAD の応答, GET の応答, Location)
+ROUTES = {
+    "/ok": (200, 200, None),
+    "/missing": (404, 404, None),
+    "/head-405": (405, 200, None),
+    "/loop": (302, 302, "/loop"),
+    "/bad-redirect": (302, 302, "http://[::1/x"),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self, method_index):
+        head, get, location = ROUTES.get(self.path, (404, 404, None))
+        self.send_response((head, get)[method_index])
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._respond(0)
+
+    def do_GET(self):
+        self._respond(1)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+print(server.server_address[1], flush=True)
+server.serve_forever()
+PY
+
+python3 "${TMP_WORK}/server.py" > "${TMP_WORK}/port" &
+SERVER_PID=$!
+for _ in $(seq 50); do
+  [[ -s "${TMP_WORK}/port" ]] && break
+  sleep 0.1
+done
+PORT="$(cat "${TMP_WORK}/port")"
+BASE="http://127.0.0.1:${PORT}"
+# 一度 bind して閉じたポート（接続を拒否される）
+REFUSED_PORT="$(python3 -c 'import socket; s = socket.socket(); s.bind(("127.0.0.1", 0)); print(s.getsockname()[1]); s.close()')"
+
+# ─── helpers ───
+# make_note <case> <url>: 外部リンクを 1 つだけ持つノートのフォルダを作る
+make_note() {
+  local dir="${TMP_WORK}/$1"
+  mkdir -p "${dir}"
+  printf '# %s\n\n- [link](%s)\n' "$1" "$2" > "${dir}/note.md"
+}
+
+# run_case <label> <script> <case> <expected exit> <expected message>
+run_case() {
+  local label="$1" script="$2" case_dir="${TMP_WORK}/$3" expected_rc="$4" pattern="$5"
+  local out="${TMP_WORK}/$3.$(basename "${script}" .py).out" rc=0
+  python3 "${script}" "${case_dir}" --external --external-rate 0 --external-ttl 0 --external-timeout 5 \
+    > "${out}" 2>&1 || rc=$?
+  if [[ "${rc}" -ne "${expected_rc}" ]]; then
+    fail "${label}: exit ${rc} (expected ${expected_rc})"
+    sed 's/^/      /' "${out}"
+  elif ! grep -qF -- "${pattern}" "${out}"; then
+    fail "${label}: '${pattern}' not in output"
+    sed 's/^/      /' "${out}"
+  else
+    pass "${label}"
+  fi
+}
+
+make_note ok "${BASE}/ok"
+make_note missing "${BASE}/missing"
+make_note head-405 "${BASE}/head-405"
+make_note loop "${BASE}/loop"
+make_note bad-redirect "${BASE}/bad-redirect"
+make_note refused "http://127.0.0.1:${REFUSED_PORT}/"
+make_note malformed "http://[::1/x"
+make_note bad-port "http://127.0.0.1:abc/"
+
+echo "=== check_links.py --external ==="
+run_case "200 is ok" "${CHECK_LINKS}" ok 0 "[OK] リンク検証に成功しました"
+run_case "404 is an error" "${CHECK_LINKS}" missing 1 "外部リンク先がエラーを返しました（HTTP 404）"
+run_case "405 on HEAD falls back to GET" "${CHECK_LINKS}" head-405 0 "[OK] リンク検証に成功しました"
+run_case "redirect loop is a warning" "${CHECK_LINKS}" loop 0 "リダイレクトが 5 回を超えました"
+run_case "malformed redirect is a warning" "${CHECK_LINKS}" bad-redirect 0 "不正なリダイレクト先"
+run_case "refused port is a warning" "${CHECK_LINKS}" refused 0 "外部リンク先を確認できません"
+run_case "malformed URL is an error" "${CHECK_LINKS}" malformed 1 "外部リンクの URL が不正です（Invalid IPv6 URL）"
+run_case "non-numeric port is an error" "${CHECK_LINKS}" bad-port 1 "外部リンクの URL が不正です"
+
+echo "=== validate_note_links.py --external ==="
+run_case "200 is ok" "${VALIDATE}" ok 0 "[OK]"
+run_case "404 is an error" "${VALIDATE}" missing 1 "外部リンク切れ (HTTP 404)"
+run_case "405 on HEAD falls back to GET" "${VALIDATE}" head-405 0 "[OK]"
+run_case "redirect loop is a warning" "${VALIDATE}" loop 0 "リダイレクトが 5 回を超えました"
+run_case "refused port is a warning" "${VALIDATE}" refused 0 "外部リンクを確認できません"
+run_case "malformed URL is an error" "${VALIDATE}" malformed 1 "外部リンクの URL が不正です（Invalid IPv6 URL）"
+run_case "non-numeric port is an error" "${VALIDATE}" bad-port 1 "外部リンクの URL が不正です"
+
+echo ""
+echo "Results: ${PASS} passed, ${FAIL} failed"
+[[ "${FAIL}" -eq 0 ]]
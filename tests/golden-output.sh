@@ -0,0 +1,93 @@
+#!/usr/bin/env bash
+# tests/golden-output.sh — check_links.py / check_placeholders.py / validate_note_links.py output against golden files.
+#   bash tests/golden-output.sh           比べる
+#   bash tests/golden-output.sh --update  出力を正として tests/fixtures/golden/ を書き直す（意図して出力を変えたときだけ）
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+FIXTURE_DIR="${ROOT_DIR}/tests/fixtures/notes"
+GOLDEN_DIR="${ROOT_DIR}/tests/fixtures/golden"
+CHECK_LINKS="${ROOT_DIR}/ai-config/skills/build-linked-meeting-notes/scripts/check_links.py"
+CHECK_PLACEHOLDERS="${ROOT_DIR}/ai-config/skills/build-linked-meeting-notes/scripts/check_placeholders.py"
+VALIDATE="${ROOT_DIR}/ai-config/skills/research-note-authoring/scripts/validate_note_links.py"
+TMP_WORK="$(mktemp -d)"
+UPDATE=0
+PASS=0
+FAIL=0
+
+GREEN='\033[0;32m'
+RED='\033[0;31m'
+NC='\033[0m'
+
+[[ "${1:-}" == "--update" ]] && UPDATE=1
+
+cleanup() {
+  rm -rf "${TMP_WORK}"
+}
+trap cleanup EXIT
+
+pass() { PASS=$((PASS + 1)); printf "${GREEN}  PASS${NC} %s\n" "$1"; }
+fail() { FAIL=$((FAIL + 1)); printf "${RED}  FAIL${NC} %s\n" "$1"; }
+
+# スクリプトがキャッシュなどを書いても fixture を汚さないよう、コピーの中で実行する
+cp -R "${FIXTURE_DIR}" "${TMP_WORK}/notes"
+cd "${TMP_WORK}/notes"
+
+# ─── helpers ───
+# run_case <golden name> <script> [args...]: 出力（標準出力と標準エラー）と終了コードを golden と比べる。
+# 出力中の一時フォルダのパスは取り除き、fixture からの相対パスにそろえる
+run_case() {
+  local name="$1" script="$2"
+  shift 2
+  local golden="${GOLDEN_DIR}/${name}.txt" out="${TMP_WORK}/${name}.out" rc=0
+  python3 "${script}" "$@" > "${out}.raw" 2>&1 || rc=$?
+  { sed "s#${TMP_WORK}/notes/##g" "${out}.raw"; echo "exit ${rc}"; } > "${out}"
+
+  if [[ "${UPDATE}" -eq 1 ]]; then
+    # 同じ golden を使う別オプションの実行は、最初の実行で書いた内容と比べる
+    if [[ ! -f "${golden}" || -z "${UPDATED[${name}]:-}" ]]; then
+      cp "${out}" "${golden}"
+      UPDATED[${name}]=1
+    fi
+  fi
+  if diff -u "${golden}" "${out}" > "${out}.diff" 2>&1; then
+    pass "${name} ($(basename "${script}") $*)"
+  else
+    fail "${name} ($(basename "${script}") $*)"
+    sed 's/^/      /' "${out}.diff"
+  fi
+}
+
+declare -A UPDATED=()
+
+echo "=== check_links.py ==="
+for extra in "" "--jobs 2" "--walk-threads 2"; do
+  # shellcheck disable=SC2086
+  run_case check_links-meeting "${CHECK_LINKS}" meeting ${extra}
+  # shellcheck disable=SC2086
+  run_case check_links-general "${CHECK_LINKS}" 一般資料 ${extra}
+done
+run_case check_links-file "${CHECK_LINKS}" meeting/index.md
+run_case check_links-ok "${CHECK_LINKS}" meeting/資料
+run_case check_links-missing "${CHECK_LINKS}" no-such-folder
+
+echo "=== check_placeholders.py ==="
+for extra in "" "--walk-threads 2"; do
+  # shellcheck disable=SC2086
+  run_case check_placeholders-meeting "${CHECK_PLACEHOLDERS}" meeting ${extra}
+done
+run_case check_placeholders-file "${CHECK_PLACEHOLDERS}" "meeting/topics/01_検索の設計.md"
+run_case check_placeholders-general "${CHECK_PLACEHOLDERS}" 一般資料
+run_case check_placeholders-ok "${CHECK_PLACEHOLDERS}" meeting/資料
+
+echo "=== validate_note_links.py ==="
+for extra in "" "--jobs 2" "--walk-threads 2"; do
+  # shellcheck disable=SC2086
+  run_case validate-all "${VALIDATE}" meeting 一般資料 ${extra}
+done
+run_case validate-file "${VALIDATE}" "一般資料/rag/10_検索.md" no-such-folder
+run_case validate-ok "${VALIDATE}" meeting/資料
+
+echo ""
+echo "Results: ${PASS} passed, ${FAIL} failed"
+[[ "${FAIL}" -eq 0 ]]